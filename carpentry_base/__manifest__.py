@@ -13,6 +13,13 @@
 
     'depends': ['base'],
     'data': [
+        # security
+        'security/ir.model.access.csv',
+        'security/carpentry_import_job_security.xml',
+        # data
+        'data/ir_cron.xml',
+        # views
+        'views/carpentry_import_job.xml',
         # 'views/res_config_settings.xml',
         # 'views/project_project.xml',
     ]
@@ -1,3 +1,4 @@
 # -*- coding: utf-8 -*-
 
 # from . import project_project
+from . import carpentry_import_job
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, exceptions, _
+
+import json, logging, time, traceback
+_logger = logging.getLogger(__name__)
+
+class CarpentryImportJob(models.Model):
+    """ Background execution of an import wizard: the wizard's values and its
+        uploaded file are persisted, then processed by cron `_cron_process_jobs`
+        (see `carpentry.import.job.mixin`)
+    """
+    _name = 'carpentry.import.job'
+    _description = 'Import job'
+    _order = 'id desc'
+
+    # a running job without progress since this delay is considered interrupted (e.g. worker killed)
+    _stale_timeout = 60 # minutes
+
+    name = fields.Char(string='Import', required=True, readonly=True)
+    state = fields.Selection(
+        selection=[
+            ('pending', 'Pending'),
+            ('running', 'Running'),
+            ('done', 'Done'),
+            ('failed', 'Failed'),
+        ],
+        string='State',
+        default='pending',
+        required=True,
+        readonly=True,
+    )
+    user_id = fields.Many2one(
+        comodel_name='res.users',
+        string='User',
+        default=lambda self: self.env.user,
+        required=True,
+        readonly=True,
+    )
+    # wizard
+    res_model = fields.Char(string='Wizard model', required=True, readonly=True)
+    wizard_vals = fields.Json(readonly=True)
+    attachment_id = fields.Many2one(
+        comodel_name='ir.attachment',
+        string='File',
+        readonly=True,
+        ondelete='set null',
+    )
+    # record on which the import is done (e.g. project or manufacturing order)
+    target_model = fields.Char(readonly=True)
+    target_id = fields.Many2oneReference(model_field='target_model', readonly=True)
+    # progress
+    progress = fields.Float(string='Progress', readonly=True)
+    progress_message = fields.Char(string='Step', readonly=True)
+    date_start = fields.Datetime(string='Start', readonly=True)
+    date_end = fields.Datetime(string='End', readonly=True)
+    timings = fields.Json(readonly=True)
+    error = fields.Text(string='Error', readonly=True)
+
+    #===== Queue =====#
+    @api.model
+    def _enqueue(self, wizard, name, file_field, filename_field, target=None):
+        """ Persist `wizard` as a pending job and wake up the cron
+
+            Jobs are run as their `user_id`: users cannot create nor write jobs,
+            which are only created here in sudo, always for the current user
+
+            :return: job record
+        """
+        vals = wizard._get_import_job_vals(exclude=[file_field, filename_field])
+        filename = wizard[filename_field] or name
+        job = self.sudo().create({
+            'name': name,
+            'user_id': self.env.uid,
+            'res_model': wizard._name,
+            'wizard_vals': vals,
+            'target_model': target and target._name,
+            'target_id': target and target.id,
+        })
+        job.attachment_id = self.env['ir.attachment'].sudo().create({
+            'name': filename,
+            'datas': wizard[file_field],
+            'res_model': self._name,
+            'res_id': job.id,
+        })
+        self.env.ref('carpentry_base.ir_cron_carpentry_import_job').sudo()._trigger()
+        return self.browse(job.id)
+
+    @api.model
+    def _cron_process_jobs(self, limit=1):
+        """ Claim and run pending jobs, 1 transaction per job """
+        for __ in range(limit):
+            job = self._claim_job()
+            if not job:
+                break
+            job._run()
+
+    def _claim_job(self, job_id=None):
+        """ Lock the oldest pending job (or `job_id`), so that concurrent
+            workers never run it twice. The lock is released by a commit, so
+            that the job's progress can be written by another transaction
+
+            :return: job record (or empty)
+        """
+        self._requeue_stale_jobs()
+        self.env.cr.execute("""
+            UPDATE carpentry_import_job
+            SET state = 'running', date_start = now() at time zone 'UTC', write_date = now() at time zone 'UTC'
+            WHERE id = (
+                SELECT id FROM carpentry_import_job
+                WHERE state = 'pending' AND (%(job_id)s IS NULL OR id = %(job_id)s)
+                ORDER BY id
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id
+        """, {'job_id': job_id})
+        row = self.env.cr.fetchone()
+        self._commit()
+        self.invalidate_model(['state', 'date_start', 'write_date'])
+        return self.browse(row and row[0])
+
+    def _requeue_stale_jobs(self):
+        """ Set back to pending the running jobs whose worker died: their progress
+            (which refreshes `write_date`) was not updated since `_stale_timeout`
+        """
+        self.env.cr.execute("""
+            UPDATE carpentry_import_job
+            SET state = 'pending', progress = 0.0, progress_message = NULL
+            WHERE state = 'running'
+            AND write_date < (now() at time zone 'UTC') - make_interval(mins => %s)
+            RETURNING id
+        """, (self._stale_timeout,))
+        job_ids = [row[0] for row in self.env.cr.fetchall()]
+        if job_ids:
+            _logger.warning('[%s] stale jobs %s set back to pending', self._name, job_ids)
+            self.invalidate_model(['state', 'progress', 'progress_message'])
+
+    def _commit(self):
+        if not self.env.registry.in_test_mode():
+            self.env.cr.commit()
+
+    #===== Run =====#
+    def button_run(self):
+        """ Run a pending job in the current worker (e.g. locally, without cron) """
+        self.ensure_one()
+        self._check_job_owner()
+        job = self._claim_job(self.id)
+        if not job:
+            raise exceptions.UserError(_('Only pending jobs can be run.'))
+        job._run()
+
+    def button_retry(self):
+        self._check_job_owner()
+        self.filtered(lambda x: x.state == 'failed').sudo().write({
+            'state': 'pending', 'progress': 0.0, 'progress_message': False, 'error': False,
+        })
+        self.env.ref('carpentry_base.ir_cron_carpentry_import_job').sudo()._trigger()
+
+    def _check_job_owner(self):
+        """ Only the job's owner or an administrator may (re-)run it """
+        if not self.env.is_admin() and any(job.user_id != self.env.user for job in self):
+            raise exceptions.AccessError(_('Only the user who started an import, or an administrator, can run it.'))
+
+    def _run(self):
+        """ Re-create the wizard as the job's user and run its import
+
+            The import's transaction never writes the job's row: it is updated by
+            `_write_job` in other transactions, which would make it fail on serialization
+        """
+        self.ensure_one()
+        time_start = time.time()
+        try:
+            with self.env.cr.savepoint():
+                wizard = self._get_wizard()
+                timings = wizard.with_context(carpentry_import_job_id=self.id)._run_import_job() or {}
+        except Exception as e:
+            self.env.invalidate_all()
+            _logger.exception('[%s] job %s failed', self._name, self.id)
+            vals = {
+                'state': 'failed',
+                'error': '%s\n\n%s' % (e, traceback.format_exc()),
+            }
+            body = _('Import "%s" failed: %s', self.name, e)
+        else:
+            vals = {
+                'state': 'done',
+                'progress': 100.0,
+                'timings': timings,
+            }
+            body = _('Import "%s" done in %.0fs.', self.name, time.time() - time_start)
+        
+        self._commit() # import's result, before its job is marked as done
+        self._write_job(vals | {'date_end': fields.Datetime.now()})
+        self._notify_target(body)
+        self._commit()
+
+    def _get_wizard(self):
+        Wizard = self.env[self.res_model].with_user(self.user_id)
+        return Wizard.create(self.wizard_vals | Wizard._get_import_job_file_vals(self.attachment_id))
+
+    def _notify_target(self, body):
+        target = self.target_model and self.env[self.target_model].browse(self.target_id).exists()
+        if target and hasattr(target, 'message_post'):
+            target.message_post(body=body, message_type='notification', subtype_xmlid='mail.mt_note')
+
+    #===== Progress =====#
+    @api.model
+    def _set_progress(self, job_id, phase, done=None, total=None):
+        """ Write job's progress in a separate transaction, so it is
+            visible while the import's transaction is running
+        """
+        vals = {'progress_message': phase if not total else '%s (%s/%s)' % (phase, done, total)}
+        if total:
+            vals['progress'] = round(100.0 * (done or 0) / total, 1)
+        self.browse(job_id)._write_job(vals)
+
+    def _write_job(self, vals):
+        """ Write jobs' row in a separate and committed transaction (also refreshing `write_date`)
+            :arg vals: dict of stored fields, values as in `write()`
+        """
+        columns = ', '.join(f'{fname} = %s' for fname in vals)
+        params = [
+            json.dumps(value) if self._fields[fname].type == 'json' else value
+            for fname, value in vals.items()
+        ]
+        with self.env.registry.cursor() as cr:
+            cr.execute(f"""
+                UPDATE {self._table}
+                SET {columns}, write_date = now() at time zone 'UTC'
+                WHERE id IN %s
+            """, params + [tuple(self.ids)])
+        self.invalidate_recordset(list(vals) + ['write_date'])
+
+
+class CarpentryImportJobMixin(models.AbstractModel):
+    """ Adds a *background* mode to import wizards:
+        - `button_import` must call `_enqueue_import_job` when `import_async` is set
+        - `_run_import_job` is the synchronous import, run by the job
+    """
+    _name = 'carpentry.import.job.mixin'
+    _description = 'Import job mixin'
+
+    _import_job_file_field = 'import_file'
+    _import_job_filename_field = 'filename'
+
+    import_async = fields.Boolean(
+        string='Run in background',
+        default=False,
+        help='The import is processed by a background worker, and its result is'
+             ' posted in the chatter. Recommended for big files.',
+    )
+
+    def _is_import_async(self):
+        return self.import_async and not self._context.get('carpentry_import_job_id')
+
+    def _get_import_job_name(self):
+        return '%s: %s' % (self._description, self[self._import_job_filename_field] or '')
+
+    def _get_import_job_target(self):
+        """ To inherite: record on which the import's result is posted """
+        return None
+
+    def _enqueue_import_job(self):
+        self.ensure_one()
+        self._check_import_job()
+        job = self.env['carpentry.import.job']._enqueue(
+            wizard=self,
+            name=self._get_import_job_name(),
+            file_field=self._import_job_file_field,
+            filename_field=self._import_job_filename_field,
+            target=self._get_import_job_target(),
+        )
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': job._name,
+            'res_id': job.id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
+
+    def _run_import_job(self):
+        """ To inherite: run the import synchronously
+            :return: optional dict of timings per phase
+        """
+        self._check_import_job()
+
+    def _check_import_job(self):
+        """ Wizards must implement `_run_import_job`: checked before enqueuing the job """
+        if type(self)._run_import_job is CarpentryImportJobMixin._run_import_job:
+            raise exceptions.UserError(_(
+                'Import "%s" cannot run in background: its wizard does not'
+                ' implement `_run_import_job()`.', self._description
+            ))
+
+    def _get_import_job_vals(self, exclude=[]):
+        """ Stored values of the wizard, as json-compatible `vals` for its re-creation """
+        fnames = [
+            name for name, field in self._fields.items()
+            if field.store and not field.automatic and name not in exclude
+            and name != 'import_async'
+        ]
+        vals = self._convert_to_write({name: self[name] for name in fnames})
+        return json.loads(json.dumps(vals, default=str))
+
+    @api.model
+    def _get_import_job_file_vals(self, attachment):
+        return {
+            self._import_job_file_field: attachment.datas,
+            self._import_job_filename_field: attachment.name,
+        }
+
+    def _set_import_job_progress(self, phase, done=None, total=None):
+        job_id = self._context.get('carpentry_import_job_id')
+        if job_id:
+            self.env['carpentry.import.job']._set_progress(job_id, phase, done, total)
@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+
+from .sql import sql_id_hash
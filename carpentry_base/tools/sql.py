@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+
+def sql_id_hash(*columns):
+    """ SQL expression of a stable `id` for SQL views, hashed from the row's key `columns`
+        instead of `row_number()`, which sorts the whole view and shifts ids between reads.
+        52 bits, to fit in a javascript integer.
+
+        :arg columns: SQL expressions making the row unique (i.e. the view's GROUP BY)
+    """
+    sql_key = ', ' . join([f"COALESCE(({column})::text, '')" for column in columns])
+    return f"('x' || substr(md5(concat_ws('-', {sql_key})), 1, 13))::bit(52)::bigint"
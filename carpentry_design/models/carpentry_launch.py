@@ -10,3 +10,15 @@ class Launch(models.Model):
         string='Plan set',
         domain="[('project_id', '=', project_id)]"
     )
+
+    def write(self, vals):
+        """ Plan releases' `launch_ids` is related to their plan set: refresh
+            their planning card index when launches move between plan sets
+        """
+        plan_set_ids = self.plan_set_id if 'plan_set_id' in vals else None
+        res = super().write(vals)
+        if plan_set_ids is not None:
+            releases = (plan_set_ids | self.plan_set_id).plan_release_ids
+            releases._refresh_planning_card_index()
+            releases._log_planning_changes()
+        return res
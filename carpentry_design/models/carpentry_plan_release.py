@@ -100,6 +100,10 @@ class PlanRelease(models.Model):
             release.week_visa_feedback = bool(release.date_visa_feedback) and release.date_visa_feedback.isocalendar()[1]
     
     #===== Planning =====#
+    @api.model
+    def _get_planning_card_index_fields(self):
+        return super()._get_planning_card_index_fields() + ['plan_set_id', 'date_plan_publish']
+    
     @api.depends('date_plan_publish')
     def _compute_sequence(self):
         for release in self:
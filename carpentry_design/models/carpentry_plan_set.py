@@ -60,6 +60,13 @@ class PlanSet(models.Model):
         for plan in self:
             plan.last_release_id = fields.first(plan.plan_release_ids)
 
+    #===== CRUD =====#
+    def write(self, vals):
+        """ Plan releases' cards show their plan set's data """
+        res = super().write(vals)
+        self.plan_release_ids._log_planning_changes()
+        return res
+
     #===== Button =====#
     def action_open_planning_task_tree(self):
         return self.env['project.task'].action_open_planning_tree(record_id=self)
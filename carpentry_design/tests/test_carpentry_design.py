@@ -33,4 +33,39 @@ class TestCarpentryDesign(TestCarpentryGroup_Base):
             self.release2.week_visa_feedback,
             date_ref.isocalendar().week + 1
         )
-    
\ No newline at end of file
+    
+    #===== carpentry.planning.card =====#
+    def test_03_planning_card_index(self):
+        """ Cards of plan releases are searched by launch in the card index,
+            which follows launches moving between plan sets
+        """
+        self.env['ir.config_parameter'].sudo().set_param('carpentry.planning_card_index', 'True')
+        column = self.env['carpentry.planning.column'].with_context(no_test_mirroring_column_id=True).create({
+            'name': 'Column Test Releases',
+            'res_model_id': self.env['ir.model']._get_id('carpentry.plan.release'),
+            'icon': 'fa-xxx',
+        })
+        Card = self.env['carpentry.planning.card'].with_context(test_mode=True)
+        Card._rebuild_sql_view()
+
+        def _get_releases(launch):
+            cards = Card.search([('column_id', '=', column.id), ('launch_ids', '=', launch.id)])
+            return self.env['carpentry.plan.release'].browse(cards.mapped('res_id'))
+        
+        self.assertEqual(_get_releases(self.launch), self.release1 | self.release2)
+
+        # new release
+        release3 = self.env['carpentry.plan.release'].create({'name': 'Test C', 'plan_set_id': self.plan_set.id})
+        self.assertIn(release3, _get_releases(self.launch))
+
+        # launch removed from the plan set
+        self.plan_set.launch_ids = [Command.unlink(self.launch.id)]
+        self.assertFalse(_get_releases(self.launch))
+
+        # release deleted
+        release3.unlink()
+        self.env.cr.execute(
+            "SELECT COUNT(*) FROM carpentry_planning_card_index WHERE res_model = %s AND res_id = %s",
+            (release3._name, release3.id)
+        )
+        self.assertFalse(self.env.cr.fetchone()[0])
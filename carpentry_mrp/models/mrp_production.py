@@ -9,6 +9,14 @@ class ManufacturingOrder(models.Model):
     _rec_name = 'display_name'
     _rec_names_search = ['name', 'description']
 
+    #===== CRUD =====#
+    def write(self, vals):
+        """ Components' `launch_ids` follow their MO's ones (planning card index) """
+        res = super().write(vals)
+        if 'launch_ids' in vals:
+            self.move_raw_ids._refresh_planning_card_index()
+        return res
+
     #===== Fields methods =====#
     def _compute_display_name(self):
         for mo in self:
@@ -85,6 +93,10 @@ class ManufacturingOrder(models.Model):
         super()._action_cancel()
         move_done = self.move_raw_ids.filtered(lambda x: x.state in ('done'))
         move_done.quantity_done = 0.0
+    
+    def _refresh_components_import(self):
+        """ To inherite: MO-level refresh deferred after components import """
+        return
 
     #===== Planning =====#
     def _get_planning_domain(self):
@@ -46,6 +46,27 @@ class StockMove(models.Model):
         raw_material_ids.product_id.stock_quant_ids.check_negative_qty() # ALY - 2025-08-21 : to be removed when `mrp_raw_material_confirmation` is ready
         return res
     
+    @api.model
+    def _get_planning_card_index_fields(self):
+        """ `launch_ids` is computed from the picking's or MO's ones """
+        return super()._get_planning_card_index_fields() + ['picking_id', 'raw_material_production_id']
+    
+    def _log_planning_changes(self):
+        """ MO's cards show their components' availability """
+        super()._log_planning_changes()
+        self.raw_material_production_id._log_planning_changes()
+    
+    @api.model
+    def _get_planning_changes_fields(self):
+        """ Add components' fields MO's cards depend on """
+        MO = self.env['mrp.production']
+        return super()._get_planning_changes_fields() | {
+            path.split('.')[1]
+            for fname in MO._get_planning_changes_fields() if fname in MO._fields
+            for path in self.pool.field_depends[MO._fields[fname]]
+            if path.startswith('move_raw_ids.')
+        }
+    
     def _synch_product_uom_qty_done(self):
         """ Updates any `product_uom_qty` >= `quantity_done` to `quantity_done` """
         for move in self:
@@ -32,6 +32,14 @@ class StockPicking(models.Model):
         domain="[('project_id', '=', project_id), ('state', 'not in', ['done', 'cancel'])]"
     )
 
+    #===== CRUD =====#
+    def write(self, vals):
+        """ Moves' `launch_ids` follow their picking's ones (planning card index) """
+        res = super().write(vals)
+        if 'launch_ids' in vals:
+            self.move_ids._refresh_planning_card_index()
+        return res
+
     #===== Compute =====#
     @api.depends(
         'purchase_id', 'purchase_id.launch_ids', 'purchase_id.description',
@@ -45,6 +53,9 @@ class StockPicking(models.Model):
             picking.launch_ids = po.launch_ids | mo.launch_ids
             if po or len(mo) == 1:
                 picking.description = po.description if po else mo.description
+        
+        # stored compute (not written with `write()`): moves' `launch_ids` follow
+        self.filtered('id').move_ids._refresh_planning_card_index()
 
     @api.model
     def _search_launch_ids(self, operator, value):
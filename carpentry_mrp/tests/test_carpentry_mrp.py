@@ -33,3 +33,25 @@ class TestCarpentryMrp(TestCarpentryMrp_Base):
         self.assertFalse(self.move_raw_product4.is_done)
         self.move_raw_product4.quantity_done = self.PRODUCT_UOM_QTY
         self.assertTrue(self.move_raw_product4.is_done)
+
+    def test_02_planning_card_index_components(self):
+        """ Test components' rows in planning card index follow their MO's launches """
+        self.env['ir.config_parameter'].sudo().set_param('carpentry.planning_card_index', 'True')
+        self.env['carpentry.planning.column'].with_context(no_test_mirroring_column_id=True).create({
+            'name': 'Column Test Components',
+            'res_model_id': self.env['ir.model']._get_id('stock.move'),
+            'icon': 'fa-xxx',
+        })
+        
+        def _get_launch_ids():
+            self.env.cr.execute("""
+                SELECT launch_id FROM carpentry_planning_card_index
+                WHERE res_model = 'stock.move' AND res_id IN %s
+            """, (tuple(self.mo.move_raw_ids.ids),))
+            return {row[0] for row in self.env.cr.fetchall()}
+        
+        launch = self.env['carpentry.group.launch'].create({'name': 'Launch Test', 'project_id': self.project.id})
+        self.mo.launch_ids = launch
+        self.assertEqual(_get_launch_ids(), {launch.id})
+        self.mo.launch_ids = False
+        self.assertFalse(_get_launch_ids())
@@ -6,3 +6,4 @@ from . import mrp_production
 from . import mrp_workorder
 from . import stock_picking
 from . import stock_valuation_layer
+from . import mrp_workcenter_productivity
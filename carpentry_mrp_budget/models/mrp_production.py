@@ -167,6 +167,11 @@ class ManufacturingOrder(models.Model):
         
         return super()._compute_reservation_ids(vals)
     
+    def _refresh_components_import(self):
+        """ Update reservation matrix once, after all components are imported """
+        super()._refresh_components_import()
+        self._compute_reservation_ids()
+    
     def _auto_update_budget_reservation(self, rg_result):
         """ Don't update components amounts while updating workorders budgets """
         if self._context.get('budget_analytic_ids_workorders_inverse'):
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+
+class MrpWorkcenterProductivity(models.Model):
+    _inherit = ['mrp.workcenter.productivity']
+
+    #===== CRUD: expense store =====#
+    @api.model_create_multi
+    def create(self, vals_list):
+        times = super().create(vals_list)
+        times._mark_store_dirty()
+        return times
+
+    def write(self, vals):
+        self._mark_store_dirty()
+        res = super().write(vals)
+        self._mark_store_dirty()
+        return res
+    
+    def unlink(self):
+        self._mark_store_dirty()
+        return super().unlink()
+    
+    def _mark_store_dirty(self):
+        """ Workorders' expenses are summed per MO (see `carpentry.budget.expense.detail`) """
+        self.env['carpentry.budget.expense.detail']._mark_store_dirty(self.workorder_id.production_id)
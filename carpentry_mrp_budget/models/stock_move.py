@@ -32,5 +32,26 @@ class StockMove(models.Model):
             move.analytic_distribution = distribution or move.analytic_distribution
         
         self._compute_analytic_distribution_carpentry()
+
+    #===== CRUD: expense store =====#
+    @api.model_create_multi
+    def create(self, vals_list):
+        moves = super().create(vals_list)
+        moves._mark_store_dirty()
+        return moves
+
+    def write(self, vals):
+        self._mark_store_dirty()
+        res = super().write(vals)
+        self._mark_store_dirty()
+        return res
+    
+    def unlink(self):
+        self._mark_store_dirty()
+        return super().unlink()
     
-    
\ No newline at end of file
+    def _mark_store_dirty(self):
+        """ Expenses of moves are summed per picking and MO (see `carpentry.budget.expense.detail`) """
+        Detail = self.env['carpentry.budget.expense.detail']
+        Detail._mark_store_dirty(self.picking_id)
+        Detail._mark_store_dirty(self.raw_material_production_id)
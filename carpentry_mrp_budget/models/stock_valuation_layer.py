@@ -20,3 +20,20 @@ class StockValuationLayer(models.Model):
         related='stock_move_id.picking_id.picking_type_id',
         store=True
     )
+
+    #===== CRUD: expense store =====#
+    @api.model_create_multi
+    def create(self, vals_list):
+        layers = super().create(vals_list)
+        layers.stock_move_id._mark_store_dirty()
+        return layers
+
+    def write(self, vals):
+        self.stock_move_id._mark_store_dirty()
+        res = super().write(vals)
+        self.stock_move_id._mark_store_dirty()
+        return res
+    
+    def unlink(self):
+        self.stock_move_id._mark_store_dirty()
+        return super().unlink()
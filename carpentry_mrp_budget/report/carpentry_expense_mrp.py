@@ -22,6 +22,9 @@ class CarpentryExpense(models.Model):
             'mrp.workorder' # lines are mrp.workorders (actually: mrp.workcenter.productivity)
         )
     
+    def _get_store_flush_models(self):
+        return super()._get_store_flush_models() + ['stock.move', 'stock.valuation.layer', 'mrp.workcenter.productivity',]
+    
     def _select(self, model, models):
         sql_active = "record.state NOT IN ('cancel')"
         if model in ('mrp.production', 'mrp.workorder'):
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api, exceptions, _, Command
+from collections import defaultdict
 
 class ProductProduct(models.Model):
     _inherit = ['product.product']
@@ -21,6 +22,21 @@ class ProductProduct(models.Model):
     )
 
 
+    #===== CRUD =====#
+    def write(self, vals):
+        self._clear_substitution_map(vals)
+        return super().write(vals)
+    
+    def unlink(self):
+        self._clear_substitution_map()
+        return super().unlink()
+
+    def _clear_substitution_map(self, vals=None):
+        """ Clear the cached map of substitution references if target products change """
+        fnames = ('default_code', 'name', 'uom_id')
+        if (vals is None or any(x in vals for x in fnames)) and self.sudo().substitution_ids:
+            self.env['product.substitution'].clear_caches()
+
     #===== Constrain =====#
     @api.constrains('substitution_ids')
     def _constrain_subsitution_chained(self):
@@ -43,3 +59,34 @@ class ProductProduct(models.Model):
         }
         for product in self:
             product.substitution_product_id = mapped_substitution_ids.get(product.default_code)
+
+    #===== Import: product resolution =====#
+    @api.model
+    def _resolve_products(self, keys, fnames=('default_code', 'name')):
+        """ Resolve products of an import from `keys` (e.g. codes or names of a file),
+            with 1 `IN` query per field of `fnames`, by priority (e.g. by code, then by name)
+            and only for the keys not found yet
+
+            :arg keys: iterable of searched values
+            :arg fnames: fields to search `keys` in, like `default_code`
+                         or `substitution_ids.substituted_code`
+            :return: tuple (
+                `mapped_products`: dict like {key: products}
+                `misses`: list of keys without product, in order of `keys`
+            )
+        """
+        keys = list(keys)
+        mapped_product_ids = defaultdict(list)
+        for fname in fnames:
+            todo = {key for key in keys if key and key not in mapped_product_ids}
+            if not todo:
+                break
+            
+            for product in self.search([(fname, 'in', list(todo))]):
+                for value in product.mapped(fname):
+                    if value in todo:
+                        mapped_product_ids[value].append(product.id)
+        
+        mapped_products = {key: self.browse(ids) for key, ids in mapped_product_ids.items()}
+        misses = [key for key in keys if key not in mapped_products]
+        return mapped_products, misses
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api, exceptions, _, Command
+from odoo import models, fields, api, exceptions, tools, _, Command
 
 class ProductSubstitutionCode(models.Model):
     """ For product.product, stores alternatives `default_code`
@@ -55,9 +55,42 @@ class ProductSubstitutionCode(models.Model):
     #         ))
 
     #===== CRUD / clean =====#
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.clear_caches() # substitution map
+        return super().create(vals_list)
+
     def write(self, vals):
         """ Clean substitution references not linked to any `product_id` """
+        self.clear_caches()
         res = super().write(vals)
         if 'product_id' in vals and not self.product_id:
             self.unlink()
         return res
+    
+    def unlink(self):
+        self.clear_caches()
+        return super().unlink()
+
+    #===== Substitution map (import) =====#
+    @api.model
+    @tools.ormcache('self.env.lang')
+    def _get_substitution_map(self):
+        """ Map of all substitution references, cached at registry level
+            and cleared on any change of substitution references (or of their target products)
+            (!) shared between calls: do not modify the result
+
+            :return: dict like {substituted_code: {
+                'product_id': ..., 'default_code': ..., 'name': ..., 'uom_name': ...
+            }} (old -> new)
+        """
+        substitutions = self.sudo().with_context(active_test=False).search([])
+        return {
+            substitution.substituted_code: {
+                'product_id': substitution.product_id.id,
+                'default_code': substitution.product_id.default_code,
+                'name': substitution.product_id.name,
+                'uom_name': substitution.product_id.uom_name,
+            }
+            for substitution in substitutions
+        }
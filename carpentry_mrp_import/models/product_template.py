@@ -21,6 +21,11 @@ class ProductTemplate(models.Model):
         compute='_compute_substitution_product_id'
     )
 
+    #===== CRUD =====#
+    def write(self, vals):
+        self.product_variant_ids._clear_substitution_map(vals)
+        return super().write(vals)
+
     #===== Substitution codes =====#
     def _get_related_fields_variant_template(self):
         """ Return a list of fields present on template and variants models and that are related"""
@@ -5,6 +5,7 @@ from odoo.tests import common, Form
 from odoo.tools import file_open
 
 import base64
+from unittest.mock import patch
 
 class TestCarpentryMrpImport(common.SingleTransactionCase):
 
@@ -119,3 +120,95 @@ class TestCarpentryMrpImport(common.SingleTransactionCase):
         wizard = self._load_wizard('byproduct')
         wizard.button_import()
         self.assertTrue(self.mo.move_byproduct_ids)
+
+    def test_08_resolve_products(self):
+        """ Tests products resolution by code, then name, and by substituted code """
+        keys = ['205082', 'Replacement', 'unknown']
+        mapped_products, misses = self.Product._resolve_products(keys)
+        self.assertEqual(mapped_products, {'205082': self.storable, 'Replacement': self.replacement})
+        self.assertEqual(misses, ['unknown'])
+
+        mapped_products, misses = self.Product._resolve_products(
+            [self.SUBSTITUTED_CODE_1, '205082'],
+            ['substitution_ids.substituted_code']
+        )
+        self.assertEqual(mapped_products, {self.SUBSTITUTED_CODE_1: self.replacement})
+        self.assertEqual(misses, ['205082'])
+
+    def test_09_substitution_map(self):
+        """ Tests the cached substitution map is cleared on substitution & product changes """
+        Substitution = self.env['product.substitution']
+        substitution = Substitution._get_substitution_map().get(self.SUBSTITUTED_CODE_1)
+        self.assertEqual(substitution['product_id'], self.replacement.id)
+
+        self.replacement.default_code = 'replacement2'
+        substitution = Substitution._get_substitution_map().get(self.SUBSTITUTED_CODE_1)
+        self.assertEqual(substitution['default_code'], 'replacement2')
+
+        self.replacement.substitution_ids.filtered(
+            lambda x: x.substituted_code == self.SUBSTITUTED_CODE_1
+        ).unlink()
+        self.assertNotIn(self.SUBSTITUTED_CODE_1, Substitution._get_substitution_map())
+
+    def test_10_background_import(self):
+        """ Tests the import is queued as a job, and run by the cron """
+        wizard = self._load_wizard('byproduct')
+        wizard.import_async = True
+        count_byproducts = len(self.mo.move_byproduct_ids)
+        action = wizard.button_import()
+        job = self.env['carpentry.import.job'].browse(action['res_id'])
+        self.assertEqual(job.state, 'pending')
+        self.assertEqual(len(self.mo.move_byproduct_ids), count_byproducts)
+
+        job._cron_process_jobs()
+        job.invalidate_recordset()
+        self.assertEqual(job.state, 'done')
+        self.mo.invalidate_recordset(['move_byproduct_ids'])
+        self.assertGreater(len(self.mo.move_byproduct_ids), count_byproducts)
+
+    def test_10b_background_import_stale(self):
+        """ Tests a job left running by a dead worker is claimed again """
+        wizard = self._load_wizard('byproduct')
+        wizard.import_async = True
+        job = self.env['carpentry.import.job'].browse(wizard.button_import()['res_id'])
+        self.env.flush_all()
+        self.env.cr.execute("""
+            UPDATE carpentry_import_job
+            SET state = 'running', write_date = (now() at time zone 'UTC') - interval '1 day'
+            WHERE id = %s
+        """, (job.id,))
+        job.invalidate_recordset()
+
+        self.assertEqual(job._claim_job(job.id), job)
+        job._run()
+        job.invalidate_recordset()
+        self.assertEqual(job.state, 'done')
+
+    def test_10c_background_import_access(self):
+        """ Tests jobs belong to their creator: other users can neither see, write nor run them """
+        wizard = self._load_wizard('byproduct')
+        wizard.import_async = True
+        job = self.env['carpentry.import.job'].browse(wizard.button_import()['res_id'])
+        self.assertEqual(job.user_id, self.env.user)
+
+        other_user = self.env['res.users'].create({
+            'name': 'Import Job User Test',
+            'login': 'import_job_user_test',
+            'groups_id': [Command.set(self.env.ref('base.group_user').ids)],
+        })
+        Job = self.env['carpentry.import.job'].with_user(other_user)
+        self.assertFalse(Job.search([('id', '=', job.id)]))
+        with self.assertRaises(exceptions.AccessError):
+            Job.create({'name': 'Job Test', 'res_model': wizard._name, 'user_id': self.env.uid})
+        with self.assertRaises(exceptions.AccessError):
+            job.with_user(other_user).button_run()
+
+    def test_11_report_csv_sections(self):
+        """ Tests long sections of the report are exported in CSV files """
+        byproducts = [{'description_picking': 'Position %s' % i, 'product_uom_qty': 1} for i in range(3)]
+        with patch.object(type(self.wizard), '_report_csv_threshold', 2):
+            attachments = self.wizard._make_report({}, byproducts, [], [], [])
+        self.assertEqual(len(attachments), 2)
+        self.assertEqual(set(attachments.mapped('mimetype')), {
+            'text/csv', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        })
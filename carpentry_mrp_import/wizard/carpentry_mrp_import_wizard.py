@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api, exceptions, _, Command
-import io, openpyxl, os, logging
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import NamedStyle, Font, PatternFill
+from openpyxl.utils import get_column_letter
+import csv, io, openpyxl, tempfile, logging
 _logger = logging.getLogger(__name__)
 
 EXTERNAL_DB_TYPE = [
@@ -12,9 +15,11 @@ SEPARATOR_COLOR = '-' # example: "174170-RAL7016 Sat 30"
 class CarpentryMrpImportWizard(models.TransientModel):
     _name = "carpentry.mrp.import.wizard"
     _description = "Carpentry MRP Import Wizard"
-    _inherit = ['utilities.file.mixin', 'utilities.database.mixin']
+    _inherit = ['utilities.file.mixin', 'utilities.database.mixin', 'carpentry.import.job.mixin']
 
-    REPORT_FILENAME = 'report/report_mrp_component.xlsx'
+    REPORT_COLUMN_WIDTHS = (20, 36, 14, 15, 12)
+    _report_csv_threshold = 5000 # rows of a report's section above which it is exported in a CSV file
+    _report_spool_size = 10 * 1024 * 1024 # bytes of a report file kept in memory, before spooling on disk
 
     #===== Fields =====#
     mode = fields.Selection(
@@ -78,6 +83,15 @@ class CarpentryMrpImportWizard(models.TransientModel):
         if not self.import_file:
             raise exceptions.UserError(_('Please upload a file.'))
 
+        if self._is_import_async():
+            return self._enqueue_import_job()
+        return self._run_import_job()
+    
+    #===== Background import (`carpentry.import.job.mixin`) =====#
+    def _get_import_job_target(self):
+        return self.production_id
+
+    def _run_import_job(self):
         if self.mode == 'component':
             return self._action_import_component()
         elif self.mode == 'byproduct':
@@ -106,34 +120,27 @@ class CarpentryMrpImportWizard(models.TransientModel):
 
     #===== Import logics (Byproducts) =====#
     def _run_import_byproduct(self, vals_list):
-        # Search the products from `product_code_or_name`
-        byproducts = self.env['product.product'].search([])
+        # Search the products from `product_code_or_name`, by code and then by name
+        keys = [vals.get('product_code_or_name') for vals in vals_list]
+        mapped_products, __ = self.env['product.product']._resolve_products(keys)
         not_found = []
         for row, vals in enumerate(vals_list, start=2):
-            product_data = vals.get('product_code_or_name')
-            product = self._find_product(byproducts, product_data)
+            product_data = vals.pop('product_code_or_name')
+            product = mapped_products.get(product_data)
             if not product:
                 not_found.append(f'Row {row}: {product_data}')
             else:
                 vals['product_id'] = product.id
-                vals.pop('product_code_or_name')
         
         if not_found:
             raise exceptions.UserError(
-                _('Unknown products:\n %s') % not_found.join('\n')
+                _('Unknown products:\n %s') % '\n'.join(not_found)
             )
         
         # Create mo's byproducts
         _logger.info(f'[_run_import_byproduct] vals_list: {vals_list}')
         self.production_id.move_byproduct_ids = [Command.create(vals) for vals in vals_list]
     
-    def _find_product(self, products, product_key):
-        """ Search product `products` by code, and then name if not found by code """
-        return (
-            products.filtered(lambda x: x.default_code == product_key) or
-            products.filtered(lambda x: x.name == product_key)
-        )
-    
     #===== Import logics (Components/Orgadata) =====#
     def _run_import_component(self, db_resource):
         """ Extract components and byproducts from Orgadata base
@@ -150,37 +157,41 @@ class CarpentryMrpImportWizard(models.TransientModel):
             6. Report (consumable, unknown, byproducts, ...) & message
         """
         # 0. Read Orgadata base
+        self._set_import_job_progress(_('Read'))
         components_valslist, byproducts_valslist = self._read_external_db(db_resource)
         self._close_db(db_resource) # close connection with external db
         
         # 1. Substitute
+        self._set_import_job_progress(_('Substitution'), 1, 6)
         mapped_components, substituted = self._substitute(components_valslist)
 
         # 2. Browse product.product
-        domain = [('default_code', 'in', list(mapped_components.keys()))]
         self = self.with_context(active_test=False) # for ignored products
-        self.product_ids = self.env['product.product'].search(domain)
+        Product = self.env['product.product']
+        mapped_products, misses = Product._resolve_products(mapped_components.keys(), ['default_code'])
+        self.product_ids = Product.union(*mapped_products.values())
 
         # 3. Unknown products
-        default_code_list = self.product_ids.mapped('default_code')
-        unknown = [v for k, v in mapped_components.items() if k not in default_code_list]
+        unknown = [mapped_components[key] for key in misses]
 
         # 4. Ignore
         self._ignore()
 
         # 5. Import
+        self._set_import_job_progress(_('Import'), 4, 6)
         self._import_components(mapped_components)
 
         # 6. Report & message
+        self._set_import_job_progress(_('Report'), 5, 6)
         consu = [
             mapped_components.get(x.product_id.default_code)
             for x in self.move_raw_ids.filtered(lambda x: x.product_id.type == 'consu')
         ]
         args = byproducts_valslist, substituted, unknown, consu
-        report_binary = self._make_report(mapped_components, *args)
+        report_attachments = self._make_report(mapped_components, *args)
 
         # chatter message
-        mail_values = self._get_chatter_message(*args, report_binary)
+        mail_values = self._get_chatter_message(*args, report_attachments)
         self.production_id.message_post(**mail_values)
 
     def _read_external_db(self, db_resource):
@@ -251,34 +262,30 @@ class CarpentryMrpImportWizard(models.TransientModel):
             'price': 0.0,
             'discount': 0.0
         }
-        mapped_substitution_product = {
-            x.substituted_code: x.product_id # old -> new
-            for x in self.env['product.substitution'].search([])
-        }
-        if mapped_substitution_product:
-            for vals in components_valslist:
-                metadata = vals # default_code, name, uom_name
-                default_code = vals['default_code']
-                substitution_product = mapped_substitution_product.get(default_code)
-                
-                # if the reference must be substituted
-                if substitution_product:
-                    # add old ref to `substituted` mapped dict
-                    substituted.append(vals)
-                    default_code = substitution_product.default_code
-                    metadata = {
-                        'default_code': default_code,
-                        'name': substitution_product.name,
-                        'uom_name': substitution_product.uom_name
-                    }
-                
-                # merge new ref in `mapped_components`
-                previous_vals = mapped_components.get(default_code, vals_default.copy())
-                mapped_components[default_code] = metadata | {
-                    'product_uom_qty': vals['product_uom_qty'] + previous_vals['product_uom_qty'],
-                    'price': __weighted_avg(previous_vals, vals, 'price'),
-                    'discount': __weighted_avg(previous_vals, vals, 'discount'),
+        mapped_substitution = self.env['product.substitution']._get_substitution_map() # old -> new
+        for vals in components_valslist:
+            metadata = vals # default_code, name, uom_name
+            default_code = vals['default_code']
+            substitution = mapped_substitution.get(default_code)
+            
+            # if the reference must be substituted
+            if substitution:
+                # add old ref to `substituted` mapped dict
+                substituted.append(vals)
+                default_code = substitution['default_code']
+                metadata = {
+                    'default_code': default_code,
+                    'name': substitution['name'],
+                    'uom_name': substitution['uom_name']
                 }
+            
+            # merge new ref in `mapped_components`
+            previous_vals = mapped_components.get(default_code, vals_default.copy())
+            mapped_components[default_code] = metadata | {
+                'product_uom_qty': vals['product_uom_qty'] + previous_vals['product_uom_qty'],
+                'price': __weighted_avg(previous_vals, vals, 'price'),
+                'discount': __weighted_avg(previous_vals, vals, 'discount'),
+            }
         
         return mapped_components, substituted
 
@@ -292,7 +299,11 @@ class CarpentryMrpImportWizard(models.TransientModel):
     def _import_components(self, mapped_components):
         """ Update products prices (first)
             and add product materials as MO's components
+
+            Components are created in a single `stock.move.create()`, and MO-level
+            recomputes (budget reservations) are deferred to one pass at the end
         """
+        mo = self.production_id._origin
         component_vals_list = []
         # supplierinfo_vals_list, component_vals_list = [], []
         for product in self.product_ids:
@@ -313,8 +324,8 @@ class CarpentryMrpImportWizard(models.TransientModel):
             #     })
 
             # Create need (reservation)
-            component_vals_list.append(Command.create(
-                self.production_id._origin._get_move_raw_values(
+            component_vals_list.append(
+                mo._get_move_raw_values(
                     product,
                     data.get('product_uom_qty'),
                     product.uom_id,
@@ -323,7 +334,7 @@ class CarpentryMrpImportWizard(models.TransientModel):
                     # needed so it's not guessed by [Create] operation
                     # else these moves will be considered both as components *and* finished products
                     'production_id': False
-                })
+                }
             )
         
         # ALY, 2025-05-15 : don't import price from Orgadata
@@ -332,60 +343,79 @@ class CarpentryMrpImportWizard(models.TransientModel):
         #     self.supplierinfo_ids = self.env['product.supplierinfo'].sudo().create(supplierinfo_vals_list)
 
         if component_vals_list:
-            _logger.info(f'[_import_components] component_vals_list: {component_vals_list}')
-            self.production_id.move_raw_ids = component_vals_list
+            _logger.info('[_import_components] MO %s: %s components', mo.id, len(component_vals_list))
+            self._create_components(mo, component_vals_list)
+    
+    def _create_components(self, mo, component_vals_list):
+        """ Create `mo`'s components moves at once, like `mo.move_raw_ids` write would
+            but without budget reservation refresh, which is done once at the end
+        """
+        Move = self.env['stock.move'].with_context(carpentry_reservation_no_compute=True)
+        warehouse_id = mo.location_src_id.warehouse_id.id
+        for vals in component_vals_list:
+            vals.setdefault('warehouse_id', warehouse_id)
+        
+        moves = Move.create(component_vals_list)
+        if mo.state not in ('draft', 'cancel', 'done'):
+            # like `mrp.production.write()`: don't merge new components in existing raw moves
+            moves._adjust_procure_method()
+            moves._action_confirm(merge=False)
+        Move.env.flush_all()
+
+        # deferred MO-level recompute
+        mo._refresh_components_import()
 
     def _make_report(self, mapped_components, byproducts, substituted, unknown, consu):
-        def __write_section(start_row, title, cols, vals_list):
-            # Title
-            cell = 'A' + str(start_row)
-            sheet[cell] = title
-            sheet[cell].font = openpyxl.styles.Font(size=14, bold=True)
-            
-            # Headers
-            for col, header in enumerate(cols, start=1):
-                cell = sheet.cell(row=start_row+1, column=col)
-                cell.value = header
-                cell.font = openpyxl.styles.Font(bold=True)
-                cell.fill = openpyxl.styles.PatternFill("solid", fgColor="B4C7DC")
+        """ Write the import report in a *write-only* workbook, whose rows are streamed
+            to a temporary file instead of being kept as cells in memory.
+            Sections longer than `_report_csv_threshold` rows are written in CSV files
+
+            :return: `ir.attachment` of the report (and of its CSV sections) on the MO
+        """
+        workbook = openpyxl.Workbook(write_only=True)
+        for style in self._get_report_styles():
+            workbook.add_named_style(style)
+        sheet = workbook.create_sheet(_('Report'))
+        for col, width in enumerate(self.REPORT_COLUMN_WIDTHS, start=1):
+            sheet.column_dimensions[get_column_letter(col)].width = width
+        attachments = self.env['ir.attachment']
+
+        def __cell(value, style):
+            cell = WriteOnlyCell(sheet, value=value)
+            cell.style = style
+            return cell
+
+        def __write_section(title, cols, vals_list):
+            vals_list = [vals for vals in vals_list if vals]
+            sheet.append([__cell(title, 'carpentry_section')])
+            if len(vals_list) > self._report_csv_threshold:
+                attachment = self._make_report_csv(title, cols, vals_list)
+                sheet.append([_('%s lines, see file: %s', len(vals_list), attachment.name)])
+                sheet.append([])
+                return attachment
             
-            # Content
-            row_cursor = start_row+2 # title + header
+            sheet.append([__cell(header, 'carpentry_header') for header in cols])
             for vals in vals_list:
-                if not vals:
-                    continue
-                
-                for col, key in enumerate(list(cols.values()), start=1):
-                    sheet.cell(row=row_cursor, column=col).value = vals.get(key, '')
-                row_cursor += 1
-            
-            return row_cursor
-
-        # Load the Excel template
-        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../' + self.REPORT_FILENAME)
-        workbook = openpyxl.load_workbook(path)
-        sheet = workbook.active
+                sheet.append([vals.get(key, '') for key in cols.values()])
+            sheet.append([])
+            return self.env['ir.attachment']
 
         # Titles & translations
-        titles = {
-            'A1': _('Report for the import of manufacturing Components'),
-            'A2': _('Project'),
-            'A3': _('Manufacturing Order'),
-            'A4': _('Date'),
-            'B2': self.production_id.project_id.display_name,
-            'B3': self.production_id.display_name,
-            'B4': fields.Date.context_today(self),
-        }
-        for cell, text in titles.items():
-            sheet[cell] = text
+        sheet.append([__cell(_('Report for the import of manufacturing Components'), 'carpentry_title')])
+        sheet.append([__cell(_('Project'), 'carpentry_label'), self.production_id.project_id.display_name])
+        sheet.append([__cell(_('Manufacturing Order'), 'carpentry_label'), self.production_id.display_name])
+        sheet.append([
+            __cell(_('Date'), 'carpentry_label'),
+            __cell(fields.Date.context_today(self), 'carpentry_date'),
+        ])
+        sheet.append([])
 
         # Final products
-        row_cursor = 6
         cols = {
             _('Description'): 'description_picking',
             _('Quantity'): 'product_uom_qty',
         }
-        row_cursor = __write_section(row_cursor, _('Final products'), cols, byproducts) + 1
+        attachments |= __write_section(_('Final products'), cols, byproducts)
 
         # Components
         self = self.with_context(active_test=False)
@@ -404,17 +434,51 @@ class CarpentryMrpImportWizard(models.TransientModel):
             _('Unit Price'): 'price',
         }
         for section, vals_list in sections.items():
-            row_cursor = __write_section(row_cursor, section, cols, vals_list) + 1
-
-        # Save the file to a BytesIO stream
-        output_stream = io.BytesIO()
-        workbook.save(output_stream)
-        workbook.close()
-
-        output_stream.seek(0)
-        return output_stream.read() # binary, NOT base64 encoded for `message_post`
+            attachments |= __write_section(section, cols, vals_list)
+
+        # Save the file on disk (if big), and then as attachment
+        with tempfile.SpooledTemporaryFile(max_size=self._report_spool_size) as stream:
+            workbook.save(stream)
+            stream.seek(0)
+            report = self._create_report_attachment(_('Component & products report') + '.xlsx', stream.read())
+        return report | attachments
+
+    def _get_report_styles(self):
+        """ Named styles of the report, shared by all its cells """
+        return [
+            NamedStyle(name='carpentry_title', font=Font(size=16, bold=True)),
+            NamedStyle(name='carpentry_section', font=Font(size=14, bold=True)),
+            NamedStyle(name='carpentry_label', font=Font(bold=True)),
+            NamedStyle(name='carpentry_date', number_format='DD/MM/YYYY'),
+            NamedStyle(
+                name='carpentry_header',
+                font=Font(bold=True),
+                fill=PatternFill('solid', fgColor='B4C7DC'),
+            ),
+        ]
 
-    def _get_chatter_message(self, byproducts, substituted, unknown, consu, report_binary):
+    def _make_report_csv(self, title, cols, vals_list):
+        """ Write a section of the report in a CSV file, row per row """
+        with tempfile.SpooledTemporaryFile(max_size=self._report_spool_size) as stream:
+            text_stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+            writer = csv.writer(text_stream, delimiter=';')
+            writer.writerow(list(cols))
+            for vals in vals_list:
+                writer.writerow([vals.get(key, '') for key in cols.values()])
+            text_stream.flush()
+            text_stream.detach() # keep `stream` open
+            stream.seek(0)
+            return self._create_report_attachment(title + '.csv', stream.read())
+
+    def _create_report_attachment(self, name, raw):
+        return self.env['ir.attachment'].create({
+            'name': name,
+            'raw': raw,
+            'res_model': self.production_id._name,
+            'res_id': self.production_id.id,
+        })
+
+    def _get_chatter_message(self, byproducts, substituted, unknown, consu, report_attachments):
         return {
             'message_type': 'notification',
             'subtype_xmlid': 'mail.mt_note',
@@ -436,7 +500,5 @@ class CarpentryMrpImportWizard(models.TransientModel):
                 ignored=len(self.ignored_product_ids),
                 unknown=len(unknown),
             ),
-            'attachments': [] if not report_binary else [
-                (_('Component & products report'), report_binary)
-            ]
+            'attachment_ids': report_attachments.ids,
         }
@@ -17,6 +17,8 @@
         'carpentry_base', 'carpentry_position' # carpentry
     ],
     'data': [
+        # data
+        'data/ir_cron.xml',
         # wizard
         'wizard/carpentry_planning_milestone_wizard.xml',
         # views
@@ -2,15 +2,32 @@
 
 from odoo import models, fields, api, _, Command, tools, exceptions
 from odoo.osv import expression
+from odoo.tools import split_every
+from odoo.tools.misc import str2bool
 
 from collections import defaultdict
 
+from odoo.addons.carpentry_base.tools import sql_id_hash
+
 class CarpentryPlanningCard(models.Model):
     _name = 'carpentry.planning.card'
     _description = 'Planning Cards'
     _auto = False
     _order = 'sequence'
 
+    _index_table = 'carpentry_planning_card_index'
+    _index_chunk_size = 1000
+    _changes_table = 'carpentry_planning_change'
+    _changes_retention = 12 # hours
+
+    #===== Config =====#
+    def _get_setting_planning_card_index(self):
+        """ Whether cards are filtered per launch with the materialized table
+            `carpentry_planning_card_index` rather than through real records' `launch_ids`
+        """
+        IrConfig = self.env['ir.config_parameter'].sudo()
+        return str2bool(IrConfig.get_param('carpentry.planning_card_index', default='False'))
+
     #===== Fields methods =====#
     def _group_expand_column_id(self, records, domain, order):
         return self.env['carpentry.planning.column'].sudo().search([('fold', '=', False)])
@@ -46,7 +63,7 @@ class CarpentryPlanningCard(models.Model):
     display_name = fields.Char(compute='_compute_fields')
     shortname = fields.Char(compute='_compute_fields')
     state = fields.Char(compute='_compute_fields')
-    state_value = fields.Char(compute='_compute_state_value')
+    state_value = fields.Char(compute='_compute_fields')
     description = fields.Char(compute='_compute_fields')
     launch_ids = fields.One2many(
         comodel_name='carpentry.group.launch',
@@ -77,8 +94,38 @@ class CarpentryPlanningCard(models.Model):
             Odoo will throw an error in console if this module is installed alone (which is useless)
             but as soon as another module adds a `carpentry.planning.column`, this method
             `_rebuild_sql_view()` is trigger which (re)creates the needed view
+
+            Only the (optional) card index table is created here, since it has no foreign key
         """
-        return
+        self._cr.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self._index_table} (
+                column_id integer NOT NULL,
+                res_model varchar NOT NULL,
+                res_id integer NOT NULL,
+                project_id integer,
+                launch_id integer NOT NULL,
+                sequence integer,
+                active boolean
+            )
+        """)
+        tools.create_index(self._cr, f'{self._index_table}_launch_column_idx',
+            self._index_table, ['launch_id', 'column_id'])
+        tools.create_index(self._cr, f'{self._index_table}_res_idx',
+            self._index_table, ['res_model', 'res_id'])
+        
+        # change feed (see `get_planning_changes`)
+        self._cr.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self._changes_table} (
+                xid bigint NOT NULL DEFAULT txid_current(),
+                date timestamp NOT NULL DEFAULT (now() at time zone 'UTC'),
+                res_model varchar NOT NULL,
+                res_id integer NOT NULL
+            )
+        """)
+        tools.create_index(self._cr, f'{self._changes_table}_xid_idx',
+            self._changes_table, ['xid'])
+        tools.create_index(self._cr, f'{self._changes_table}_date_idx',
+            self._changes_table, ['date'])
     
     def _rebuild_sql_view(self):
         self.env['carpentry.planning.column'].flush_model()
@@ -114,7 +161,7 @@ class CarpentryPlanningCard(models.Model):
         self._cr.execute(f"""
             CREATE or REPLACE VIEW {self._table} AS (
                 SELECT
-                    row_number() OVER (ORDER BY column_id, res_id) AS id,
+                    {sql_id_hash('result.column_id', 'result.res_id')} AS id,
                     *
                 FROM (
                     ({  ') UNION ALL ('.join(queries)  })
@@ -122,6 +169,9 @@ class CarpentryPlanningCard(models.Model):
             )"""
         )
 
+        if self._get_setting_planning_card_index():
+            self._rebuild_planning_card_index()
+
     def _select(self, column, column_ids):
         # 1 relational field per model in the planning
         rel_fields = {}
@@ -230,6 +280,153 @@ class CarpentryPlanningCard(models.Model):
         domain_part = [part for part in domain if part[0] == field]
         return bool(domain_part) and domain_part[0][2]
 
+    #===== RPC calls (planning loading) =====#
+    @api.model
+    def get_planning_data(self, project_id_, launch_id_=None, with_cards=True, with_launches=True, with_dashboard=True):
+        """ All data needed to render a launch's planning, in 1 call:
+            launches (left side panel), columns with their headers (icon, milestones, ...),
+            cards with their real record's values, and project's dashboard
+
+            :option launch_id_: if not given, the 1st launch not done is pre-selected
+            :option with_cards: False if the cards are loaded by the kanban itself
+            :option with_launches: False if launches are already known (e.g. launch switch)
+            :option with_dashboard: False if the dashboard is already loaded (not launch-specific)
+            :return: dict
+        """
+        project = self.env['project.project'].browse(project_id_)
+        res = {}
+        if with_launches or not launch_id_:
+            launches = self.env['carpentry.group.launch'].search_read(
+                [('project_id', '=', project.id)], ['name', 'is_done']
+            )
+            if not launch_id_ and launches:
+                # if all launches are closed: select 1st anyway, even if closed
+                opened_launches = [launch for launch in launches if not launch['is_done']] or launches
+                launch_id_ = opened_launches[0]['id']
+            res['launches'] = launches
+        
+        columns = self._group_expand_column_id(self, [], None)
+        res |= {
+            'launch_id': launch_id_,
+            'columns': columns.read(['name', 'sequence', 'res_model_shortname']),
+            'headers': columns.get_headers_data(launch_id_) if launch_id_ else {},
+            'token': self._get_planning_changes_token(),
+        }
+        if with_dashboard:
+            res['dashboard'] = project.get_planning_dashboard_data()
+        if with_cards:
+            res['cards'] = self._get_planning_cards_data(project, launch_id_)
+        return res
+    
+    @api.model
+    def _get_planning_cards_data(self, project, launch_id_):
+        """ :return: dict like {column_id: [card data]} """
+        if not launch_id_:
+            return {}
+        
+        cards = self.search([('project_id', '=', project.id), ('launch_ids', '=', launch_id_)])
+        fnames = ['column_id', 'res_id', 'res_model', 'sequence', 'state_value'] + self._get_fields()
+        mapped_cards = defaultdict(list)
+        for data in cards.read(fnames, load=None):
+            mapped_cards[data['column_id']].append(data)
+        return mapped_cards
+    
+    #===== RPC calls (planning change feed) =====#
+    @api.model
+    def _get_planning_changes_token(self):
+        """ Token of `get_planning_changes`: the transaction's snapshot. Changes of any
+            transaction not visible in it (even started before, but committed after)
+            are reported at next call
+        """
+        self._cr.execute("SELECT txid_current_snapshot()::text, now() at time zone 'UTC'")
+        snapshot, date = self._cr.fetchone()
+        return {'snapshot': snapshot, 'date': fields.Datetime.to_string(date)}
+
+    @api.model
+    def get_planning_changes(self, project_id_, launch_id_, token, card_ids=[]):
+        """ Change feed of a launch's planning, so the kanban only reloads what changed
+            since `token` (returned by `get_planning_data` or a previous call): cards whose
+            real record was logged as modified (see `_log_planning_changes`) and columns' headers
+
+            :arg card_ids: cards currently displayed, to detect the deleted ones
+            :return: dict like {
+                'token': new token,
+                'reload': True if changes since `token` are unknown (full reload needed),
+                'card_ids': modified cards still in the launch,
+                'removed_ids': displayed cards now out of the launch, or deleted,
+                'headers': like `get_headers_data()`,
+            }
+        """
+        res = {
+            'token': self._get_planning_changes_token(),
+            'reload': False, 'card_ids': [], 'removed_ids': [], 'headers': {},
+        }
+        date_limit = fields.Datetime.subtract(fields.Datetime.now(), hours=self._changes_retention)
+        if not token or not launch_id_ or fields.Datetime.to_datetime(token['date']) < date_limit:
+            res['reload'] = True
+            return res
+        
+        changed = self._get_planning_changed_cards(token['snapshot'])
+        cards = self.search([
+            ('id', 'in', changed.ids),
+            ('project_id', '=', project_id_),
+            ('launch_ids', '=', launch_id_),
+        ])
+        deleted = set(card_ids) - set(self.browse(card_ids).exists().ids)
+        res['card_ids'] = cards.ids
+        res['removed_ids'] = list((set(changed.ids) - set(cards.ids)) & set(card_ids) | deleted)
+
+        # headers are always returned: their budgets may change from any record (and are cached)
+        columns = self._group_expand_column_id(self, [], None)
+        res['headers'] = columns.get_headers_data(launch_id_)
+        return res
+    
+    @api.model
+    def _get_planning_changed_cards(self, snapshot):
+        """ :return: cards (archived included) whose real record was logged
+                as modified by transactions not visible in `snapshot`
+        """
+        self._cr.execute(f"""
+            SELECT res_model, ARRAY_AGG(DISTINCT res_id)
+            FROM {self._changes_table}
+            WHERE xid >= txid_snapshot_xmin(%(snapshot)s::txid_snapshot)
+            AND NOT txid_visible_in_snapshot(xid, %(snapshot)s::txid_snapshot)
+            GROUP BY res_model
+        """, {'snapshot': snapshot})
+        mapped_res_ids = dict(self._cr.fetchall())
+        if not mapped_res_ids:
+            return self.browse()
+        
+        columns = self.env['carpentry.planning.column'].sudo().search([('fold', '=', False)])
+        domains = [
+            [('column_id', '=', column.id), ('res_id', 'in', mapped_res_ids[column.res_model])]
+            for column in columns if column.res_model in mapped_res_ids
+        ]
+        return self.with_context(active_test=False).search(expression.OR(domains or [expression.FALSE_DOMAIN]))
+    
+    @api.model
+    @tools.ormcache()
+    def _get_planning_changes_models(self):
+        """ Models sourcing an unfolded column: only their changes are logged """
+        return frozenset(self._group_expand_column_id(self, [], None).mapped('res_model'))
+    
+    @api.model
+    def _log_planning_changes(self, records):
+        """ Feed the change feed with modified real records (see `carpentry.planning.mixin`) """
+        if records._origin.ids and records._name in self._get_planning_changes_models():
+            self._cr.execute(
+                f"INSERT INTO {self._changes_table} (res_model, res_id) SELECT %s, UNNEST(%s)",
+                (records._name, records._origin.ids)
+            )
+    
+    @api.model
+    def _cron_clean_planning_changes(self):
+        """ Logged changes are kept twice as long as tokens are valid """
+        self._cr.execute(f"""
+            DELETE FROM {self._changes_table}
+            WHERE date < (now() at time zone 'UTC') - make_interval(hours => %s)
+        """, (self._changes_retention * 2,))
+
     #===== Compute related of card's real record =====#
     def _real_record_one(self, mapped_record_ids=None):
         """ Get 1 related records specifically
@@ -259,30 +456,80 @@ class CarpentryPlanningCard(models.Model):
             for card in self
         }
     
-    def _compute_state_value(self):
-        mapped_record_ids = self._get_real_records()
-        for card in self:
-            record = card._real_record_one(mapped_record_ids)
-            card.state_value = 'state' in record and dict(record._fields['state'].selection).get(record.state)
-
     def _get_fields(self):
         return [
             'display_name',
             'state', 'description', 'shortname',
             'planning_card_color_class', 'planning_card_color_is_auto', 'planning_card_color_int',
         ]
+    def _get_real_records_data(self, fnames):
+        """ Reads `fnames` of the cards' real records with 1 `read()` per model,
+            in planning context, so that real records' computed fields are
+            computed in batch rather than card per card
+
+            :return: {card_id_: {field: value}}, without fields missing in real model
+        """
+        mapped_cards = defaultdict(list)
+        for card in self:
+            mapped_cards[card.res_model].append(card)
+        
+        mapped_data = {}
+        for res_model, cards in mapped_cards.items():
+            Model = self.env[res_model].with_context(carpentry_planning=True)
+            records = Model.browse([card.res_id for card in cards])
+            fnames_model = [field for field in fnames if field in Model._fields]
+            mapped_vals = {vals['id']: vals for vals in records.read(fnames_model, load=None)}
+            for card in cards:
+                mapped_data[card.id] = mapped_vals.get(card.res_id, {})
+        return mapped_data
+    
+    def _get_state_labels(self, res_model):
+        field = self.env[res_model]._fields.get('state')
+        if not field or field.type != 'selection':
+            return {}
+        return dict(field._description_selection(self.env))
+
     def _compute_fields(self):
-        mapped_record_ids = self._get_real_records()
+        """ Cards hydration: fields values are the ones of the real records """
         fields = self._get_fields()
+        mapped_data = self._get_real_records_data(fields)
+        mapped_labels = {res_model: self._get_state_labels(res_model) for res_model in set(self.mapped('res_model'))}
         for card in self:
-            record = card._real_record_one(mapped_record_ids).with_context(carpentry_planning=True)
+            vals = mapped_data[card.id]
             for field in fields:
-                card[field] = record[field] if field in record else False
+                card[field] = vals.get(field, False)
+            card.state_value = mapped_labels[card.res_model].get(vals.get('state'), False)
 
     @api.model
     def _search_launch_ids(self, operator, value):
+        if operator in ('=', 'in') and value and self._get_setting_planning_card_index():
+            return self._search_launch_ids_index(value)
         return self._search_by_field('launch_ids', operator, value)
 
+    def _search_launch_ids_index(self, value):
+        """ Cards of indexed columns are looked up by launch in the card index,
+            other columns' cards are still searched through their real records
+        """
+        launch_ids = value if isinstance(value, (list, tuple)) else [value]
+        columns = self.env['carpentry.planning.column'].sudo().search([('fold', '=', False)])
+        indexed = self._get_planning_card_index_columns(columns)
+        domains = []
+        if indexed:
+            self._cr.execute(f"""
+                SELECT {sql_id_hash('column_id', 'res_id')}
+                FROM {self._index_table}
+                WHERE launch_id IN %s AND column_id IN %s
+            """, (tuple(launch_ids), tuple(indexed.ids)))
+            domains.append([('id', 'in', [row[0] for row in self._cr.fetchall()])])
+        
+        others = columns - indexed
+        if others:
+            domains.append(expression.AND([
+                [('column_id', 'in', others.ids)],
+                self._search_by_field('launch_ids', 'in', launch_ids)
+            ]))
+        return expression.OR(domains)
+
     def _search_by_field(self, field, operator, value):
         """ Replace `launch_ids` by `[related_field]_id.launch_ids` (see `_select()` method)
             example: `plan_set_id.launch_ids`
@@ -306,6 +553,74 @@ class CarpentryPlanningCard(models.Model):
         return expression.OR([[(field, operator, value)] for field in fields])
 
 
+    #===== Card index =====#
+    @api.model
+    def _get_planning_card_index_columns(self, columns=None):
+        """ :return: unfolded columns whose cards are in the index, i.e. sourced
+                from a model inheriting `carpentry.planning.mixin` with `launch_ids`
+        """
+        if columns is None:
+            columns = self.env['carpentry.planning.column'].sudo().search([('fold', '=', False)])
+        return columns.filtered(lambda x: (
+            x.res_model in self.env
+            and hasattr(self.env[x.res_model], '_refresh_planning_card_index')
+            and 'launch_ids' in self.env[x.res_model]
+        ))
+
+    @api.model
+    def _rebuild_planning_card_index(self):
+        """ Fully (re)fill the card index, e.g. after columns changes """
+        self._cr.execute(f"DELETE FROM {self._index_table}")
+        columns = self._get_planning_card_index_columns()
+        for res_model in set(columns.mapped('res_model')):
+            Model = self.env[res_model].sudo().with_context(active_test=False)
+            self._insert_planning_card_index(Model.search([]), columns)
+
+    @api.model
+    def _refresh_planning_card_index(self, records):
+        """ Replace the index rows of real `records` (e.g. after their launches changed) """
+        self._delete_planning_card_index(records)
+        self._insert_planning_card_index(records.exists(), self._get_planning_card_index_columns())
+
+    @api.model
+    def _delete_planning_card_index(self, records):
+        if records.ids:
+            self._cr.execute(
+                f"DELETE FROM {self._index_table} WHERE res_model = %s AND res_id IN %s",
+                (records._name, tuple(records.ids))
+            )
+
+    @api.model
+    def _insert_planning_card_index(self, records, columns):
+        """ Routes `records` between `columns` like the SQL view (see `_where()`),
+            with 1 row per launch of the real record
+        """
+        rows = []
+        records = records.sudo()
+        for column in columns.filtered(lambda x: x.res_model == records._name):
+            identifier = (
+                column.identifier_res_id and column.identifier_res_model_id.id
+                and not self._context.get('test_mode')
+            )
+            for record in records:
+                if identifier and record.column_id.id != column.id:
+                    continue
+                rows += [
+                    (column.id, record._name, record.id, record.project_id.id or None,
+                     launch.id, record.sequence, record.active)
+                    for launch in record.launch_ids
+                ]
+        
+        row_sql = '(%s, %s, %s, %s, %s, %s, %s)'
+        for chunk in split_every(self._index_chunk_size, rows, list):
+            self._cr.execute(f"""
+                INSERT INTO {self._index_table} (
+                    column_id, res_model, res_id, project_id, launch_id, sequence, active
+                )
+                VALUES {', '.join([row_sql] * len(chunk))}
+            """, [value for row in chunk for value in row])
+
+
     #===== Planning Features =====#
     def _inverse_planning_card_color_int(self):
         """ `planning_card_color_int` may be:
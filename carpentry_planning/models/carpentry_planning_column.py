@@ -99,6 +99,10 @@ class CarpentryPlanningColumn(models.Model):
     def _rebuild_sql_view(self):
         self.env['carpentry.planning.card'].sudo()._rebuild_sql_view()
     
+    def _clear_planning_changes_models(self):
+        """ Logged models of the planning change feed depend on columns """
+        self.env['carpentry.planning.card'].clear_caches()
+    
     def _synch_mirroring_column_id(self):
         """ Update in `identifier_res_model` model mirroring `column_id` field """
         if self._context.get('no_test_mirroring_column_id'):
@@ -117,6 +121,7 @@ class CarpentryPlanningColumn(models.Model):
     def create(self, vals_list):
         result = super().create(vals_list)
         result._synch_mirroring_column_id()
+        result._clear_planning_changes_models()
         # /!\ Cannot rebuild SQL view on `create()`:
         # when the other module are being installed, `create()` is called while their models
         # is not in registry => this fails SQL view to rebuild (models or fields missing in database)
@@ -126,6 +131,7 @@ class CarpentryPlanningColumn(models.Model):
     def unlink(self):
         result = super().unlink()
         self._rebuild_sql_view()
+        self._clear_planning_changes_models()
         return result
     
     def write(self, vals):
@@ -135,6 +141,7 @@ class CarpentryPlanningColumn(models.Model):
         fields_to_update = ['sequence', 'res_model_id', 'fold']
         if any([field in vals for field in fields_to_update]):
             self._rebuild_sql_view()
+            self._clear_planning_changes_models()
         
         # Mirroring `column_id`
         if 'identifier_res_id' in vals:
@@ -48,6 +48,71 @@ class CarpentryPlanningMixin(models.AbstractModel):
         """
         pass
     
+    #===== CRUD =====#
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._refresh_planning_card_index()
+        records._log_planning_changes()
+        return records
+    
+    def write(self, vals):
+        res = super().write(vals)
+        if any(field in vals for field in self._get_planning_card_index_fields()):
+            self._refresh_planning_card_index()
+        if not self._get_planning_changes_fields().isdisjoint(vals):
+            self._log_planning_changes()
+        return res
+    
+    def unlink(self):
+        Card = self.env['carpentry.planning.card']
+        if Card._get_setting_planning_card_index():
+            Card._delete_planning_card_index(self)
+        self._log_planning_changes()
+        return super().unlink()
+    
+    def _log_planning_changes(self):
+        """ Report the records' cards in the planning change feed. To be extended
+            for records whose change modifies other cards (e.g. a MO's components)
+        """
+        self.env['carpentry.planning.card']._log_planning_changes(self)
+    
+    @api.model
+    def _get_planning_changes_fields(self):
+        """ Fields whose writing changes the record's card: the displayed ones
+            (see `carpentry.planning.card._get_fields()`) and their dependencies,
+            and the ones of the card index
+
+            :return: set of field names
+        """
+        fnames = set(self._get_planning_card_index_fields())
+        todo = [self._fields[fname] for fname in self.env['carpentry.planning.card']._get_fields() if fname in self._fields]
+        done = set()
+        while todo:
+            field = todo.pop()
+            if field in done:
+                continue
+            done.add(field)
+            fnames.add(field.name)
+            for path in self.pool.field_depends[field]:
+                dependency = self._fields.get(path.split('.')[0])
+                if dependency:
+                    todo.append(dependency)
+        return fnames
+    
+    #===== Planning card index =====#
+    @api.model
+    def _get_planning_card_index_fields(self):
+        """ Fields whose writing changes the record's rows in the planning card index
+            (see `carpentry.planning.card`). To be extended if `launch_ids` depends on other fields
+        """
+        return ['launch_ids', 'project_id', 'active', 'sequence', 'column_id']
+    
+    def _refresh_planning_card_index(self):
+        Card = self.env['carpentry.planning.card']
+        if self and Card._get_setting_planning_card_index():
+            Card._refresh_planning_card_index(self)
+    
     #===== Compute =====#
     def _compute_planning_card_color_class(self):
         """ [TO BE OVERWITTEN] """
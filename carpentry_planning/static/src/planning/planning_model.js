@@ -17,55 +17,67 @@ export class PlanningModel extends KanbanModel {
         if (!this.projectId && false) {
             this.action.doAction('carpentry_planning.action_srv_open_planning');
         } else {
-            await this.loadLaunchIds();
+            await this.loadPlanningData();
             searchParams['domain'] = [['project_id', '=', this.projectId], ['launch_ids', '=', this.launchId]];
             await super.load(searchParams);
-            await this.loadColumnHeaders();
-            await this.loadDashboard();
             this.notify();
         }
     }
 
-    // Columns headers
-    async loadColumnHeaders() {
-        const groupsIds = this.root.groups.map((group) => group.resId);
-        this.headersKeepLast = this.headersKeepLast || new KeepLast();
-        this.data.headers = await this.headersKeepLast.add(this.orm.silent.call(
-            "carpentry.planning.column", "get_headers_data",
-            [groupsIds, this.launchId]
+    // Launches (left side panel), columns headers & dashboard, in 1 RPC
+    // (cards are loaded by the kanban model)
+    // Launches & dashboard are not launch-specific: only fetched once, then only headers are
+    async loadPlanningData() {
+        if (!this.projectId) {
+            return;
+        }
+        this.planningKeepLast = this.planningKeepLast || new KeepLast();
+        const data = await this.planningKeepLast.add(this.orm.silent.call(
+            "carpentry.planning.card", "get_planning_data",
+            [this.projectId, this.launchId], {
+                with_cards: false,
+                with_launches: !this.data.launchIds,
+                with_dashboard: !this.data.dashboard,
+            }
         ));
-    }
-
-    // Dashboard
-    async loadDashboard() {
-        if (!this.data.dashboard) {
-            this.dashboardKeepLast = this.dashboardKeepLast || new KeepLast();
-            this.data.dashboard = await this.dashboardKeepLast.add(this.orm.silent.call(
-                "project.project", "get_planning_dashboard_data", [this.projectId]
-            ));
+        if (data.launches) {
+            this.data.launchIds = data.launches;
+        }
+        if (data.dashboard) {
+            this.data.dashboard = data.dashboard;
+        }
+        this.data.headers = data.headers;
+        this.changesToken = data.token;
+        if (!this.launchId && data.launch_id) {
+            this.setLaunch(this.data.launchIds.find((launch) => launch.id === data.launch_id));
         }
     }
 
-    // Launches (left side panel)
-    async loadLaunchIds() {
-        if (this.projectId && !this.data.launchIds) {
-            this.launchKeepLast = this.launchKeepLast || new KeepLast();
-            this.data.launchIds = await this.launchKeepLast.add(this.orm.silent.searchRead(
-                "carpentry.group.launch", [['project_id', '=', this.projectId]], ["name", "is_done"]
-            ));
-            if (!this.launchId) {
-                this.preSelectLaunch();
-            }
+    // After an edit, only reload cards & headers changed since last load (see `get_planning_changes`)
+    // Cards moved in or out of the launch change columns' content: fully reload in such case,
+    // like when the server cannot tell the changes (expired token)
+    async loadChanges() {
+        if (!this.changesToken) {
+            return this.load(this.root);
         }
-    }
-    preSelectLaunch() {
-        if (this.data.launchIds) {
-            const openedLaunches = this.data.launchIds.filter((launch) => !launch.is_done);
-            if (!openedLaunches.length && this.data.launchIds.length) {
-                openedLaunches = this.data.launchIds; // if all launches are closed: select 1st anyway, even if closed
-            }
-            this.setLaunch(openedLaunches.length && openedLaunches[0]);
+        const records = this.root.groups.flatMap((group) => group.list.records || []);
+        const changes = await this.orm.silent.call(
+            "carpentry.planning.card", "get_planning_changes",
+            [this.projectId, this.launchId, this.changesToken],
+            {card_ids: records.map((record) => record.resId)}
+        );
+        this.changesToken = changes.token;
+
+        const loadedIds = new Set(records.map((record) => record.resId));
+        if (changes.reload || changes.removed_ids.length || changes.card_ids.some((id) => !loadedIds.has(id))) {
+            return this.load(this.root);
         }
+        this.data.headers = changes.headers;
+        const changedIds = new Set(changes.card_ids);
+        await Promise.all(
+            records.filter((record) => changedIds.has(record.resId)).map((record) => record.load())
+        );
+        this.notify();
     }
     setLaunch(launch) {
         this.launchId = launch.id;
@@ -25,7 +25,7 @@ export class PlanningRendered extends KanbanRenderer {
             'views': [[false, 'form']],
             'target': 'new',
         }, {
-            onClose: async () => await this.props.list.model.load(this.props.list)
+            onClose: async () => await this.props.list.model.loadChanges()
         });
     }
 }
@@ -62,6 +62,7 @@ export class PlanningController extends KanbanController {
 
     // Kanban (planning) - overwrites card opening
     async openRecord (record) {
+        // the card's form may edit any related record: full reload
         const actionReload = async () => await this.model.load(this.model.root);
 
         this.actionService.doActionButton({
@@ -4,6 +4,7 @@ from odoo import exceptions, fields, _, Command, tools
 from odoo.tests import common, Form
 from odoo.addons.carpentry_position.tests.test_carpentry_00_base import TestCarpentryGroup_Base
 
+from unittest.mock import patch
 import datetime
 
 class TestCarpentryPlanning(TestCarpentryGroup_Base):
@@ -75,6 +76,58 @@ class TestCarpentryPlanning(TestCarpentryGroup_Base):
             self.column.icon
         )
 
+    def test_02b_planning_data(self):
+        """ 1 call returns launches (with pre-selection), headers, dashboard and cards """
+        self.column.with_context(test_mode=True).sequence = 12 # rebuild the view
+        data = self.Card.get_planning_data(self.project.id)
+        self.assertEqual(data['launch_id'], fields.first(self.project.launch_ids).id)
+        self.assertEqual(len(data['launches']), len(self.project.launch_ids))
+        self.assertEqual(data['headers'][self.column.id]['icon'], self.column.icon)
+        self.assertIn('next_projects', data['dashboard'])
+        self.assertIn(self.column.id, [x['id'] for x in data['columns']])
+        cards = data['cards'][self.column.id]
+        self.assertEqual([x['res_id'] for x in cards], [self.project.id])
+        self.assertEqual(cards[0]['display_name'], self.project.display_name)
+
+        # launch switch: only headers
+        data = self.Card.get_planning_data(self.project.id, data['launch_id'],
+            with_cards=False, with_launches=False, with_dashboard=False)
+        self.assertEqual(data['headers'][self.column.id]['icon'], self.column.icon)
+        self.assertFalse({'launches', 'dashboard', 'cards'} & set(data))
+
+    def test_02c_planning_changes(self):
+        """ Change feed returns the cards logged as changed since the token, and the headers """
+        self.column.with_context(test_mode=True).sequence = 12 # rebuild the view
+        launch = fields.first(self.project.launch_ids)
+        data = self.Card.get_planning_data(self.project.id, launch.id, with_cards=False)
+        self.assertTrue(data['token'])
+
+        # no token: full reload
+        changes = self.Card.get_planning_changes(self.project.id, launch.id, False)
+        self.assertTrue(changes['reload'])
+
+        # `project.project` is not a `carpentry.planning.mixin`: log its change manually
+        self.project.name = 'Project Test (renamed)'
+        self.Card._log_planning_changes(self.project)
+        card = self.Card.search([('column_id', '=', self.column.id), ('res_id', '=', self.project.id)])
+        changes = self.Card.get_planning_changes(self.project.id, launch.id, data['token'], card_ids=card.ids)
+        self.assertFalse(changes['reload'])
+        self.assertIn(card.id, changes['card_ids'])
+        self.assertFalse(changes['removed_ids'])
+        self.assertEqual(changes['headers'][self.column.id]['icon'], self.column.icon)
+
+        # only models of unfolded columns are logged
+        self.env.cr.execute(f"SELECT COUNT(*) FROM {self.Card._changes_table}")
+        count = self.env.cr.fetchone()[0]
+        self.Card._log_planning_changes(self.env.user.partner_id)
+        self.env.cr.execute(f"SELECT COUNT(*) FROM {self.Card._changes_table}")
+        self.assertEqual(self.env.cr.fetchone()[0], count)
+
+        # expired token
+        token = dict(data['token'], date='2000-01-01 00:00:00')
+        changes = self.Card.get_planning_changes(self.project.id, launch.id, token)
+        self.assertTrue(changes['reload'])
+
     #===== carpentry.planning.card =====#
     def test_03_card_rebuild_sql_view(self):
         self.column.with_context(test_mode=True).sequence = 12 # `sequence` is a field triggering the rebuild
@@ -96,6 +149,21 @@ class TestCarpentryPlanning(TestCarpentryGroup_Base):
         self.assertEqual(card._real_record_one(), self.project)
         self.assertEqual(card.display_name, self.project.display_name)
 
+    def test_05b_card_fields_batch(self):
+        """ Cards' fields are read with 1 `read()` per real model, for all cards """
+        self.column.with_context(test_mode=True).sequence = 12 # rebuild the view
+        project2 = self.project.copy({'name': 'Project Test 02'})
+        cards = self.Card.search([('res_id', 'in', (self.project | project2).ids)])
+        
+        Project = type(self.env['project.project'])
+        with patch.object(Project, 'read', autospec=True, side_effect=Project.read) as mock:
+            cards.mapped('display_name')
+        self.assertEqual(mock.call_count, 1)
+        self.assertEqual(
+            sorted(cards.mapped('display_name')),
+            sorted((self.project | project2).mapped('display_name'))
+        )
+
     #===== carpentry.planning.milestone, .types & launches =====#
     def test_06_milestone_type_prefill(self):
         """ Test if milestones auto-created in all launches in base """
@@ -5,6 +5,7 @@ from . import carpentry_need
 
 from . import carpentry_planning_column
 from . import carpentry_planning_card
+from . import carpentry_planning_milestone
 
 from . import project_type
 from . import project_task
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models, api
+
+class CarpentryPlanningMilestone(models.Model):
+    _inherit = ['carpentry.planning.milestone']
+
+    #===== CRUD =====#
+    @api.model_create_multi
+    def create(self, vals_list):
+        milestones = super().create(vals_list)
+        milestones._log_planning_changes_needs()
+        return milestones
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'date' in vals:
+            self._log_planning_changes_needs()
+        return res
+
+    def _log_planning_changes_needs(self):
+        """ Needs' deadlines are computed from milestones (stored compute, without `write()`):
+            report their cards in the planning change feed
+        """
+        tasks = self.env['project.task'].sudo().search([('launch_ids', 'in', self.launch_id.ids)])
+        tasks._filter_needs()._log_planning_changes()
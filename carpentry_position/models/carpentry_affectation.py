@@ -187,15 +187,35 @@ class CarpentryAffectation(models.Model):
     def _constrain_is_affectable(self):
         """ Prevent two launch affectations to use the same phase affectation
             (Equivalent formulation: prevent a phase affectation to be affected twice)
+
+            Set-wise: 1 aggregate query for all the phase affectations of `self`
         """
         if self._context.get('no_constrain_is_affectable'):
             return
         
         self = self.with_context(active_test=False)
         __, launch_affectations = self._split()
-        affectations = launch_affectations.filtered(
-            lambda x: x.affected and not x.is_affectable
-        )
+        if not launch_affectations:
+            return
+        
+        self.flush_model(['mode', 'parent_id', 'affected'])
+        self.env.cr.execute("""
+            SELECT affectation.id
+            FROM carpentry_affectation AS affectation
+            WHERE affectation.id IN %(ids)s
+            AND affectation.affected
+            AND affectation.parent_id IN (
+                SELECT parent_id
+                FROM carpentry_affectation
+                WHERE mode = 'launch' AND affected AND parent_id IN %(parent_ids)s
+                GROUP BY parent_id
+                HAVING COUNT(*) > 1
+            )
+        """, {
+            'ids': tuple(launch_affectations._origin.ids) or (None,),
+            'parent_ids': tuple(launch_affectations._origin.parent_id.ids) or (None,),
+        })
+        affectations = self.browse([row[0] for row in self.env.cr.fetchall()])
         if bool(affectations):
             raise exceptions.ValidationError(_(
                     "A position from a phase cannot be affected to several launchs.\n"
@@ -226,8 +246,7 @@ class CarpentryAffectation(models.Model):
         """
         res = super().write(vals)
         if 'quantity_affected' in vals:
-            # after `write`
-            self._constrain_quantity_affected()
+            # after `write` (and its `_constrain_quantity_affected`)
             phase_affectations, _ = self._split()
             if phase_affectations:
                 phase_affectations._update_launch_affectations(vals['quantity_affected'])
@@ -267,7 +286,7 @@ class CarpentryAffectation(models.Model):
         # (!) stored
         # must includes at least the @api.depends of `quantity_remaining_to_affect`
         'affected', 'launch_sibling_ids.affected', # for launchs
-        'quantity_affected', 'phase_sibling_ids.quantity_affected', 'quantity_position', # for phases
+        'quantity_affected', 'sum_affected_siblings', 'quantity_position', # for phases
     )
     def _compute_is_affectable(self):
         """ Tells if the affectation state in the group can be changed or not
@@ -345,9 +364,8 @@ class CarpentryAffectation(models.Model):
 
     #===== Quantities: compute & constrain =====#
     @api.onchange('quantity_affected')
-    @api.constrains('quantity_affected')
-    def _constrain_quantity_affected(self):
-        """ Ensure `quantity_remaining_to_affect > 0`
+    def _onchange_quantity_affected(self):
+        """ Real-time feedback in the grid, before saving
             Only for phases
         """
         phase_affectations, _ = self._split()
@@ -357,6 +375,67 @@ class CarpentryAffectation(models.Model):
         if affectation:
             raise exceptions.ValidationError(affectation._get_error_constrain_qty_affected())
     
+    @api.constrains('quantity_affected')
+    def _constrain_quantity_affected(self):
+        """ Ensure `quantity_remaining_to_affect > 0`
+            Only for phases
+        """
+        if self._context.get('no_constrain_quantity_affected'):
+            return
+        
+        phase_affectations, _ = self._split()
+        self._check_quantity_affected(phase_affectations._origin.position_id.ids)
+    
+    @api.model
+    def _check_quantity_affected(self, position_ids):
+        """ Set-wise check that the sum of phases quantities of positions
+            is lower than their quantity, with 1 aggregate query
+            
+            :raise: ValidationError listing all overconsumed positions
+        """
+        if not position_ids:
+            return
+        
+        self.flush_model(['mode', 'position_id', 'quantity_affected', 'active'])
+        self.env['carpentry.position'].flush_model(['quantity'])
+        self.env.cr.execute("""
+            SELECT
+                position.id,
+                position.quantity,
+                SUM(affectation.quantity_affected)
+            FROM carpentry_affectation AS affectation
+            JOIN carpentry_position AS position
+                ON position.id = affectation.position_id
+            WHERE
+                affectation.mode = 'phase' AND
+                affectation.active AND
+                affectation.position_id IN %s
+            GROUP BY position.id
+            HAVING SUM(affectation.quantity_affected) > position.quantity
+        """, (tuple(position_ids),))
+        rows = self.env.cr.fetchall()
+        if rows:
+            raise exceptions.ValidationError(self._get_error_constrain_qty_affected_positions(rows))
+    
+    @api.model
+    def _get_error_constrain_qty_affected_positions(self, rows):
+        """ :arg rows: list of tuples like (position_id, quantity, quantity affected in phases) """
+        positions = self.env['carpentry.position'].browse([row[0] for row in rows])
+        mapped_positions = {position.id: position for position in positions}
+        details = '\n'.join([
+            _(
+                "- %(position)s (lot %(lot)s): available %(quantity)s,"
+                " affected %(quantity_affected)s, overconsumption %(overconsumption)s",
+                position = mapped_positions[position_id].name or '',
+                lot = mapped_positions[position_id].lot_id.name or '',
+                quantity = quantity,
+                quantity_affected = quantity_affected,
+                overconsumption = quantity_affected - quantity,
+            )
+            for position_id, quantity, quantity_affected in rows
+        ])
+        return _("The affected quantity is higher than the one available in the project:\n\n%s", details)
+    
     def _get_error_constrain_qty_affected(self):
         """ Can be inheritted """
         self.ensure_one()
@@ -378,7 +457,7 @@ class CarpentryAffectation(models.Model):
             overconsumption = -1*self.quantity_remaining_to_affect,
         )
     
-    @api.depends('quantity_affected', 'quantity_position', 'phase_sibling_ids.quantity_affected')
+    @api.depends('quantity_affected', 'quantity_position', 'sum_affected_siblings')
     def _compute_quantity_remaining_to_affect(self):
         """ Compute remaining qty to affect for phases affectation,
             in real-time (no database call)
@@ -394,9 +473,12 @@ class CarpentryAffectation(models.Model):
                 - affectation.quantity_affected # currently affected
             )
 
-    @api.depends('phase_sibling_ids.quantity_affected')
+    @api.depends('position_id.quantity_affected_phase')
     def _compute_sum_affected_siblings(self):
-        """ For phase only """
+        """ For phase only
+            Deduced from position's stored sum, so that siblings are not loaded
+        """
         for affectation in self:
-            siblings = affectation.phase_sibling_ids._origin - affectation._origin
-            affectation.sum_affected_siblings = sum(siblings.mapped('quantity_affected'))
+            origin = affectation._origin
+            quantity_self = origin.quantity_affected if origin.mode == 'phase' and origin.active else 0
+            affectation.sum_affected_siblings = affectation.position_id.quantity_affected_phase - quantity_self
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api, _, exceptions
+from collections import defaultdict
 
 class CarpentryAffectationMixin(models.AbstractModel):
     """ Fields & methods for Carpentry Groups (projects, lots, phases, launchs)
@@ -245,6 +246,9 @@ class CarpentryAffectationMixin(models.AbstractModel):
             - Back-end: `_provision_affectations`
             - User action: both: `_inverse_[lot|phase]_ids`  | Trigger: user action (add/remove lots or phases)
 
+            Set-based: records' attributes are fetched in 1 query (see `_get_affectation_vals`)
+            and all affectations are created in 1 batch
+
             :arg `self`:  phases or launchs
             :arg records: positions (for phases), phase_affectations (for launch)
         """
@@ -254,62 +258,123 @@ class CarpentryAffectationMixin(models.AbstractModel):
         # prevent duplicates
         mode = self._name.replace('carpentry.group.', '')
         Affectation = self.env['carpentry.affectation']
-        existing_ids = Affectation.search([
-            ('mode', '=', mode),
-            (group_field,  'in', self._origin.ids),
-            (record_field, 'in', records._origin.ids),
-        ])
-        mapped_existings = [(x[group_field].id, x[record_field].id) for x in existing_ids]
+        Affectation.flush_model(['mode', group_field, record_field])
+        self.env.cr.execute(f"""
+            SELECT {group_field}, {record_field}
+            FROM carpentry_affectation
+            WHERE mode = %s AND {group_field} IN %s AND {record_field} IN %s
+        """, (mode, tuple(self._origin.ids) or (None,), tuple(records._origin.ids) or (None,)))
+        existing_pairs = set(self.env.cr.fetchall())
 
         # create
+        mapped_vals = self._get_affectation_vals(records)
         vals_list = [
-            group._get_affectation_vals(record)
+            vals | group._get_affectation_group_vals(vals)
             for group in self
-            for record in records
-            if not (group.id, record.id) in mapped_existings
+            for record_id, vals in mapped_vals.items()
+            if not (group.id, record_id) in existing_pairs
         ]
 
         return Affectation.create(vals_list)
     
-    def _get_affectation_vals(self, record):
+    def _get_affectation_vals(self, records):
         """ Precomputed fields are not here
-            :arg `self`:   phase or launch
-            :arg `record`: position or phase affectation
+            :arg `self`:   phases or launchs
+            :arg `records`: positions or phase affectations
+            :return: dict like {record_id: vals}, where `vals` still lacks
+                     the group's part (see `_get_affectation_group_vals`)
         """
         mode = self._name.replace('carpentry.group.', '')
         if mode not in ('phase', 'launch'):
             self._raise_not_supported()
+        if not records:
+            return {}
 
-        position = record if mode == 'phase' else record.position_id
-        phase    = self   if mode == 'phase' else record.phase_id
-        
-        vals = {
-            'mode': mode,
-            'project_id': position.project_id.id,
-            'position_id': position.id,
-            'lot_id': position.lot_id.id,
-            'phase_id': phase.id,
-            'sequence_position': position.sequence,
+        # read (flushed) position, lot, project & phase attributes
+        fields_position = ['project_id', 'lot_id', 'sequence', 'active']
+        self.env['carpentry.position'].flush_model(fields_position)
+        self.env['carpentry.group.lot'].flush_model(['sequence', 'active'])
+        self.env['project.project'].flush_model(['active'])
+        if mode == 'phase':
+            select_record = """
+                position.id AS record_id,
+                NULL AS phase_id,
+                TRUE AS phase_active,
+                lot.sequence AS sequence_parent_group,
+                position.active AS record_active,
+                0 AS quantity_affected
+            """
+            from_record = "carpentry_position AS position"
+            where_record = "position.id IN %(record_ids)s"
+        else:
+            self.env['carpentry.affectation'].flush_model(
+                ['position_id', 'phase_id', 'active', 'quantity_affected']
+            )
+            self.env['carpentry.group.phase'].flush_model(['sequence', 'active'])
+            select_record = """
+                affectation.id AS record_id,
+                affectation.phase_id,
+                phase.active AS phase_active,
+                phase.sequence AS sequence_parent_group,
+                affectation.active AS record_active,
+                affectation.quantity_affected
+            """
+            from_record = """
+                carpentry_affectation AS affectation
+                JOIN carpentry_position AS position ON position.id = affectation.position_id
+                JOIN carpentry_group_phase AS phase ON phase.id = affectation.phase_id
+            """
+            where_record = "affectation.id IN %(record_ids)s"
+
+        self.env.cr.execute(f"""
+            SELECT
+                {select_record},
+                position.id AS position_id,
+                position.project_id,
+                position.lot_id,
+                position.sequence AS sequence_position,
+                (
+                    position.active
+                    AND COALESCE(project.active, FALSE)
+                    AND COALESCE(lot.active, FALSE)
+                ) AS position_active
+            FROM {from_record}
+            LEFT JOIN project_project AS project ON project.id = position.project_id
+            LEFT JOIN carpentry_group_lot AS lot ON lot.id = position.lot_id
+            WHERE {where_record}
+        """, {'record_ids': tuple(records._origin.ids)})
+
+        mapped_vals = {}
+        for row in self.env.cr.dictfetchall():
+            vals = {
+                'mode': mode,
+                'project_id': row['project_id'],
+                'position_id': row['position_id'],
+                'lot_id': row['lot_id'],
+                'sequence_position': row['sequence_position'],
+                'sequence_parent_group': row['sequence_parent_group'],
+                'active': bool(row['position_active'] and row['phase_active'] and row['record_active']),
+            }
+            if mode == 'launch':
+                vals |= {
+                    'phase_id': row['phase_id'],
+                    'parent_id': row['record_id'],
+                    'quantity_affected': row['quantity_affected'],
+                }
+            mapped_vals[row['record_id']] = vals
+        # keep `records` order
+        return {id: mapped_vals[id] for id in records._origin.ids if id in mapped_vals}
+    
+    def _get_affectation_group_vals(self, vals):
+        """ :arg `self`: phase or launch
+            :arg `vals`: a record's vals from `_get_affectation_vals`
+        """
+        group_vals = {
+            self._group_field(): self.id,
             'sequence_group': self.sequence,
-            'sequence_parent_group': record[self._parent_group_field()].sequence,
-            'active': all([
-                position.active,
-                position.project_id.active,
-                position.lot_id.active,
-                phase.active,
-                self.active, # can be launch
-                record.active, # can be phase affectation
-            ]),
+            'active': vals['active'] and self.active,
         }
-        
-        if mode == 'launch':
-            vals |= {
-                'launch_id': self.id,
-                'parent_id': record.id,
-                'quantity_affected': record.quantity_affected,
-            }
-        
-        return vals
+        return group_vals
     
     def _inverse_parent_group_ids(self):
         """ On user trigger, provision `affectation_ids` of a (phase|launch),
@@ -358,6 +423,60 @@ class CarpentryAffectationMixin(models.AbstractModel):
         # so they don't stick to user inputs (which may not be the database reality)
         self.invalidate_recordset([parent_groups])
 
+    @api.model
+    def write_affectations(self, changes):
+        """ Bulk-edit of the affectations grid of phases or launchs:
+            all changes are written in 1 transaction, then constraints
+            are checked once, for all edited affectations
+
+            :arg changes: list of dict like
+                - for phases:  {'record_id': position_id, 'group_id': phase_id, 'quantity_affected': int}
+                - for launchs: {'record_id': parent_id, 'group_id': launch_id, 'affected': bool}
+            :return: ids of the edited affectations
+        """
+        mode = self._name.replace('carpentry.group.', '')
+        if mode not in ('phase', 'launch'):
+            self._raise_not_supported()
+        group_field = self._group_field()
+        record_field = self._record_field()
+        fname = 'quantity_affected' if mode == 'phase' else 'affected'
+
+        # get affectations of the cells, in 1 query
+        Affectation = self.env['carpentry.affectation'].with_context(
+            no_constrain_quantity_affected=True,
+            no_constrain_is_affectable=True,
+        )
+        affectations = Affectation.search([
+            ('mode', '=', mode),
+            (group_field, 'in', list({change['group_id'] for change in changes})),
+            (record_field, 'in', list({change['record_id'] for change in changes})),
+        ])
+        mapped_affectations = {(x[group_field].id, x[record_field].id): x for x in affectations}
+
+        # group the cells per value, so that there is 1 `write` per distinct value
+        mapped_changes = defaultdict(lambda: Affectation)
+        for change in changes:
+            affectation = mapped_affectations.get((change['group_id'], change['record_id']))
+            if not affectation:
+                raise exceptions.UserError(_(
+                    "Some positions are not available for affectation in this %s.", self._description
+                ))
+            mapped_changes[change[fname]] |= affectation
+        
+        # all cells or none: rolled back if 1 constraint fails
+        edited = Affectation
+        with self.env.cr.savepoint():
+            for value, affectations_to_write in mapped_changes.items():
+                affectations_to_write.write({fname: value})
+                edited |= affectations_to_write
+            
+            # set-wise constraints, on the new state
+            edited = edited.with_context(no_constrain_quantity_affected=False, no_constrain_is_affectable=False)
+            edited._constrain_quantity_affected()
+            edited._constrain_is_affectable()
+            self.env.flush_all()
+        return edited.ids
+
     def _get_filter_remaining_affectations(self, provisioning=False):
         """ :arg self: lot or phase
             :option provisioning: if True, filtering is less harsh
@@ -39,6 +39,24 @@ class Position(models.Model):
     )
     # affectations
     affectation_ids = fields.One2many(inverse_name='position_id', domain=[('mode', '=', 'phase')])
+    launch_affectation_ids = fields.One2many(
+        comodel_name='carpentry.affectation',
+        inverse_name='position_id',
+        string='Launch affectations',
+        domain=[('mode', '=', 'launch')],
+    )
+    quantity_affected_phase = fields.Integer(
+        string='Affected in phases',
+        compute='_compute_quantity_affected',
+        store=True,
+        readonly=True,
+    )
+    quantity_affected_launch = fields.Integer(
+        string='Affected in launches',
+        compute='_compute_quantity_affected',
+        store=True,
+        readonly=True,
+    )
     quantity_remaining_to_affect = fields.Integer(
         string='Remaining', 
         compute='_compute_quantities_and_state', 
@@ -64,7 +82,7 @@ class Position(models.Model):
     @api.constrains('quantity')
     def _constrain_quantity_affected(self):
         """ Cannot lower quantity under affected qty in phases """
-        self.affectation_ids._constrain_quantity_affected()
+        self.env['carpentry.affectation']._check_quantity_affected(self.ids)
 
     #===== CRUD: for Affectations provisioning =====#
     @api.model_create_multi
@@ -93,9 +111,15 @@ class Position(models.Model):
         return res
 
     #===== Compute =====#
-    @api.depends('quantity', 'project_id.affectation_ids.quantity_affected')
-    def _compute_quantities_and_state(self):
-        # For a given position, get its quantity already affected in phases and launches (separatly)
+    @api.depends(
+        'affectation_ids.quantity_affected', 'affectation_ids.active',
+        'launch_affectation_ids.quantity_affected', 'launch_affectation_ids.affected',
+        'launch_affectation_ids.active',
+    )
+    def _compute_quantity_affected(self):
+        """ Quantity already affected in phases and launches (separatly), stored per
+            position so that editing 1 affectation only recomputes its own position
+        """
         rg_result = self.env['carpentry.affectation'].read_group(
             domain=[
                 ('position_id', 'in', self._origin.ids),
@@ -109,9 +133,14 @@ class Position(models.Model):
         for x in rg_result:
             sum_affected[x['mode']][x['position_id'][0]] = x['quantity_affected']
         
-        # update fields
         for position in self:
-            position.quantity_remaining_to_affect = position.quantity - sum_affected['phase'].get(position.id, 0)
+            position.quantity_affected_phase = sum_affected['phase'].get(position._origin.id, 0)
+            position.quantity_affected_launch = sum_affected['launch'].get(position._origin.id, 0)
+
+    @api.depends('quantity', 'quantity_affected_phase', 'quantity_affected_launch')
+    def _compute_quantities_and_state(self):
+        for position in self:
+            position.quantity_remaining_to_affect = position.quantity - position.quantity_affected_phase
             
             state = 'done'
             if position.quantity == 0:
@@ -120,7 +149,7 @@ class Position(models.Model):
                 state = 'none'
             elif position.quantity_remaining_to_affect > 0:
                 state = 'warning_phase'
-            elif position.quantity > sum_affected['launch'].get(position.id, 0):
+            elif position.quantity > position.quantity_affected_launch:
                 state = 'warning_launch'
             position.state = state
 
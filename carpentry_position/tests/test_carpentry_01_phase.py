@@ -138,3 +138,51 @@ class TestCarpentryAffectationPhase(TestCarpentryGroup_Base):
         launch_id = res['domain'][0][2][0]
         launch = self.project.launch_ids.browse(launch_id)
         self.assertEqual(launch.name, self.phases[1].name)
+
+    def test_phase_10_bulk_create_affectations(self):
+        """ Provisioning many positions at once: sequences & active flag are precomputed,
+            and existing pairs are not created twice
+        """
+        positions = self.env['carpentry.position'].create([{
+            'project_id': self.project.id,
+            'lot_id': self.lot.id,
+            'name': 'Bulk position %s' % i,
+            'quantity': 1,
+        } for i in range(50)])
+        phase = self.phases[1]
+        phase.affectation_ids.filtered(lambda x: x.position_id in positions).unlink()
+
+        affectations = phase._create_affectations(positions)
+        self.assertEqual(len(affectations), len(positions))
+        self.assertEqual(affectations.position_id, positions)
+        self.assertTrue(all(affectations.mapped('active')))
+        for affectation in affectations:
+            self.assertEqual(affectation.sequence_group, phase.sequence)
+            self.assertEqual(affectation.sequence_parent_group, self.lot.sequence)
+            self.assertEqual(affectation.sequence_position, affectation.position_id.sequence)
+        
+        # 2nd call: nothing new
+        self.assertFalse(phase._create_affectations(positions))
+
+    def test_phase_11_write_affectations(self):
+        """ Bulk-edit of the phase grid: all cells are written, or none if 1 is invalid """
+        self._reset_affectations()
+        phase = self.phases[1]
+        phase.lot_ids = self.project.lot_ids
+        affectations = phase.affectation_ids
+        changes = [{
+            'record_id': affectation.position_id.id,
+            'group_id': phase.id,
+            'quantity_affected': 0,
+        } for affectation in affectations]
+        
+        edited_ids = self.env['carpentry.group.phase'].write_affectations(changes)
+        self.assertEqual(set(edited_ids), set(affectations.ids))
+        self.assertFalse(any(affectations.mapped('quantity_affected')))
+
+        # position is already fully affected in 1st phase
+        changes[0]['quantity_affected'] = 1
+        with self.assertRaises(exceptions.ValidationError):
+            self.env['carpentry.group.phase'].write_affectations(changes)
+        affectations.invalidate_recordset()
+        self.assertFalse(any(affectations.mapped('quantity_affected')))
@@ -160,3 +160,31 @@ class TestCarpentryAffectationLaunch(TestCarpentryGroup_Base):
         self.phase.sequence = 99
         self.assertEqual(set(self.phase.affectation_ids.mapped('sequence_group')), {99})
         self.assertEqual(set(self.launch.affectation_ids.mapped('sequence_parent_group')), {99})
+
+    def test_launch_09_write_affectations(self):
+        """ Bulk-edit of the launch grid: a phase affectation cannot be affected twice """
+        self._reset_affectations()
+        affectation = fields.first(self.launch.affectation_ids)
+        sibling = self.launchs[1]._create_affectations(affectation.parent_id)
+        affectation.affected = True
+        with self.assertRaises(exceptions.ValidationError):
+            self.env['carpentry.group.launch'].write_affectations([{
+                'record_id': affectation.parent_id.id,
+                'group_id': self.launchs[1].id,
+                'affected': True,
+            }])
+        (affectation | sibling).invalidate_recordset()
+        self.assertTrue(affectation.affected)
+        self.assertFalse(sibling.affected)
+        
+        self.env['carpentry.group.launch'].write_affectations([{
+            'record_id': affectation.parent_id.id,
+            'group_id': self.launch.id,
+            'affected': False,
+        }, {
+            'record_id': affectation.parent_id.id,
+            'group_id': self.launchs[1].id,
+            'affected': True,
+        }])
+        self.assertFalse(affectation.affected)
+        self.assertTrue(sibling.affected)
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from odoo import exceptions, _
+from unittest.mock import patch
 from odoo.addons.carpentry_position.tests.test_carpentry_00_base import TestCarpentryGroup_Base
 
 class TestCarpentryPosition(TestCarpentryGroup_Base):
@@ -78,3 +79,43 @@ class TestCarpentryPosition(TestCarpentryGroup_Base):
         last_position = self.project.position_ids[-1]
         copied_position_id = last_position.copy()
         self.assertEqual(copied_position_id.name, last_position.name + _(' (copied)'))
+
+    def test_05_quantity_affected_sums(self):
+        """ Position's stored sums follow its affectations, without touching other positions """
+        self._reset_affectations()
+        position, other = self.positions[1], self.positions[0]
+        self.assertEqual(position.quantity_affected_phase, position.quantity)
+        self.assertEqual(position.quantity_affected_launch, position.quantity)
+
+        affectation = position.affectation_ids.filtered(lambda x: x.phase_id == self.phase)
+        affectation.children_ids.affected = False
+        self.assertEqual(position.quantity_affected_launch, 0)
+        self.assertEqual(position.state, 'warning_launch')
+
+        # only the edited position is recomputed
+        Position = type(position)
+        compute_origin = Position._compute_quantity_affected
+        computed_ids = set()
+        def _compute_quantity_affected(records):
+            computed_ids.update(records.ids)
+            return compute_origin(records)
+        
+        self.env.flush_all()
+        with patch.object(Position, '_compute_quantity_affected', _compute_quantity_affected):
+            affectation.quantity_affected = 1
+            self.env.flush_all()
+        self.assertIn(position.id, computed_ids)
+        self.assertNotIn(other.id, computed_ids)
+        self.assertEqual(position.quantity_affected_phase, 1)
+        self.assertEqual(position.quantity_remaining_to_affect, position.quantity - 1)
+        self.assertEqual(affectation.sum_affected_siblings, 0)
+
+    def test_06_qty_constrain_setwise(self):
+        """ All overconsumed positions are reported together """
+        self._reset_affectations()
+        positions = self.positions.filtered(lambda x: x.quantity > 1)
+        with self.assertRaises(exceptions.ValidationError) as error:
+            positions.quantity = 1
+        for position in positions:
+            self.assertIn(position.name, str(error.exception))
+
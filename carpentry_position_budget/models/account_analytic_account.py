@@ -3,6 +3,8 @@
 from odoo import api, fields, models, exceptions, _
 from odoo.tools.misc import format_amount
 
+from collections import defaultdict
+
 class AnalyticAccount(models.Model):
     _name = 'account.analytic.account'
     _inherit = ['account.analytic.account']
@@ -26,7 +28,7 @@ class AnalyticAccount(models.Model):
         analytics = self.browse(list(dict(res).keys()))
         record = self.env[record_res_model].browse(record_id)
         remaining_budget = self._get_remaining_budget_by_analytic(
-            record.project_id.id, record.launch_ids.ids, record.id, record._record_field,
+            record.project_id.id, record.launch_ids.ids, record.id, record._record_field, analytics.ids,
         )
         budget_type_selection = dict(self._fields['budget_type']._description_selection(self.env))
         
@@ -121,7 +123,7 @@ class AnalyticAccount(models.Model):
 
     #==== Budget sums computation =====#
     @api.model
-    def _get_remaining_budget_by_analytic(self, project_id, launch_ids, record_id, record_field):
+    def _get_remaining_budget_by_analytic(self, project_id, launch_ids, record_id, record_field, analytic_ids=None):
         """ Group remaining budget by `analytic`, according to required `launchs` & `record`
             (!!!) Always in *BRUT*
 
@@ -129,16 +131,30 @@ class AnalyticAccount(models.Model):
             :arg record_id: like ID for `purchase.order`
             :arg launch_ids: explicit
             :arg project_id: explicit
+            :option analytic_ids: default to the project's budgets
             :return: Dict like {analytic_id: amount}
         """
-        rg_result = self.env['carpentry.budget.remaining'].read_group(
-            domain=[
-                ('project_id', '=', project_id),
-                ('launch_id', 'in', [False] + launch_ids),
-                ('analytic_account_id', '!=', False),
-                (record_field, '!=', record_id),
-            ],
-            fields=['amount_subtotal:sum'],
-            groupby=['analytic_account_id'],
+        if analytic_ids is None:
+            project = self.env['project.project'].browse(project_id)
+            analytic_ids = project.budget_line_ids.analytic_account_id.ids
+        
+        mapped_remaining_budget = self.env['carpentry.budget.remaining']._get_remaining_cached(
+            project_ids=[project_id],
+            launch_ids=[False] + launch_ids,
+            analytic_ids=analytic_ids,
         )
-        return {x['analytic_account_id'][0]: x['amount_subtotal'] for x in rg_result}
+        remaining_budget = defaultdict(float)
+        for key, vals in mapped_remaining_budget.items():
+            remaining_budget[key[2]] += vals.get('budget', 0.0) + vals.get('reservation', 0.0)
+        
+        # give back record's own reservations
+        reservations = self.env['carpentry.budget.reservation'].search([
+            (record_field, '=', record_id),
+            ('project_id', '=', project_id),
+            ('launch_id', 'in', [False] + launch_ids),
+        ]) if record_id else []
+        for reservation in reservations:
+            if reservation.analytic_account_id.id in remaining_budget:
+                remaining_budget[reservation.analytic_account_id.id] += reservation.amount_reserved
+        
+        return dict(remaining_budget)
@@ -30,3 +30,25 @@ class AccountAnalyticLine(models.Model):
         related='move_line_id.purchase_line_id.order_id',
         store=True,
     )
+
+    #===== CRUD: expense store =====#
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        lines._mark_store_dirty()
+        return lines
+
+    def write(self, vals):
+        self._mark_store_dirty()
+        res = super().write(vals)
+        self._mark_store_dirty()
+        return res
+    
+    def unlink(self):
+        self._mark_store_dirty()
+        return super().unlink()
+    
+    def _mark_store_dirty(self):
+        self.env['carpentry.budget.expense.detail']._mark_store_dirty(
+            project_ids=self.budget_project_ids.ids
+        )
@@ -49,11 +49,29 @@ class AccountMoveBudgetLine(models.Model):
     def _get_fields_budget_constrain(self):
         return ('qty_debit', 'debit', 'credit', 'qty_credit', 'qty_balance', 'balance')
     
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        lines._mark_store_dirty()
+        lines._mark_hourly_cost_dirty()
+        self.env['carpentry.budget.remaining']._invalidate_remaining_cache(lines.project_id.ids)
+        return lines
+    
     def write(self, vals):
         """ Prevent lowering a global-project budget qty,
             regarding already existing budgets reservations
         """
+        if 'analytic_account_id' in vals:
+            self._mark_store_dirty()
+        fields_hourly_cost = ('project_id', 'analytic_account_id', 'budget_type')
+        if any(x in vals for x in fields_hourly_cost):
+            self._mark_hourly_cost_dirty() # before & after: lines may move to another project
+        Remaining = self.env['carpentry.budget.remaining']
+        Remaining._invalidate_remaining_cache(self.project_id.ids)
         res = super().write(vals)
+        Remaining._invalidate_remaining_cache(self.project_id.ids)
+        if any(x in vals for x in fields_hourly_cost):
+            self._mark_hourly_cost_dirty()
 
         # after `write`
         fields = self._get_fields_budget_constrain()
@@ -71,6 +89,9 @@ class AccountMoveBudgetLine(models.Model):
             a negative *remaining budget* on a PO, MO, ...
         """
         projects = self.filtered(lambda x: not x.is_computed_carpentry).project_id
+        self._mark_store_dirty()
+        self._mark_hourly_cost_dirty()
+        self.env['carpentry.budget.remaining']._invalidate_remaining_cache(self.project_id.ids)
         res = super().unlink()
 
         # after `unlink`
@@ -81,6 +102,15 @@ class AccountMoveBudgetLine(models.Model):
         
         return res
 
+    def _mark_store_dirty(self):
+        """ Budget lines drive the hourly valuation of the project's expenses """
+        self.env['carpentry.budget.expense.detail']._mark_store_dirty(
+            project_ids=self.project_id.ids
+        )
+    
+    def _mark_hourly_cost_dirty(self):
+        self.env['carpentry.budget.hourly.cost']._mark_hourly_cost_dirty(project_ids=self.project_id.ids)
+
     #===== Compute =====#
     @api.depends('budget_id.date_from')
     def _compute_date(self):
@@ -117,7 +147,8 @@ class AccountMoveBudgetLine(models.Model):
         super(AccountMoveBudgetLine, self - line_ids_computed)._compute_debit_credit()
 
         # perf early quit
-        if not line_ids_computed:
+        # (in bulk mode, computed lines are refreshed by `project._budget_full_refresh`)
+        if not line_ids_computed or self._context.get('import_budget_no_compute'):
             return
         
         # Ensure correct values in database
@@ -8,13 +8,21 @@ class CarpentryAffectation(models.Model):
     _inherit = ["carpentry.affectation"]
 
     #===== CRUD =====#
+    @api.model_create_multi
+    def create(self, vals_list):
+        affectations = super().create(vals_list)
+        self.env['carpentry.budget.remaining']._invalidate_remaining_cache(affectations.project_id.ids)
+        return affectations
+    
     def write(self, vals):
         """ Prevent lowering `quantity_affected` of a
             position to launch (through a phase)
             if it causes negative budgets
         """
+        self.env['carpentry.budget.remaining']._invalidate_remaining_cache(self.project_id.ids)
         res = super().write(vals)
-        if any(x in vals for x in ('quantity_affected', 'affected')):
+        bulk_mode = self._context.get('import_budget_no_compute')
+        if any(x in vals for x in ('quantity_affected', 'affected')) and not bulk_mode:
             launchs = self._get_launchs_and_children_launchs()
             self._clean_reservation_and_constrain_budget(launchs.ids)
         return res
@@ -25,8 +33,16 @@ class CarpentryAffectation(models.Model):
             :arg self: launch affectations
         """
         launchs = self._get_launchs_and_children_launchs()
+        self.env['carpentry.budget.remaining']._invalidate_remaining_cache(self.project_id.ids)
         res = super().unlink()
-        self._clean_reservation_and_constrain_budget(launchs.ids)
+        if not self._context.get('import_budget_no_compute'):
+            self._clean_reservation_and_constrain_budget(launchs.ids)
+        return res
+    
+    def _compute_active(self):
+        """ Stored compute (from parents' `active`): not written with `write()` """
+        res = super()._compute_active()
+        self.env['carpentry.budget.remaining']._invalidate_remaining_cache(self.project_id._origin.ids)
         return res
     
     @api.ondelete(at_uninstall=False)
@@ -22,6 +22,12 @@ class CarpentryAffectationMixin(models.AbstractModel):
     budget_total = fields.Monetary(string='Total', compute='_compute_budgets', currency_field='currency_id')
     
     #===== CRUD =====#
+    def write(self, vals):
+        """ Available budgets only sum active launches, phases, lots and positions """
+        if 'active' in vals:
+            self.env['carpentry.budget.remaining']._invalidate_remaining_cache(self.project_id.ids)
+        return super().write(vals)
+    
     def unlink(self):
         """ Unlink affectations by ORM, to trigger
             `_clean_reservation_and_constrain_budget` if needed
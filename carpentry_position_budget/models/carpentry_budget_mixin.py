@@ -13,6 +13,70 @@ from datetime import datetime
 import calendar
 from collections import defaultdict
 
+def allocate_budget_reservation(matrix, mapped_remaining_budget, prec):
+    """ Spread budgetable amounts of records over their reservations, in a greedy way:
+        record after record, each reservation reserves its share of the record's amount,
+        maximized to the budget still remaining after previous reservations.
+        The share of a launch is its remaining budget over the total remaining
+        of the same budget center (project, aac), computed at the start of each record.
+
+        :arg matrix: list (per record) of list of `(key_budget, amount_budgetable)`,
+                     in reservations' order (`sequence_aac`, `sequence_launch`)
+        :arg mapped_remaining_budget: dict like {key_budget: remaining budget}, updated in-place
+        :return: list (per record) of list of reserved amounts, as `matrix`
+    """
+    # keys of launch budgets, per budget center, in the same order than `mapped_remaining_budget`
+    mapped_group_keys = defaultdict(list)
+    for key_budget in mapped_remaining_budget:
+        (project_id, launch_id, aac_id) = key_budget
+        if launch_id:
+            mapped_group_keys[(project_id, aac_id)].append(key_budget)
+
+    def _sum_group(group):
+        total = 0.0
+        for key_budget in mapped_group_keys[group]:
+            total += mapped_remaining_budget[key_budget]
+        return total
+    mapped_group_total = {group: _sum_group(group) for group in mapped_group_keys}
+
+    allocation = []
+    for row in matrix:
+        amounts, groups_updated = [], set()
+        for key_budget, amount_budgetable in row:
+            (project_id, launch_id, aac_id) = key_budget
+            remaining_budget = mapped_remaining_budget.get(key_budget, 0.0)
+
+            # 1. Spread the expense over launch (if needed)
+            if not key_budget in mapped_remaining_budget:
+                coef = 0.0
+            elif not launch_id:
+                coef = 1.0 # project budget: not distributed over launchs
+            else:
+                total_aac = mapped_group_total[(project_id, aac_id)]
+                coef = remaining_budget / total_aac if bool(total_aac) else 0.0
+            expense_spread = amount_budgetable * coef
+
+            # 2. Maximize expense to remaining available budget
+            amount = float_round(
+                min(expense_spread, remaining_budget),
+                precision_digits=prec, rounding_method='HALF-UP',
+            )
+            amount = max(0.0, amount) # prevent negative reservation
+            amounts.append(amount)
+
+            # update cursors for next iter
+            if key_budget in mapped_remaining_budget:
+                mapped_remaining_budget[key_budget] -= amount
+                if launch_id:
+                    groups_updated.add((project_id, aac_id))
+        
+        # launchs' shares are refreshed for the next record only
+        for group in groups_updated:
+            mapped_group_total[group] = _sum_group(group)
+        allocation.append(amounts)
+    
+    return allocation
+
 class CarpentryBudgetMixin(models.AbstractModel):
     """ Budget reservation fields & methods for inheriting models (records*)
         to reserve budget in `carpentry.budget.reservation`
@@ -123,8 +187,15 @@ class CarpentryBudgetMixin(models.AbstractModel):
     )
     
     #===== CRUD : reservations populate & line's analytic_distribution =====#
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['carpentry.budget.expense.detail']._mark_store_dirty(records)
+        return records
+    
     def write(self, vals):
         res = super().write(vals)
+        self.env['carpentry.budget.expense.detail']._mark_store_dirty(self)
 
         # -- after `write` --
         if 'launch_ids' in vals or (
@@ -141,6 +212,10 @@ class CarpentryBudgetMixin(models.AbstractModel):
 
         return res
     
+    def unlink(self):
+        self.env['carpentry.budget.expense.detail']._mark_store_dirty(self)
+        return super().unlink()
+    
     def _depends_reservation_refresh(self):
         """ To inherite. Fields that triggers automatic budget reservation.
             Used by `reservation_ids._compute_amount_reserved`, which process in order:
@@ -448,8 +523,9 @@ class CarpentryBudgetMixin(models.AbstractModel):
         if debug:
             print(' === _get_rg_result_expense (start) ===')
         
-        # read_group (-> this call is very expensive)
+        # read_group (refreshes the expense store of `self` beforehand)
         self._flush_budget()
+        self.env['carpentry.budget.expense.detail']._mark_store_dirty(self)
         Expense = self.env['carpentry.budget.expense'].with_context(active_test=False).sudo()
         rg_result = Expense._read_group(
             domain=[(self._record_field, 'in', self._origin.ids)],
@@ -584,43 +660,48 @@ class CarpentryBudgetMixin(models.AbstractModel):
         mapped_possibles = self._get_mapped_possible_reservations() # from Available
         mapped_existings = self._get_mapped_existing_reservations() # from Reservation
         Reservation = self.env['carpentry.budget.reservation']
-        to_unlink = Reservation
 
         if debug:
             print('rg_result', rg_result)
             print('mapped_possibles', mapped_possibles)
             print('mapped_existings', mapped_existings)
 
-        vals_list = []
+        # plan all records at once: keys are diffed in-memory against the 2 sets above,
+        # then reservations are created and removed in a single batch
+        vals_list, to_unlink_ids = [], []
         for record in self:
+            project_id = record.project_id.id
+            aac_ids = record.budget_analytic_ids._origin.ids
+
             # 1. Provision reservation_ids
-            for aac_id in record.budget_analytic_ids.ids:
+            for aac_id in aac_ids:
                 for launch_or_project_id in record._get_launch_ids(): # launch or project
                     # don't create reservation line if not possible or already existing
-                    key_budget = (record.project_id.id, launch_or_project_id, aac_id)
-                    key_resa = tuple(list(key_budget) + [record.id])
+                    key_budget = (project_id, launch_or_project_id, aac_id)
+                    key_resa = key_budget + (record.id,)
                     if not key_budget in mapped_possibles or key_resa in mapped_existings:
                         continue
 
-                    vals_list += [record._get_reservation_vals(*key_budget)]
-                    mapped_existings.append(key_resa) # for next iter
+                    vals_list.append(record._get_reservation_vals(*key_budget))
+                    mapped_existings.add(key_resa) # for next iter
             
             # 2. Remove reservations of unselected budget centers,
             #    or where there is no 'initially available' budget anymore
-            to_unlink |= record.reservation_ids.filtered(lambda resa: (
-                self._get_key(resa, mode='budget') not in mapped_possibles
-                or resa.analytic_account_id not in record.budget_analytic_ids
-                or resa.project_id != record.project_id
-            ))
+            to_unlink_ids += [
+                resa.id for resa in record.reservation_ids
+                if self._get_key(resa, mode='budget') not in mapped_possibles
+                or resa.analytic_account_id.id not in aac_ids
+                or resa.project_id.id != project_id
+            ]
 
         if debug:
             print('vals_list', vals_list)
-            print('to_unlink', to_unlink)
+            print('to_unlink_ids', to_unlink_ids)
         
         if vals_list:
             Reservation.create(vals_list)
-        if to_unlink:
-            to_unlink.unlink()
+        if to_unlink_ids:
+            Reservation.browse(to_unlink_ids).unlink()
         
         # allow computation and recompute
         self = self.with_context(carpentry_budget_no_compute=False)
@@ -631,8 +712,9 @@ class CarpentryBudgetMixin(models.AbstractModel):
 
     def _get_reservation_vals(self, project_id, launch_id, aac_id, amount_reserved=0.0):
         self.ensure_one()
-        aac = self.budget_analytic_ids.browse(aac_id)
-        launch = self.launch_ids.browse(launch_id)
+        # keep prefetching of budget centers and launchs of all records being computed
+        aac = self.budget_analytic_ids.browse(aac_id).with_prefetch(self.budget_analytic_ids._prefetch_ids)
+        launch = self.launch_ids.browse(launch_id).with_prefetch(self.launch_ids._prefetch_ids)
 
         return {
             # m2o
@@ -685,10 +767,10 @@ class CarpentryBudgetMixin(models.AbstractModel):
         debug = False
         if debug:
             print(' === _get_mapped_existing_reservations === ')
-        return [
+        return {
             self._get_key(reservation, mode='full')
             for reservation in self.reservation_ids
-        ]
+        }
 
     def _get_mapped_possible_reservations(self):
         """ Ensure not dummy reservations lines are created
@@ -702,24 +784,29 @@ class CarpentryBudgetMixin(models.AbstractModel):
         
         # optim
         if not self.budget_analytic_ids._origin:
-            return [tuple()]
+            return set()
 
+        # a single query for all records, only computed on their projects
+        launch_ids = set()
+        for record in self:
+            launch_ids.update(record._get_launch_ids())
+        
         Available = self.env['carpentry.budget.available']
         domain = [
             ('record_res_model', 'in', ['project.project', 'carpentry.group.launch']),
-            ('launch_id', 'in', self._get_launch_ids()),
+            ('launch_id', 'in', list(launch_ids)),
             ('analytic_account_id', 'in', self.budget_analytic_ids._origin.ids),
         ]
-        rg_result = Available._read_group(
+        rg_result = Available._read_group_project(
+            project_ids=self.project_id._origin.ids,
             domain=domain,
             groupby=['project_id', 'launch_id', 'analytic_account_id'],
             fields=[],
-            lazy=False,
         )
-        mapped_available = [
+        mapped_available = {
             self._get_key(vals=x, mode='budget')
             for x in rg_result
-        ]
+        }
         
         if debug:
             print(' == _get_mapped_possible_reservations (debug) ==')
@@ -802,43 +889,36 @@ class CarpentryBudgetMixin(models.AbstractModel):
         total_by_analytic = self._get_total_budgetable_by_analytic(rg_result)
         filter_budget_types = self._context.get('filter_budget_types', [])
 
+        # matrix (record x reservations) of budgetable amounts, in the reservations' order
+        matrix, reservations_list = [], []
         for record in self:
-            mapped_budget_ratio = self._get_budget_distribution(mapped_remaining_budget)
-
             # for MRP
             reservations = record.reservation_ids
             if filter_budget_types:
                 reservations = reservations.filtered(lambda x: x.budget_type in filter_budget_types)
             
-            for reservation in reservations:
-                key_budget = reservation._get_key(rec=reservation, mode='budget')
-                key_resa = tuple(list(key_budget) + [record.id])
+            matrix.append([(
+                (reservation.project_id.id, reservation.launch_id.id, reservation.analytic_account_id.id),
+                total_by_analytic.get((record.id, reservation.analytic_account_id.id), 0.0),
+            ) for reservation in reservations])
+            reservations_list.append(reservations)
+        
+        allocation = allocate_budget_reservation(matrix, mapped_remaining_budget, prec)
 
-                # in € or h
-                key_expense = (record.id, reservation.analytic_account_id.id)
-                total_price = total_by_analytic.get(key_expense, 0.0)
-                remaining_budget = mapped_remaining_budget.get(key_budget, 0.0)
+        # write reservations by batch of same amount
+        mapped_reservation_ids = defaultdict(list)
+        for reservations, amounts in zip(reservations_list, allocation):
+            for reservation, amount in zip(reservations, amounts):
+                mapped_reservation_ids[amount].append(reservation.id)
+        
+        Reservation = self.env['carpentry.budget.reservation']
+        for amount, reservation_ids in mapped_reservation_ids.items():
+            Reservation.browse(reservation_ids).amount_reserved = amount
 
-                # 1. Spread the expense over launch (if needed)
-                expense_spread = total_price * mapped_budget_ratio.get(key_budget, 0.0)
-                
-                # 2. Maximize expense to remaining available budget
-                amount = float_round(
-                    min(expense_spread, remaining_budget),
-                    precision_digits=prec, rounding_method='HALF-UP',
-                )
-                amount = max(0.0, amount) # prevent negative reservation
-                reservation.amount_reserved = amount
-
-                # update cursors for next iter
-                if key_budget in mapped_remaining_budget:
-                    mapped_remaining_budget[key_budget] -= amount
-
-                if debug:
-                    print(' === _auto_update_budget_reservation (result) === ')
-                    print('key', key_resa)
-                    print('expense_spread', expense_spread)
-                    print('reservation.amount_reserved', reservation.amount_reserved)
+        if debug:
+            print(' === _auto_update_budget_reservation (result) === ')
+            print('matrix', matrix)
+            print('allocation', allocation)
     
     def _get_total_budgetable_by_analytic(self, rg_result):
         """ :return: Dict like {analytic_id: real cost} where *real cost* is:
@@ -884,21 +964,27 @@ class CarpentryBudgetMixin(models.AbstractModel):
         if debug:
             print(' === _get_remaining_budget === ')
 
-        domain = [
-            ('project_id', 'in', self.project_id.ids),
-            ('launch_id', 'in', self._get_launch_ids()),
-            (self._record_field, 'not in', self.ids),
-        ]
-        rg_result = self.env['carpentry.budget.remaining'].read_group(
-            domain=domain,
-            groupby=['project_id', 'launch_id', 'analytic_account_id'],
-            fields=['amount_remaining:sum(amount_subtotal)'],
-            lazy=False,
+        launch_ids = set()
+        for record in self:
+            launch_ids.update(record._get_launch_ids())
+        
+        mapped_remaining = self.env['carpentry.budget.remaining']._get_remaining_cached(
+            project_ids=self.project_id._origin.ids,
+            launch_ids=list(launch_ids),
+            analytic_ids=(self.budget_analytic_ids | self.reservation_ids.analytic_account_id)._origin.ids,
         )
-        return {
-            self._get_key(vals=x, mode='budget'): x['amount_remaining']
-            for x in rg_result
+        mapped_remaining_budget = {
+            key: vals.get('budget', 0.0) + vals.get('reservation', 0.0)
+            for key, vals in mapped_remaining.items()
         }
+
+        # give back records' own reservations
+        for reservation in self.reservation_ids:
+            key_budget = self._get_key(rec=reservation, mode='budget')
+            if reservation.active and key_budget in mapped_remaining_budget:
+                mapped_remaining_budget[key_budget] += reservation.amount_reserved
+        
+        return mapped_remaining_budget
     
     def _get_budget_distribution(self, mapped_budget):
         """ Returns a coef per launch to spread `mapped_budget` on its launch.
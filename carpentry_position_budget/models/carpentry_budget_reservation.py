@@ -4,6 +4,7 @@ from odoo import models, fields, api, exceptions, _
 from odoo.osv import expression
 
 from odoo.tools import float_is_zero
+from collections import defaultdict
 
 class CarpentryBudgetReservation(models.Model):
     """ This model is quite similar to `carpentry.affectation`,
@@ -136,6 +137,42 @@ class CarpentryBudgetReservation(models.Model):
                 WHERE launch_id IS NULL;
             """)
     
+    #===== CRUD: expense store & remaining cache =====#
+    @api.model_create_multi
+    def create(self, vals_list):
+        reservations = super().create(vals_list)
+        reservations._mark_store_dirty()
+        reservations._invalidate_remaining_cache()
+        return reservations
+
+    def write(self, vals):
+        self._mark_store_dirty()
+        invalidate = any(field in vals for field in self._get_fields_remaining_cache())
+        if invalidate:
+            self._invalidate_remaining_cache()
+        res = super().write(vals)
+        if any(field in vals for field in self._get_record_fields()):
+            self._mark_store_dirty()
+        if invalidate:
+            self._invalidate_remaining_cache()
+        return res
+    
+    def unlink(self):
+        self._mark_store_dirty()
+        self._invalidate_remaining_cache()
+        return super().unlink()
+    
+    def _mark_store_dirty(self):
+        Detail = self.env['carpentry.budget.expense.detail']
+        for field in self._get_record_fields():
+            Detail._mark_store_dirty(self[field])
+    
+    def _get_fields_remaining_cache(self):
+        return ('project_id', 'launch_id', 'analytic_account_id', 'amount_reserved', 'active')
+    
+    def _invalidate_remaining_cache(self):
+        self.env['carpentry.budget.remaining']._invalidate_remaining_cache(self.project_id._origin.ids)
+    
     #===== Constrain: no overconsumption =====#
     @api.constrains('amount_reserved')
     def _constrain_amount_reserved(self):
@@ -247,30 +284,23 @@ class CarpentryBudgetReservation(models.Model):
         self = self.with_context(active_test=True)
 
         self.flush_model(['amount_reserved'])
-        domain=self._get_domain_budget_reservation(with_record=False) + [
-            '|',
-            ('record_res_model', 'in', ['project.project', 'carpentry.group.launch']), # exclude positions
-            ('state', '=', 'reservation'),
-        ]
-        _valued = '_valued' if self._context.get('brut_or_valued', 'brut') == 'valued' else ''
-        amount_field = 'amount_subtotal' + _valued
         rg_fields = ['project_id', 'launch_id', 'analytic_account_id']
-        rg_result = self.env['carpentry.budget.remaining']._read_group(
-            domain=domain,
-            groupby=['state'] + rg_fields,
-            fields=[amount_field + ':sum', 'ids:array_agg(id)', 'aggr:array_agg(' + amount_field + ')'],
-            lazy=False,
-        )
-        mapped_budgets = {'budget': {}, 'reservation': {}}
-        for x in rg_result:
-            key = tuple([x[field] and x[field][0] for field in rg_fields])
-            mapped_budgets[x['state']][key] = x[amount_field]
+        if self._context.get('brut_or_valued', 'brut') == 'brut':
+            # from the remaining budget cache
+            mapped_budgets = {'budget': {}, 'reservation': {}}
+            mapped_remaining = self.env['carpentry.budget.remaining']._get_remaining_cached(
+                project_ids=self.project_id._origin.ids,
+                launch_ids=[False] + self.launch_id._origin.ids,
+                analytic_ids=self.analytic_account_id._origin.ids,
+            )
+            for key, vals in mapped_remaining.items():
+                for state, amount in vals.items():
+                    mapped_budgets[state][key] = amount
+        else:
+            mapped_budgets = self._get_amount_initial_siblings_valued(rg_fields)
 
         if debug:
             print('reservation', self.read(rg_fields + ['balance_id', 'purchase_id', 'amount_reserved']))
-            print('domain', domain)
-            print('search_domain', self.env['carpentry.budget.remaining'].search_read(domain, ['state'] + rg_fields + [amount_field]))
-            print('rg_result', rg_result)
             print('mapped_budgets', mapped_budgets)
         
         for reservation in self:
@@ -289,6 +319,25 @@ class CarpentryBudgetReservation(models.Model):
             #     print('amount_reserved_siblings', reservation.amount_reserved_siblings)
             #     print('amount_remaining', reservation.amount_remaining)
 
+    def _get_amount_initial_siblings_valued(self, rg_fields):
+        """ Not cached: the remaining budget cache is in brut only """
+        domain=self._get_domain_budget_reservation(with_record=False) + [
+            '|',
+            ('record_res_model', 'in', ['project.project', 'carpentry.group.launch']), # exclude positions
+            ('state', '=', 'reservation'),
+        ]
+        rg_result = self.env['carpentry.budget.remaining']._read_group_project(
+            project_ids=self.project_id._origin.ids,
+            domain=domain,
+            groupby=['state'] + rg_fields,
+            fields=['amount_subtotal_valued:sum'],
+        )
+        mapped_budgets = {'budget': {}, 'reservation': {}}
+        for x in rg_result:
+            key = tuple([x[field] for field in rg_fields])
+            mapped_budgets[x['state']][key] = x['amount_subtotal_valued']
+        return mapped_budgets
+
     @api.depends('amount_initially_available', 'amount_reserved_siblings', 'amount_reserved')
     def _compute_amount_remaining(self):
         for reservation in self:
@@ -316,6 +365,7 @@ class CarpentryBudgetReservation(models.Model):
         reservations.flush_recordset(['amount_reserved'])
         reservations.project_id.flush_recordset(['date_start', 'date'])
         self.env['hr.employee.timesheet.cost.history'].flush_model()
+        self.env['carpentry.budget.hourly.cost']._refresh_hourly_cost()
 
         budget_types = self.env['account.analytic.account']._get_budget_type_workforce()
         self._cr.execute("""
@@ -374,6 +424,15 @@ class CarpentryBudgetReservation(models.Model):
                 mapped_reserved_budget[key] = 0.0
             mapped_reserved_budget[key] += reservation.amount_reserved
         
+        # count launchs' reservations per record and budget center,
+        # to spread when nothing is reserved
+        mapped_siblings_count = defaultdict(int)
+        for record_field in [x for x in record_fields if bool(x)]:
+            for sibling in self[record_field].reservation_ids:
+                if sibling.launch_id:
+                    key = (record_field, sibling[record_field].id, sibling.analytic_account_id.id)
+                    mapped_siblings_count[key] += 1
+        
         # compute
         prec = self.env['decimal.precision'].precision_get('Product Unit of Measure')
         for reservation in self:
@@ -386,11 +445,11 @@ class CarpentryBudgetReservation(models.Model):
             # * if 0.0 reserved, by number of launchs on this budget
             total_reserved = mapped_reserved_budget.get(key, 0.0)
             if float_is_zero(total_reserved, prec) and reservation.record_field:
-                record = reservation[reservation.record_field]
-                siblings = record.reservation_ids.filtered(lambda x:
-                    x.analytic_account_id == reservation.analytic_account_id and x.launch_id
+                record_field = reservation.record_field
+                count = mapped_siblings_count.get(
+                    (record_field, reservation[record_field].id, reservation.analytic_account_id.id), 0
                 )
-                ratio = 1 / len(siblings) if len(siblings) else 0.0
+                ratio = 1 / count if count else 0.0
             else:
                 ratio = reservation.amount_reserved / total_reserved if total_reserved else 0.0
             reservation.amount_expense_valued = expense_valued * ratio
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields
+from odoo import models, fields, api
+from odoo.addons.carpentry_position_budget.report.carpentry_budget_remaining import RemainingBudgetCache
 from collections import defaultdict
 
 def human_readable(num, scale=1000.0):
@@ -13,6 +14,7 @@ def human_readable(num, scale=1000.0):
 
 class CarpentryPlanningColumn(models.Model):
     _inherit = ["carpentry.planning.column"]
+    _headers_cache_size = 1024
 
     budget_types = fields.Char(
         string='Budget Type(s)',
@@ -31,18 +33,110 @@ class CarpentryPlanningColumn(models.Model):
         if not budget_types:
             return res
         
-        # 1. Available (brut)
         project = self.env['carpentry.group.launch'].browse(launch_id_).project_id
-        domain_budget = [('budget_type', 'in', budget_types)]
-        domain_project = domain_budget + [('project_id', '=', project.id), ('launch_id', '!=', False)]
-        domain_launch = domain_budget + [('launch_id', '=', launch_id_)]
+        mapped_budget = self._get_headers_budget_cached(project.id, budget_types).get(launch_id_, {})
+
+        # Format data per column
+        budget_types_workforce = self.env['account.analytic.account']._get_budget_type_workforce()
+        for column in self.filtered('budget_types'):
+            # valued ?
+            budget_types = column.budget_types.split(',')
+            is_hour = all([
+                budget_type in budget_types_workforce
+                for budget_type in budget_types
+            ])
+            valued = '' if is_hour else '_valued'
+
+            # sums
+            available, reserved, expense = 0.0, 0.0, 0.0
+            for budget_type in budget_types:
+                budget = mapped_budget.get(budget_type, {})
+                available += budget.get('available', 0.0)
+                reserved += budget.get('amount_reserved' + valued, 0.0)
+                expense += budget.get('amount_expense' + valued, 0.0)
+
+            res[column.id]['budget'] = {
+                'unit': 'h' if is_hour else '€',
+                'available': human_readable(available),
+                'reserved': human_readable(reserved),
+                'expense': human_readable(expense),
+            }
+
+        return res
+    
+    #===== Headers cache =====#
+    def _get_headers_cache(self):
+        registry = self.env.registry
+        cache = getattr(registry, '_carpentry_headers_cache', None)
+        if cache is None:
+            cache = registry._carpentry_headers_cache = RemainingBudgetCache(self._headers_cache_size)
+        return cache
+
+    @api.model
+    def _get_headers_budget_cached(self, project_id_, budget_types):
+        """ Headers budgets of all the launches of a project, computed once and
+            then read from the registry cache when switching launch in the planning
+
+            Entries share the versions of `carpentry.budget.remaining` cache, which
+            are bumped on changes of available budget, reservations (including from
+            affectations) and expenses (see `carpentry.budget.expense.detail._refresh_store`).
+            Budgets are read with the user's access rules, so entries are per user and companies
+
+            :return: see `_get_headers_budget_project`
+        """
+        Remaining = self.env['carpentry.budget.remaining']
+        # expenses changed in this transaction flag their projects as dirty
+        self.env['carpentry.budget.expense.detail'].sudo()._refresh_store()
+        dirty_project_ids = self.env.cr.precommit.data.get(Remaining._remaining_cache_key, set())
+        version = None if project_id_ in dirty_project_ids else (
+            Remaining._get_remaining_versions([project_id_]).get(project_id_)
+        )
+        
+        cache = self._get_headers_cache()
+        key = (
+            project_id_, version, tuple(sorted(budget_types)),
+            self.env.uid, tuple(sorted(self.env.companies.ids)),
+        )
+        value = None if version is None else cache.lru.get(key)
+        if value is not None:
+            cache.hit += 1
+            return value
+        
+        cache.miss += 1
+        value = self._get_headers_budget_project(project_id_, budget_types)
+        if version is not None:
+            cache.lru[key] = value
+        return value
+
+    @api.model
+    def _get_headers_budget_project(self, project_id_, budget_types):
+        """ Available, reserved and expense (distributed as per reserved budget)
+            of all launches of a project, per budget type
+
+            :return: dict like {launch_id: {budget_type: {
+                'available': float, 'amount_reserved': float, 'amount_reserved_valued': float,
+                'amount_expense': float, 'amount_expense_valued': float,
+            }}}
+        """
+        domain_project = [
+            ('budget_type', 'in', budget_types),
+            ('project_id', '=', project_id_),
+            ('launch_id', '!=', False),
+        ]
+        mapped_budget = defaultdict(lambda: defaultdict(lambda: defaultdict(float)))
+
+        # 1. Available (brut)
         rg_available = self.env['carpentry.budget.available']._read_group(
-            domain=domain_launch, groupby=['budget_type'], fields=['amount_subtotal:sum'],
+            domain=domain_project,
+            groupby=['launch_id', 'budget_type'],
+            fields=['amount_subtotal:sum'],
+            lazy=False,
         )
-        mapped_available = {x['budget_type']: x['amount_subtotal'] for x in rg_available}
+        for x in rg_available:
+            mapped_budget[x['launch_id'][0]][x['budget_type']]['available'] += x['amount_subtotal']
 
         # 2. Reserved (brut or valued)
-        # + for expense distribution per launch (only)
+        # + for expense distribution per launch
         BudgetMixin = self.env['carpentry.budget.mixin']
         Reservation = self.env['carpentry.budget.reservation']
         fields = ['amount_reserved', 'amount_reserved_valued']
@@ -53,27 +147,18 @@ class CarpentryPlanningColumn(models.Model):
             groupby=['launch_id', 'budget_type'] + record_fields,
             lazy=False,
         )
-        mapped_reserved = mapped_reserved_detail = mapped_reserved_per_record = {}
+        mapped_reserved_per_record = defaultdict(lambda: defaultdict(float))
         for x in rg_reserved:
-            budget_type = x['budget_type']
-
-            # for KPI: sum reserved budget per budget_type, for the launch being displayed on Kanban
-            if x['launch_id'][0] == launch_id_:
-                if not budget_type in mapped_reserved:
-                    mapped_reserved[budget_type] = {field: 0.0 for field in fields}
-                for field in fields:
-                    mapped_reserved[budget_type][field] += x[field]
+            launch_id_ = x['launch_id'][0]
+            for field in fields:
+                mapped_budget[launch_id_][x['budget_type']][field] += x[field]
             
-            # for expenses ratio: budget per budget_type, launch & records
-            # 'planning' key: (launch, records..., budget_type)
+            # for expenses ratio: budget per records & budget_type, and launch
             key_planning = BudgetMixin._get_key(vals=x, mode='planning', mask=record_fields + ['budget_type'])
-            key_record = tuple(list(key_planning)[1:]) # skip launch_id (item 0)
-            mapped_reserved_detail[key_planning] = x['amount_reserved']
-            if not key_record in mapped_reserved_per_record:
-                mapped_reserved_per_record[key_record] = 0.0
-            mapped_reserved_per_record[key_record] += x['amount_reserved']
+            key_record = key_planning[1:] # skip launch_id (item 0)
+            mapped_reserved_per_record[key_record][launch_id_] += x['amount_reserved']
 
-        # 3. Expense, distributed for launch_id as per its reserved budget within each section
+        # 3. Expense, distributed to launches as per their reserved budget within each section
         fields = ['amount_expense', 'amount_expense_valued']
         rg_expense = self.env['carpentry.budget.expense']._read_group(
             domain=domain_project,
@@ -81,47 +166,19 @@ class CarpentryPlanningColumn(models.Model):
             groupby=['budget_type'] + record_fields,
             lazy=False,
         )
-        mapped_expense = {}
         for x in rg_expense:
-            # 1st compute share of launch in the expense, at prorata of
-            # its reserved budget in the record on a given `budget_type`
-            key_planning = tuple([launch_id_] + list(
-                BudgetMixin._get_key(vals=x, mode='planning', mask=record_fields + ['budget_type'])
-            ))
-            key_record = tuple(list(key_planning)[1:]) # skip launch_id (item 0)
-            launch_reserved = mapped_reserved_detail.get(key_planning, 0.0)
-            total_reserved = mapped_reserved_per_record.get(key_record, 0.0)
-            prorata_reserved = launch_reserved / total_reserved if total_reserved else 0.0
-
-            budget_type = x['budget_type']
-            if not budget_type in mapped_expense:
-                mapped_expense[budget_type] = {field: 0.0 for field in fields}
-            for field in fields:
-                mapped_expense[budget_type][field] += x[field] * prorata_reserved
-
-        # 4. Format data per column
-        budget_types_workforce = self.env['account.analytic.account']._get_budget_type_workforce()
-        for column in self.filtered('budget_types'):
-            # valued ?
-            budget_types = column.budget_types.split(',')
-            is_hour = all([
-                budget_type in budget_types_workforce
-                for budget_type in budget_types
-            ])
-            valued = '' if is_hour else '_valued'
-
-            # sums
-            available, reserved, expense = 0.0, 0.0, 0.0
-            for budget_type in budget_types:
-                available += mapped_available.get(budget_type, 0.0)
-                reserved += mapped_reserved.get(budget_type, {}).get('amount_reserved' + valued, 0.0)
-                expense += mapped_expense.get(budget_type, {}) .get('amount_expense'  + valued, 0.0)
-
-            res[column.id]['budget'] = {
-                'unit': 'h' if is_hour else '€',
-                'available': human_readable(available),
-                'reserved': human_readable(reserved),
-                'expense': human_readable(expense),
-            }
-
-        return res
+            key_record = BudgetMixin._get_key(vals=x, mode='planning', mask=record_fields + ['budget_type'])
+            mapped_reserved = mapped_reserved_per_record.get(key_record, {})
+            total_reserved = sum(mapped_reserved.values())
+            if not total_reserved:
+                continue
+            
+            for launch_id_, launch_reserved in mapped_reserved.items():
+                prorata_reserved = launch_reserved / total_reserved
+                for field in fields:
+                    mapped_budget[launch_id_][x['budget_type']][field] += x[field] * prorata_reserved
+        
+        return {
+            launch_id_: {budget_type: dict(budget) for budget_type, budget in mapped_budget_type.items()}
+            for launch_id_, mapped_budget_type in mapped_budget.items()
+        }
@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api, exceptions, _
+from odoo.tools import split_every
 from collections import defaultdict
 
 class CarpentryPositionBudget(models.Model):
     _name = 'carpentry.position.budget'
     _description = 'Position Budget'
+    _upsert_chunk_size = 1000
 
     # primary keys
     project_id = fields.Many2one(
@@ -85,6 +87,7 @@ class CarpentryPositionBudget(models.Model):
     def create(self, vals_list):
         records = super().create(vals_list)
         records.project_id._populate_account_move_budget_line('add', records.analytic_account_id)
+        self.env['carpentry.budget.remaining']._invalidate_remaining_cache(records.project_id.ids)
         return records
     
     def copy(self, default={}):
@@ -94,7 +97,8 @@ class CarpentryPositionBudget(models.Model):
 
     def write(self, vals):
         res = super().write(vals)
-        if 'amount_unitary' in vals:
+        self.env['carpentry.budget.remaining']._invalidate_remaining_cache(self.project_id.ids)
+        if 'amount_unitary' in vals and not self._context.get('import_budget_no_compute'):
             affectations = self.position_id.affectation_ids
             launchs = affectations._get_launchs_and_children_launchs()
             affectations._clean_reservation_and_constrain_budget(launchs.ids)
@@ -105,12 +109,14 @@ class CarpentryPositionBudget(models.Model):
             2. Ensure no negative budget in reservation
         """
         # before `unlink`
+        self.env['carpentry.budget.remaining']._invalidate_remaining_cache(self.project_id.ids)
         self._remove_project_budget_lines()
         launchs = self.position_id.affectation_ids._get_launchs_and_children_launchs()
         res = super().unlink()
         
         # after `unlink`
-        self.env['carpentry.affectation']._clean_reservation_and_constrain_budget(launchs.ids)
+        if not self._context.get('import_budget_no_compute'):
+            self.env['carpentry.affectation']._clean_reservation_and_constrain_budget(launchs.ids)
         return res
 
     def _remove_project_budget_lines(self):
@@ -187,28 +193,101 @@ class CarpentryPositionBudget(models.Model):
             :param mode_erase:  if True,  `amount_unitary` is written in place of any existing
                                  budget, or created if no budget
                                 if False, `amount_unitary` is added to existing budget
-            :param erase_force: if True, the existing non-updated budgets are removed
-        """
+            :param erase_force: if True, the existing budgets of `self` which are not
+                                in `vals_list_budget` are removed
 
-        # get existing budget, to route between `write()` or `create()`
-        mapped_existing_ids = {(x.position_id.id, x.analytic_account_id.id): x for x in self}
-        vals_list, to_delete = [], self
+            Budget logics (project's budget lines, reservations) are not computed per row
+            but refreshed once at the end, unless the caller already runs in bulk mode
+            (context `import_budget_no_compute`), then the caller refreshes them
+        """
+        bulk_caller = self._context.get('import_budget_no_compute')
+        self = self.with_context(import_budget_no_compute=True)
 
-        # write/sum
+        # fold `vals_list_budget` on primary key (position, analytic)
+        mapped_amount = defaultdict(float)
         for vals in vals_list_budget:
             primary_key = (vals.get('position_id'), vals.get('analytic_account_id'))
-            budget = mapped_existing_ids.get(primary_key)
-
-            if budget:
-                budget.amount_unitary = vals.get('amount_unitary') if erase_mode else budget.amount_unitary + vals.get('amount_unitary')
-                to_delete -= budget # for `erase_force` if True
+            if erase_mode:
+                mapped_amount[primary_key] = vals.get('amount_unitary')
             else:
-                vals_list.append(vals)
+                mapped_amount[primary_key] += vals.get('amount_unitary')
         
-        # create
-        if vals_list:
-            self.create(vals_list)
+        # create or write/sum
+        budgets = self._upsert_budget(mapped_amount, erase_mode)
+        projects = self.project_id | budgets.project_id
+        self.env['carpentry.budget.remaining']._invalidate_remaining_cache(projects.ids)
 
         # delete
         if erase_mode and erase_force:
-            to_delete.unlink()
+            (self - budgets).unlink()
+        
+        if not bulk_caller:
+            projects._budget_full_refresh()
+
+    def _upsert_budget(self, mapped_amount, erase_mode):
+        """ Create or update budgets by `INSERT ... ON CONFLICT` on the unique
+            key (position, analytic) instead of the ORM write pipeline, then
+            invalidate the cache and mark fields to recompute of the touched budgets
+            (!) no CRUD overrides: see `_write_budget` for the budget logics
+
+            :arg mapped_amount: dict like {(position_id, analytic_account_id): amount_unitary}
+            :arg erase_mode: see `_write_budget`
+            :return: recordset of created or updated budgets
+        """
+        if not mapped_amount:
+            return self.browse()
+        
+        self.check_access_rights('create')
+        self.check_access_rights('write')
+        self.env['carpentry.position'].flush_model(['project_id'])
+        self.flush_model(['position_id', 'analytic_account_id', 'amount_unitary'])
+
+        # stored related fields, filled in the query
+        positions = self.env['carpentry.position'].browse({key[0] for key in mapped_amount if key[0]})
+        analytics = self.env['account.analytic.account'].browse({key[1] for key in mapped_amount if key[1]})
+        mapped_project_id = {position.id: position.project_id.id for position in positions}
+        mapped_budget_type = {analytic.id: analytic.budget_type for analytic in analytics}
+
+        amount_sql = 'EXCLUDED.amount_unitary' if erase_mode else 'budget.amount_unitary + EXCLUDED.amount_unitary'
+        row_sql = "(%s, %s, %s, %s, %s, %s, now() at time zone 'UTC', %s, now() at time zone 'UTC')"
+        budget_ids, created_ids = [], []
+        for chunk in split_every(self._upsert_chunk_size, mapped_amount.items(), list):
+            params = []
+            for (position_id, analytic_account_id), amount_unitary in chunk:
+                params += [
+                    mapped_project_id.get(position_id), position_id, analytic_account_id,
+                    mapped_budget_type.get(analytic_account_id), amount_unitary,
+                    self.env.uid, self.env.uid,
+                ]
+            self.env.cr.execute(f"""
+                INSERT INTO carpentry_position_budget AS budget (
+                    project_id, position_id, analytic_account_id, budget_type, amount_unitary,
+                    create_uid, create_date, write_uid, write_date
+                )
+                VALUES {', '.join([row_sql] * len(chunk))}
+                ON CONFLICT (position_id, analytic_account_id) DO UPDATE SET
+                    amount_unitary = {amount_sql},
+                    write_uid = EXCLUDED.write_uid,
+                    write_date = EXCLUDED.write_date
+                RETURNING id, (xmax = 0) AS created
+            """, params)
+            for budget_id, created in self.env.cr.fetchall():
+                budget_ids.append(budget_id)
+                if created:
+                    created_ids.append(budget_id)
+        
+        # cache & recompute, only for touched records
+        budgets, created = self.browse(budget_ids), self.browse(created_ids)
+        budgets.invalidate_recordset(['amount_unitary', 'write_uid', 'write_date'])
+        positions.invalidate_recordset(['position_budget_ids'])
+        positions.project_id.invalidate_recordset(['position_budget_ids'])
+
+        to_compute = [
+            field for field in self._fields.values()
+            if field.store and field.compute and field.name not in ('project_id', 'budget_type')
+        ]
+        for field in to_compute:
+            self.env.add_to_compute(field, created)
+        created.modified(self._fields, create=True)
+        (budgets - created).modified(['amount_unitary'])
+        return budgets
@@ -12,10 +12,12 @@ class HrEmployeeTimesheetCostHistory(models.Model):
         return histories
 
     def write(self, vals):
+        # when moved to another analytic account, the former one is outdated too
+        aacs_old = self.analytic_account_id
         res = super().write(vals)
         fields = ('analytic_account_id', 'starting_date', 'date_to', 'hourly_cost')
         if any(x in vals for x in fields):
-            self._update_budget_totals()
+            self._update_budget_totals(aacs_old | self.analytic_account_id)
         return res
     
     def unlink(self):
@@ -38,6 +40,11 @@ class HrEmployeeTimesheetCostHistory(models.Model):
         aacs = aacs or self.analytic_account_id
         if not aacs:
             return
+        
+        # update hourly costs and expense store (valuation of workforce)
+        self.env['carpentry.budget.hourly.cost']._mark_hourly_cost_dirty(analytic_ids=aacs.ids)
+        budget_lines = self.env['account.move.budget.line'].search([('analytic_account_id', 'in', aacs.ids)])
+        self.env['carpentry.budget.expense.detail']._mark_store_dirty(project_ids=budget_lines.project_id.ids)
 
         # update reservations
         reservations = self.env['carpentry.budget.reservation'].search(
@@ -46,6 +53,7 @@ class HrEmployeeTimesheetCostHistory(models.Model):
         if not reservations:
             return
         reservations._compute_amount_reserved_valued()
+        self.env['carpentry.budget.remaining']._invalidate_remaining_cache(reservations.project_id.ids)
 
         # update records
         record_fields = reservations._get_record_fields()
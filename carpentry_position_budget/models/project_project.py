@@ -17,6 +17,15 @@ class Project(models.Model):
         related='position_ids.warning_name'
     )
 
+    #===== CRUD =====#
+    def write(self, vals):
+        res = super().write(vals)
+        if any(field in vals for field in ('date_start', 'date')):
+            # hourly valuation of expenses depends on project's dates
+            self.env['carpentry.budget.hourly.cost']._mark_hourly_cost_dirty(project_ids=self.ids)
+            self.env['carpentry.budget.expense.detail']._mark_store_dirty(project_ids=self.ids)
+        return res
+    
     #===== User interface =====#
     def _get_warning_banner(self):
         """ Show alert banner in project's form in case of a warning on positions' names """
@@ -117,3 +126,45 @@ class Project(models.Model):
         
         else:
             raise exceptions.UserError(_('Operation not supported'))
+
+    def _budget_full_refresh(self):
+        """ Set-based refresh after a bulk write of positions' budgets
+            (context `import_budget_no_compute`), in place of the
+            per-row recomputation of the budget logics:
+            1. computed budget lines: one per analytic of the positions' budgets
+            2. amounts of computed budget lines
+            3. budget reservations cleaning and constraint, per launch
+        """
+        self = self.with_context(import_budget_no_compute=False)
+        self.env.flush_all()
+
+        rg_result = self.env['carpentry.position.budget']._read_group(
+            domain=[('project_id', 'in', self.ids)],
+            groupby=['project_id'],
+            fields=['analytic_account_id:array_agg'],
+        )
+        mapped_analytic_ids = {x['project_id'][0]: set(x['analytic_account_id']) for x in rg_result}
+        Analytic = self.env['account.analytic.account']
+
+        # 1a. remove obsolete computed lines
+        for project in self:
+            lines = project.budget_line_ids.filtered('is_computed_carpentry')
+            to_remove = set(lines.analytic_account_id.ids) - mapped_analytic_ids.get(project.id, set())
+            if to_remove:
+                project._populate_account_move_budget_line('remove', Analytic.browse(to_remove))
+        
+        # 2. amounts of existing computed lines, in 1 go for all projects
+        self.budget_line_ids.filtered('is_computed_carpentry')._compute_debit_carpentry()
+
+        # 1b. add missing computed lines (computed at creation)
+        for project in self:
+            analytic_ids = mapped_analytic_ids.get(project.id, set())
+            if analytic_ids:
+                project._populate_account_move_budget_line('add', Analytic.browse(analytic_ids))
+        
+        # 3.
+        self.env['carpentry.budget.remaining']._invalidate_remaining_cache(self.ids)
+        self.env['carpentry.affectation']._clean_reservation_and_constrain_budget(
+            launch_ids=self.launch_ids.ids,
+            project_ids=self.ids,
+        )
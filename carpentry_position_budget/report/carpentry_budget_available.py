@@ -2,6 +2,11 @@
 
 from odoo import models, fields, tools, api
 from psycopg2.extensions import AsIs
+from odoo.addons.carpentry_base.tools import sql_id_hash
+
+import re
+
+regex_field_agg = re.compile(r'(\w+):(\w+)(?:\((\w+)\))?')
 
 class CarpentryBudgetAvailable(models.Model):
     """ Union of:
@@ -105,72 +110,79 @@ class CarpentryBudgetAvailable(models.Model):
             'project.project', 'carpentry.group.launch', 'carpentry.group.phase', 'carpentry.position',
         )
     
+    def _get_view_dependencies(self):
+        """ Views read by this view, to be scoped too in `_read_group_project` """
+        return []
+    
     def init(self):
         tools.drop_view_if_exists(self.env.cr, self._table)
-        
-        queries = self._get_queries()
-        if queries:
-            budget_types = self.env['account.analytic.account']._get_budget_type_workforce()
-
-            self._cr.execute("""
-                CREATE or REPLACE VIEW %(table_name)s AS (
-                    
-                    SELECT
-                        row_number() OVER (ORDER BY result.unique_key) AS id,
-                        result.project_id,
-                        result.launch_id,
-                        result.phase_id,
-                        result.position_id,
-                        result.record_model_id,
-                        result.analytic_account_id,
-                        result.budget_type,
-                        result.active,
-                        SUM(result.quantity_affected) AS quantity_affected,
-                        SUM(result.amount_unitary) AS amount_unitary,
-                        SUM(result.amount_subtotal) AS amount_subtotal,
-                        CASE
-                            WHEN result.budget_type = ANY(%(budget_types)s)
-                            THEN SUM(result.amount_subtotal) * hourly_cost.coef
-                            ELSE SUM(result.amount_subtotal)
-                        END AS amount_subtotal_valued
-                    
-                    FROM (
-                        (%(sql_union)s)
-                    ) AS result
-                    
-                    LEFT JOIN carpentry_budget_hourly_cost AS hourly_cost
-                        ON  hourly_cost.project_id = result.project_id
-                        AND hourly_cost.analytic_account_id = result.analytic_account_id
-
-                    GROUP BY
-                        result.unique_key,
-                        result.project_id,
-                        result.launch_id,
-                        result.phase_id,
-                        result.position_id,
-                        result.record_model_id,
-                        result.analytic_account_id,
-                        result.budget_type,
-                        result.active,
-                        hourly_cost.coef
-                )""", {
-                    'table_name': AsIs(self._table),
-                    'sql_union': AsIs(') UNION ALL (' . join(queries)),
-                    'budget_types': budget_types
-                }
-            )
+        self._cr.execute("CREATE or REPLACE VIEW %s AS (%s)", (
+            AsIs(self._table),
+            AsIs(self._get_view_sql()),
+        ))
+    
+    def _get_view_sql(self, project_ids=None):
+        """ :option project_ids: restrict each UNION's sub-query to these projects
+            :return: SQL of the view's body
+        """
+        budget_types = self.env['account.analytic.account']._get_budget_type_workforce()
+        return self._cr.mogrify("""
+            SELECT
+                %(sql_id)s AS id,
+                result.project_id,
+                result.launch_id,
+                result.phase_id,
+                result.position_id,
+                result.record_model_id,
+                result.analytic_account_id,
+                result.budget_type,
+                result.active,
+                SUM(result.quantity_affected) AS quantity_affected,
+                SUM(result.amount_unitary) AS amount_unitary,
+                SUM(result.amount_subtotal) AS amount_subtotal,
+                CASE
+                    WHEN result.budget_type = ANY(%(budget_types)s)
+                    THEN SUM(result.amount_subtotal) * hourly_cost.coef
+                    ELSE SUM(result.amount_subtotal)
+                END AS amount_subtotal_valued
+            
+            FROM (
+                (%(sql_union)s)
+            ) AS result
+            
+            LEFT JOIN carpentry_budget_hourly_cost AS hourly_cost
+                ON  hourly_cost.project_id = result.project_id
+                AND hourly_cost.analytic_account_id = result.analytic_account_id
+
+            GROUP BY
+                result.unique_key,
+                result.project_id,
+                result.launch_id,
+                result.phase_id,
+                result.position_id,
+                result.record_model_id,
+                result.analytic_account_id,
+                result.budget_type,
+                result.active,
+                hourly_cost.coef
+            """, {
+                'sql_id': AsIs(sql_id_hash('result.unique_key')),
+                'sql_union': AsIs(') UNION ALL (' . join(self._get_queries(project_ids))),
+                'budget_types': budget_types
+            }
+        ).decode()
     
-    def _get_queries(self):
+    def _get_queries(self, project_ids=None):
         return (
-            self._init_query(model)
+            self._init_query(model, project_ids)
             for model in self._get_queries_models()
         )
     
-    def _init_query(self, model):
+    def _init_query(self, model, project_ids=None):
         # (!) Warning: `models` only contains models created before module `carpentry_position_budget`
         models = {x['model']: x['id'] for x in self.env['ir.model'].sudo().search_read([], ['model'])}
 
-        return """
+        query = """
             {select}
             {from_table}
             {join}
@@ -188,6 +200,14 @@ class CarpentryBudgetAvailable(models.Model):
             having=self._having(model, models),
         )
 
+        if project_ids:
+            # pushed down by Postgres in the sub-query, since `project_id` is always grouped
+            query = self._cr.mogrify(
+                "SELECT * FROM (%s) AS branch WHERE branch.project_id IN %s",
+                (AsIs(query), tuple(project_ids))
+            ).decode()
+        return query
+
     def _select(self, model, models):
         if model == 'project.project':
             return f"""
@@ -329,7 +349,54 @@ class CarpentryBudgetAvailable(models.Model):
     def _having(self, model, models):
         return ''
 
+    #===== Project-scoped query =====#
+    @api.model
+    def _read_group_project(self, project_ids, domain, groupby, fields):
+        """ Equivalent of `_read_group(lazy=False)`, but the view (and the ones it reads)
+            are only computed for `project_ids` instead of the whole company.
+            
+            :arg fields: aggregates like `amount_subtotal:sum` or `amount_remaining:sum(amount_subtotal)`
+            :return: list of dict, with ids (not tuples) for many2one of `groupby`
+        """
+        if not project_ids:
+            return []
+        self._flush_search(domain)
+        
+        # views are shadowed by CTEs of the same name, computed for `project_ids` only
+        sql_ctes = ', ' . join([
+            '{} AS ({})' . format(self.env[model]._table, self.env[model]._get_view_sql(project_ids))
+            for model in self._get_view_dependencies() + [self._name]
+        ]).replace('%', '%%')
+
+        query = self._where_calc(domain)
+        self._apply_ir_rules(query, 'read')
+        from_clause, where_clause, where_params = query.get_sql()
+
+        sql_groupby = ['"{}"."{}"' . format(self._table, field) for field in groupby]
+        sql_fields = []
+        for spec in fields:
+            alias, func, field = regex_field_agg.match(spec).groups()
+            sql_fields.append('{}("{}"."{}") AS "{}"' . format(func, self._table, field or alias, alias))
+
+        self._cr.execute(f"""
+            WITH {sql_ctes}
+            SELECT {', ' . join(sql_groupby + sql_fields)}
+            FROM {from_clause}
+            WHERE {where_clause or 'TRUE'}
+            {'GROUP BY ' + ', ' . join(sql_groupby) if sql_groupby else ''}
+        """, where_params)
+
+        return [
+            {k: False if v is None and k in groupby else v for k, v in row.items()}
+            for row in self._cr.dictfetchall()
+        ]
+
     #===== ORM method =====#
+    def _flush_search(self, domain, fields=None, order=None, seen=None):
+        """ Hourly costs are joined by the budget reports """
+        self.env['carpentry.budget.hourly.cost']._refresh_hourly_cost()
+        return super()._flush_search(domain, fields=fields, order=order, seen=seen)
+    
     @api.model
     def read_group(self, domain, fields, groupby, offset=0, limit=None, orderby=False, lazy=True):
         """ Add position's `quantity_affected` in position's `display_name`
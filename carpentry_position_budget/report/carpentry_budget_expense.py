@@ -2,6 +2,9 @@
 
 from odoo import models, fields, api, tools
 from psycopg2.extensions import AsIs
+from odoo.addons.carpentry_base.tools import sql_id_hash
+
+from collections import defaultdict
 
 
 class CarpentryBudgetExpenseDetail(models.Model):
@@ -12,6 +15,10 @@ class CarpentryBudgetExpenseDetail(models.Model):
     _inherit = ['carpentry.budget.remaining']
     _description = 'Expenses Detail'
     _auto = False
+    _expense_query_view = 'carpentry_budget_expense_detail_query'
+    _expense_store_table = 'carpentry_budget_expense_detail_store'
+    _name_detail = 'carpentry.budget.expense.detail'
+    _store_key = 'carpentry_budget_expense_store'
     
     #===== Fields =====#
     state = fields.Selection(
@@ -77,7 +84,12 @@ class CarpentryBudgetExpenseDetail(models.Model):
         return ('carpentry.budget.reservation','account.analytic.line',)
     
     def init(self):
+        """ `carpentry_budget_expense_detail` is a thin view over a materialized store table,
+            which is filled from the heavy UNION query (`_expense_query_view`) and maintained incrementally
+            from the CRUD of the budget models (see `_mark_store_dirty`)
+        """
         tools.drop_view_if_exists(self.env.cr, self._table)
+        tools.drop_view_if_exists(self.env.cr, self._expense_query_view)
         
         queries = self._get_queries()
         if queries:
@@ -85,11 +97,7 @@ class CarpentryBudgetExpenseDetail(models.Model):
             self._cr.execute("""
                 CREATE or REPLACE VIEW %(view_name)s AS (
                     SELECT
-                        row_number() OVER (ORDER BY
-                            expense.record_id,
-                            expense.record_model_id,
-                            expense.analytic_account_id
-                        ) AS id,
+                        %(sql_id)s AS id,
                         expense.project_id,
                         expense.state,
                         expense.date,
@@ -97,7 +105,6 @@ class CarpentryBudgetExpenseDetail(models.Model):
                         
                         expense.record_id,
                         expense.record_model_id,
-                        %(sql_record_fields)s
                         expense.analytic_account_id,
                         expense.budget_type,
                         hourly_cost.coef AS hourly_cost_coef, -- for `carpentry.budget.expense.distributed`
@@ -195,15 +202,196 @@ class CarpentryBudgetExpenseDetail(models.Model):
                         expense.analytic_account_id,
                         expense.budget_type,
                         hourly_cost.coef
-                    ORDER BY
-                        expense.record_id
                 )""", {
-                    'view_name': AsIs(self._table),
-                    'sql_record_fields': AsIs(self._sql_record_fields('expense.')),
+                    'view_name': AsIs(self._expense_query_view),
+                    'sql_id': AsIs(sql_id_hash(
+                        'expense.project_id', 'expense.state', 'expense.date', 'expense.active',
+                        'expense.record_model_id', 'expense.record_id', 'expense.analytic_account_id',
+                        'expense.budget_type', 'hourly_cost.coef',
+                    )),
                     'budget_types': tuple(budget_types),
                     'union': AsIs(') UNION ALL (' . join(queries)),
             })
+
+            self._init_store()
+            self._cr.execute("CREATE or REPLACE VIEW %s AS (%s)", (
+                AsIs(self._table),
+                AsIs(self._get_view_sql()),
+            ))
+    
+    def _get_view_dependencies(self):
+        return []
+    
+    def _get_view_sql(self, project_ids=None):
+        """ Thin view over the store """
+        return self._cr.mogrify("""
+            SELECT
+                store.id,
+                store.project_id,
+                store.state,
+                store.date,
+                store.active,
+                
+                store.record_id,
+                store.record_model_id,
+                %(sql_record_fields)s
+                store.analytic_account_id,
+                store.budget_type,
+                store.hourly_cost_coef,
+
+                store.amount_reserved,
+                store.amount_reserved_valued,
+                store.amount_expense,
+                store.amount_expense_valued,
+                store.amount_gain
+            FROM %(store_name)s AS store
+            WHERE %(sql_where)s
+            """, {
+                'store_name': AsIs(self._expense_store_table),
+                'sql_record_fields': AsIs(self._sql_record_fields('store.')),
+                'sql_where': AsIs(
+                    self._cr.mogrify('store.project_id IN %s', [tuple(project_ids)]).decode()
+                    if project_ids else 'TRUE'
+                ),
+        }).decode()
+    
+    #===== Materialized store =====#
+    def _init_store(self):
+        """ (Re)create the store table and fully fill it,
+            since the UNION query may have changed with installed sub-modules
+        """
+        self._cr.execute("""
+            DROP TABLE IF EXISTS %(store_name)s CASCADE;
+            CREATE TABLE %(store_name)s (
+                id BIGINT PRIMARY KEY, -- hash of the row's key, see `sql_id_hash`
+                project_id INTEGER,
+                state VARCHAR,
+                date DATE,
+                active BOOLEAN,
+                record_id INTEGER,
+                record_model_id INTEGER,
+                analytic_account_id INTEGER,
+                budget_type VARCHAR,
+                hourly_cost_coef DOUBLE PRECISION,
+                amount_reserved DOUBLE PRECISION,
+                amount_reserved_valued DOUBLE PRECISION,
+                amount_expense DOUBLE PRECISION,
+                amount_expense_valued DOUBLE PRECISION,
+                amount_gain DOUBLE PRECISION
+            );
+            CREATE INDEX %(store_name)s_record_idx
+                ON %(store_name)s (record_model_id, record_id, analytic_account_id, state, date);
+            CREATE INDEX %(store_name)s_project_idx
+                ON %(store_name)s (project_id);
+        """, {'store_name': AsIs(self._expense_store_table)})
+        self._rebuild_store()
+
+    @api.model
+    def _rebuild_store(self):
+        """ Full refresh of the store: fallback when incremental maintenance
+            cannot be trusted (data migration, direct SQL writes, ...)
+        """
+        self.env[self._name_detail]._store_data_pop()
+        self.env['carpentry.budget.hourly.cost']._refresh_hourly_cost()
+        self._cr.execute(f"TRUNCATE {self._expense_store_table}")
+        self._cr.execute(self._get_sql_store_insert() % (self._expense_store_table, self._expense_query_view, 'TRUE'))
+
+    @api.model
+    def action_rebuild_store(self):
+        self.env.flush_all()
+        self._rebuild_store()
+        self.env[self._name_detail].invalidate_model()
+
+    def _get_sql_store_insert(self):
+        columns = ', ' . join(self._get_store_columns())
+        return f"INSERT INTO %s ({columns}) SELECT {columns} FROM %s WHERE %s"
+    
+    def _get_store_columns(self):
+        return [
+            'id', 'project_id', 'state', 'date', 'active',
+            'record_id', 'record_model_id', 'analytic_account_id', 'budget_type', 'hourly_cost_coef',
+            'amount_reserved', 'amount_reserved_valued',
+            'amount_expense', 'amount_expense_valued', 'amount_gain',
+        ]
+    
+    @api.model
+    def _mark_store_dirty(self, records=None, project_ids=None):
+        """ Flag expense rows of `records` and/or `project_ids` as outdated.
+            They are refreshed at next read of the report models (see `_flush_search`)
+            or before commit, whichever comes first.
+
+            :option records: recordset of any model providing expenses or reservations (PO, MO, ...)
+            :option project_ids: for changes impacting all expenses of a project (e.g. valuation)
+        """
+        data = self.env.cr.precommit.data
+        if not data.get(self._store_key):
+            data[self._store_key] = {'records': defaultdict(set), 'project_ids': set()}
+            self.env.cr.precommit.add(self.env[self._name_detail].sudo()._refresh_store)
+        
+        dirty = data[self._store_key]
+        if records and records._origin.ids:
+            model_id = self.env['ir.model']._get_id(records._name)
+            dirty['records'][model_id].update(records._origin.ids)
+        dirty['project_ids'].update(x for x in project_ids or [] if x)
+    
+    def _store_data_pop(self):
+        return self.env.cr.precommit.data.pop(self._store_key, None)
     
+    @api.model
+    def _refresh_store(self):
+        """ Incremental refresh of the store for rows flagged with `_mark_store_dirty`:
+            only the outdated rows are deleted and re-inserted from the UNION query
+        """
+        dirty = self._store_data_pop()
+        if not dirty or not dirty['records'] and not dirty['project_ids']:
+            return
+        
+        # valuation of the store's rows
+        self.env['carpentry.budget.hourly.cost']._refresh_hourly_cost()
+        
+        # flush the sources (changes flagged meanwhile are kept for next refresh)
+        for model in self._get_store_flush_models():
+            if model in self.env:
+                self.env[model].flush_model()
+        
+        sql_where, params = self._get_sql_store_where(dirty)
+        self._cr.execute(
+            f"DELETE FROM {self._expense_store_table} WHERE {sql_where} RETURNING project_id",
+            params
+        )
+        project_ids = {row[0] for row in self._cr.fetchall()}
+        self._cr.execute(
+            self._get_sql_store_insert() % (self._expense_store_table, self._expense_query_view, sql_where)
+            + " RETURNING project_id",
+            params
+        )
+        project_ids |= {row[0] for row in self._cr.fetchall()}
+
+        # planning headers' cache (see `carpentry.planning.column._get_headers_budget_cached`)
+        self.env['carpentry.budget.remaining']._invalidate_remaining_cache(project_ids)
+    
+    def _get_sql_store_where(self, dirty):
+        clauses, params = [], []
+        for model_id, record_ids in dirty['records'].items():
+            clauses.append('(record_model_id = %s AND record_id IN %s)')
+            params += [model_id, tuple(record_ids)]
+        if dirty['project_ids']:
+            clauses.append('project_id IN %s')
+            params.append(tuple(dirty['project_ids']))
+        return ' OR ' . join(clauses), params
+    
+    def _get_store_flush_models(self):
+        """ Models read by the UNION query, to flush before refreshing the store """
+        return [
+            'carpentry.budget.reservation', 'account.analytic.line', 'account.move.budget.line',
+            'project.project', 'hr.employee.timesheet.cost.history',
+        ] + list(self._get_queries_models())
+
+    def _flush_search(self, domain, fields=None, order=None, seen=None):
+        """ Ensure the store is up-to-date before any read of the expense reports """
+        self.env[self._name_detail]._refresh_store()
+        return super()._flush_search(domain, fields=fields, order=order, seen=seen)
+
     def _sql_record_fields(self, view=''):
         """ SQL for balance_id, purchase_id, production_id, task_id, ... """
         sql_record_fields = ''
@@ -377,43 +565,53 @@ class CarpentryBudgetExpense(models.Model):
     state = fields.Selection(store=False)
     date = fields.Date(store=False)
 
+    def _get_view_dependencies(self):
+        return ['carpentry.budget.expense.detail']
+    
     def init(self):
         tools.drop_view_if_exists(self.env.cr, self._table)
-        self._cr.execute("""
-            CREATE or REPLACE VIEW %(view_name)s AS (
-                SELECT
-                    row_number() OVER (ORDER BY
-                        record_id,
-                        record_model_id,
-                        analytic_account_id
-                    ) AS id,
-                    project_id,
-                    active,
-                    
-                    record_id,
-                    record_model_id,
-                    %(sql_record_fields)s
-                    analytic_account_id,
-                    budget_type,
-                    -- AVG(hourly_cost_coef) AS hourly_cost_coef, -- for `carpentry.budget.expense.distributed`
-                    
-                    SUM(amount_reserved) AS amount_reserved,
-                    SUM(amount_reserved_valued) AS amount_reserved_valued,
-                    SUM(amount_expense) AS amount_expense,
-                    SUM(amount_expense_valued) AS amount_expense_valued,
-                    SUM(amount_gain) AS amount_gain
+        self._cr.execute("CREATE or REPLACE VIEW %s AS (%s)", (
+            AsIs(self._table),
+            AsIs(self._get_view_sql()),
+        ))
+    
+    def _get_view_sql(self, project_ids=None):
+        return self._cr.mogrify("""
+            SELECT
+                %(sql_id)s AS id,
+                project_id,
+                active,
                 
-                FROM carpentry_budget_expense_detail
+                record_id,
+                record_model_id,
+                %(sql_record_fields)s
+                analytic_account_id,
+                budget_type,
+                -- AVG(hourly_cost_coef) AS hourly_cost_coef, -- for `carpentry.budget.expense.distributed`
                 
-                GROUP BY
-                    project_id,
-                    record_id,
-                    record_model_id,
-                    analytic_account_id,
-                    budget_type,
-                    active
-            )""", {
-                'view_name': AsIs(self._table),
-                'sql_record_fields': AsIs(self._sql_record_fields())
-            }
-        )
+                SUM(amount_reserved) AS amount_reserved,
+                SUM(amount_reserved_valued) AS amount_reserved_valued,
+                SUM(amount_expense) AS amount_expense,
+                SUM(amount_expense_valued) AS amount_expense_valued,
+                SUM(amount_gain) AS amount_gain
+            
+            FROM carpentry_budget_expense_detail
+            WHERE %(sql_where)s
+            
+            GROUP BY
+                project_id,
+                record_id,
+                record_model_id,
+                analytic_account_id,
+                budget_type,
+                active
+            """, {
+                'sql_id': AsIs(sql_id_hash(
+                    'project_id', 'record_model_id', 'record_id', 'analytic_account_id', 'budget_type', 'active',
+                )),
+                'sql_record_fields': AsIs(self._sql_record_fields()),
+                'sql_where': AsIs(
+                    self._cr.mogrify('project_id IN %s', [tuple(project_ids)]).decode()
+                    if project_ids else 'TRUE'
+                ),
+        }).decode()
@@ -1,15 +1,22 @@
 # -*- coding: utf-8 -*-
 
-from odoo import models, tools, fields
+from odoo import models, tools, fields, api
 from psycopg2.extensions import AsIs
+from odoo.addons.carpentry_base.tools import sql_id_hash
 
 class CarpentryBudgetHourlyCost(models.Model):
     """ Ratio per project & analytic of hourly costs,
         from `hr_employee_timesheet_cost_history`
+
+        Stored in a table (unique per project & analytic) so that valuation joins
+        of budget reports are index lookups. Rows are recomputed from the query view
+        only for projects or analytics flagged with `_mark_hourly_cost_dirty`.
     """
     _name = 'carpentry.budget.hourly.cost'
     _description = 'Project hourly costs ratio'
     _auto = False
+    _hourly_cost_query_view = 'carpentry_budget_hourly_cost_query'
+    _hourly_cost_key = 'carpentry_budget_hourly_cost'
     
     project_id = fields.Many2one(
         comodel_name='project.project',
@@ -28,35 +35,116 @@ class CarpentryBudgetHourlyCost(models.Model):
         readonly=True,
     )
 
-    #===== View build =====#
+    #===== Table & view build =====#
     def init(self):
+        # formerly a view
         tools.drop_view_if_exists(self.env.cr, self._table)
-        
+        self._cr.execute("CREATE or REPLACE VIEW %s AS (%s)", (
+            AsIs(self._hourly_cost_query_view),
+            AsIs(self._get_view_sql()),
+        ))
         self._cr.execute("""
-            CREATE or REPLACE VIEW %s AS (
-                %s -- select
-                %s -- from
-                %s -- join
-                %s -- where
-                %s -- groupby
-                %s -- orderby
-            )""", (
-                AsIs(self._table),
-                AsIs(self._select()),
-                AsIs(self._from()),
-                AsIs(self._join()),
-                AsIs(self._where()),
-                AsIs(self._groupby()),
-                AsIs(self._orderby()),
-            )
+            DROP TABLE IF EXISTS %(table)s CASCADE;
+            CREATE TABLE %(table)s (
+                id BIGINT PRIMARY KEY, -- hash of the row's key, see `sql_id_hash`
+                project_id INTEGER NOT NULL,
+                analytic_account_id INTEGER NOT NULL,
+                budget_type VARCHAR,
+                coef DOUBLE PRECISION
+            );
+            CREATE UNIQUE INDEX %(table)s_project_analytic_uniq
+                ON %(table)s (project_id, analytic_account_id);
+        """, {'table': AsIs(self._table)})
+        self._rebuild_hourly_cost()
+    
+    def _get_view_sql(self):
+        return """
+            {select}
+            {from_table}
+            {join}
+            {where}
+            {groupby}
+            {orderby}
+        """ . format(
+            select=self._select(),
+            from_table=self._from(),
+            join=self._join(),
+            where=self._where(),
+            groupby=self._groupby(),
+            orderby=self._orderby(),
+        )
+    
+    #===== Table refresh =====#
+    def _get_hourly_cost_columns(self):
+        return ['id', 'project_id', 'analytic_account_id', 'budget_type', 'coef']
+    
+    def _insert_hourly_cost(self, sql_where, params):
+        sql_columns = ', ' . join(self._get_hourly_cost_columns())
+        self._cr.execute(f"""
+            INSERT INTO {self._table} ({sql_columns})
+            SELECT {sql_columns}
+            FROM {self._hourly_cost_query_view}
+            WHERE {sql_where}
+        """, params)
+
+    @api.model
+    def _rebuild_hourly_cost(self):
+        self.env.cr.precommit.data.pop(self._hourly_cost_key, None)
+        self._cr.execute(f"TRUNCATE {self._table}")
+        self._insert_hourly_cost('TRUE', [])
+
+    @api.model
+    def _mark_hourly_cost_dirty(self, project_ids=None, analytic_ids=None):
+        """ Flag the hourly costs of `project_ids` and/or `analytic_ids` as outdated.
+            They are refreshed at next read of the budget reports or before commit.
+        """
+        data = self.env.cr.precommit.data
+        if not data.get(self._hourly_cost_key):
+            data[self._hourly_cost_key] = {'project_ids': set(), 'analytic_ids': set()}
+            self.env.cr.precommit.add(self.sudo()._refresh_hourly_cost)
+        
+        dirty = data[self._hourly_cost_key]
+        dirty['project_ids'].update(x for x in project_ids or [] if x)
+        dirty['analytic_ids'].update(x for x in analytic_ids or [] if x)
+    
+    @api.model
+    def _refresh_hourly_cost(self):
+        """ Incremental refresh of the table for rows flagged with `_mark_hourly_cost_dirty` """
+        if not self.env.cr.precommit.data.get(self._hourly_cost_key):
+            return
+        
+        # flush the sources first (may recursively refresh)
+        self.env['account.move.budget.line'].flush_model(['project_id', 'analytic_account_id', 'budget_type'])
+        self.env['project.project'].flush_model(['date_start', 'date'])
+        self.env['hr.employee.timesheet.cost.history'].flush_model(
+            ['analytic_account_id', 'starting_date', 'date_to', 'hourly_cost']
         )
+        
+        dirty = self.env.cr.precommit.data.pop(self._hourly_cost_key, None)
+        if not dirty or not dirty['project_ids'] and not dirty['analytic_ids']:
+            return
+        
+        sql_where = 'project_id IN %(project_ids)s OR analytic_account_id IN %(analytic_ids)s'
+        params = {
+            # (None,): IN () is not valid SQL
+            'project_ids': tuple(dirty['project_ids']) or (None,),
+            'analytic_ids': tuple(dirty['analytic_ids']) or (None,),
+        }
+        self._cr.execute(f"DELETE FROM {self._table} WHERE {sql_where}", params)
+        self._insert_hourly_cost(sql_where, params)
+        self.invalidate_model()
     
+    def _flush_search(self, domain, fields=None, order=None, seen=None):
+        self._refresh_hourly_cost()
+        return super()._flush_search(domain, fields=fields, order=order, seen=seen)
+
+    #===== Query =====#
     def _select(self):
         return f"""
             SELECT
-                row_number() OVER (
-                    ORDER BY budget_line.project_id, budget_line.analytic_account_id
-                ) AS id,
+                {sql_id_hash(
+                    'budget_line.project_id', 'budget_line.analytic_account_id', 'budget_line.budget_type'
+                )} AS id,
                 budget_line.project_id,
                 budget_line.analytic_account_id,
                 budget_line.budget_type,
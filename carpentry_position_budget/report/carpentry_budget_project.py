@@ -2,6 +2,7 @@
 
 from odoo import models, fields, api, tools
 from psycopg2.extensions import AsIs
+from odoo.addons.carpentry_base.tools import sql_id_hash
 
 class CarpentryBudgetProject(models.Model):
     """ Final budget report of budget/expense per project """
@@ -37,28 +38,30 @@ class CarpentryBudgetProject(models.Model):
         """ Inherited in sub-modules (purchase, mrp, timesheet) """
         return ('account.move.budget.line', 'carpentry.budget.expense',)
     
+    def _get_view_dependencies(self):
+        return ['carpentry.budget.expense.detail', 'carpentry.budget.expense']
+    
     def init(self):
         tools.drop_view_if_exists(self.env.cr, self._table)
+        self._cr.execute("CREATE or REPLACE VIEW %s AS (%s)", (
+            AsIs(self._table),
+            AsIs(self._get_view_sql()),
+        ))
+    
+    def _get_view_sql(self, project_ids=None):
+        return """
+            {select}
 
-        queries = self._get_queries()
-        if queries:
-            self._cr.execute("""
-                CREATE or REPLACE VIEW %(view_name)s AS (
-                    
-                    %(select)s
-
-                    FROM (
-                        (%(union)s)
-                    ) AS result
+            FROM (
+                ({union})
+            ) AS result
 
-                    %(groupby)s
-                
-                )""", {
-                    'select':    AsIs(self._view_select()),
-                    'groupby':   AsIs(self._view_groupby()),
-                    'view_name': AsIs(self._table),
-                    'union':     AsIs(') UNION ALL (' . join(queries)),
-            })
+            {groupby}
+        """ . format(
+            select=self._view_select(),
+            groupby=self._view_groupby(),
+            union=') UNION ALL (' . join(self._get_queries(project_ids)),
+        )
     
     #===== View definition =====#
     def _view_select(self):
@@ -67,10 +70,10 @@ class CarpentryBudgetProject(models.Model):
         
         return f"""
             SELECT
-                row_number() OVER (ORDER BY
-                    project_id,
-                    analytic_account_id
-                ) AS id,
+                {sql_id_hash(
+                    'state', 'project_id', 'result.budget_type', 'analytic_account_id',
+                    'record_model_id', 'record_id', 'result.active',
+                )} AS id,
                 
                 state,
                 project_id,
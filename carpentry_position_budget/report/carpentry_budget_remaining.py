@@ -1,7 +1,20 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, tools, _, api, exceptions
+from odoo.tools.lru import LRU
 from psycopg2.extensions import AsIs
+from odoo.addons.carpentry_base.tools import sql_id_hash
+
+from collections import defaultdict
+
+class RemainingBudgetCache(object):
+    """ LRU of remaining budgets per (project_id, version, launch_id, analytic_account_id),
+        shared by all transactions of a registry. See `carpentry.budget.remaining`
+    """
+    def __init__(self, size):
+        self.lru = LRU(size)
+        self.hit = 0
+        self.miss = 0
 
 class CarpentryBudgetRemaining(models.Model):
     """ Union of (+) `carpentry.budget.available` and
@@ -11,6 +24,9 @@ class CarpentryBudgetRemaining(models.Model):
     _inherit = ['carpentry.budget.available']
     _description = 'Project & launches remaining budgets'
     _auto = False
+    _remaining_cache_size = 8192
+    _remaining_cache_key = 'carpentry_budget_remaining_cache'
+    _remaining_version_table = 'carpentry_budget_remaining_version'
 
     #===== Fields =====#
     state = fields.Selection(
@@ -45,47 +61,54 @@ class CarpentryBudgetRemaining(models.Model):
     amount_subtotal_valued = fields.Monetary(store=False)
 
     #===== View build =====#
+    def init(self):
+        super().init()
+        # version of the cached remaining budgets of a project, see `_get_remaining_cached`
+        self._cr.execute("""
+            CREATE TABLE IF NOT EXISTS %s (
+                project_id INTEGER PRIMARY KEY REFERENCES project_project (id) ON DELETE CASCADE,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        """, (AsIs(self._remaining_version_table),))
+
     def _get_queries_models(self):
         return ('carpentry.budget.reservation', 'carpentry.budget.available')
 
-    def init(self):
-        """ Over-write `init` of `carpentry.budget.available`
+    def _get_view_dependencies(self):
+        return ['carpentry.budget.available']
+    
+    def _get_view_sql(self, project_ids=None):
+        """ Over-write `_get_view_sql` of `carpentry.budget.available`
             to make it simplier
         """
-        tools.drop_view_if_exists(self.env.cr, self._table)
-        
-        queries = self._get_queries()
-        if queries:
-            # SELECT SQL for balance_id, purchase_id, production_id, task_id, ...
-            Reservation = self.env['carpentry.budget.reservation']
-            sql_record_fields = ', ' . join([field for field in Reservation._get_record_fields()])
+        # SELECT SQL for balance_id, purchase_id, production_id, task_id, ...
+        Reservation = self.env['carpentry.budget.reservation']
+        sql_record_fields = ', ' . join([field for field in Reservation._get_record_fields()])
 
-            self._cr.execute("""
-                CREATE or REPLACE VIEW %(table_name)s AS (
-                    SELECT
-                        row_number() OVER (ORDER BY unique_key) AS id,
-                        state,
-                        
-                        project_id,
-                        launch_id,
-                        position_id,
-                        active,
+        return """
+            SELECT
+                {sql_id} AS id,
+                state,
+                
+                project_id,
+                launch_id,
+                position_id,
+                active,
 
-                        analytic_account_id,
-                        amount_subtotal,
-                        budget_type,
-                        
-                        record_model_id,
-                        %(sql_record_fields)s
-                    FROM (
-                        (%(sql_union)s)
-                    ) AS result
-                )""", {
-                    'table_name': AsIs(self._table),
-                    'sql_record_fields': AsIs(sql_record_fields),
-                    'sql_union': AsIs(') UNION ALL (' . join(queries)),
-                }
-            )
+                analytic_account_id,
+                amount_subtotal,
+                budget_type,
+                
+                record_model_id,
+                {sql_record_fields}
+            FROM (
+                ({sql_union})
+            ) AS result
+        """ . format(
+            sql_id=sql_id_hash('unique_key'),
+            sql_record_fields=sql_record_fields,
+            sql_union=') UNION ALL (' . join(self._get_queries(project_ids)),
+        )
 
     def _select(self, model, models):
         # SQL for balance_id, purchase_id, production_id, task_id, ...
@@ -189,6 +212,125 @@ class CarpentryBudgetRemaining(models.Model):
             remaining.record_ref = '{},{}' . format(record._name, record.id)  if record else False
             remaining.record_model_name = self.env[record._name]._description if record else False
     
+    #===== Cache =====#
+    def _get_remaining_cache(self):
+        registry = self.env.registry
+        cache = getattr(registry, '_carpentry_remaining_cache', None)
+        if cache is None:
+            cache = registry._carpentry_remaining_cache = RemainingBudgetCache(self._remaining_cache_size)
+        return cache
+    
+    @api.model
+    def _get_remaining_cache_stats(self):
+        cache = self._get_remaining_cache()
+        return {'hit': cache.hit, 'miss': cache.miss, 'size': len(cache.lru)}
+    
+    @api.model
+    def _get_remaining_cached(self, project_ids, launch_ids, analytic_ids):
+        """ Remaining budget (brut, active lines only) for the keys (project_id, launch_id, analytic_account_id)
+            of the cross-product of the arguments. Keys are read from the registry cache when possible,
+            else they are computed at once with `_read_group_project`.
+            
+            Entries are versioned per project: the version is bumped at commit of any transaction
+            modifying the project's budget (see `_invalidate_remaining_cache`), which meanwhile
+            does not use nor fill the cache for this project.
+
+            :arg launch_ids: may include `False` for project's budgets
+            :return: dict like {key: {'budget': amount, 'reservation': amount}}, for existing keys only
+        """
+        keys = [
+            (project_id, launch_id, analytic_id)
+            for project_id in project_ids for launch_id in launch_ids for analytic_id in analytic_ids
+        ]
+        if not keys:
+            return {}
+        
+        cache = self._get_remaining_cache()
+        dirty_project_ids = self.env.cr.precommit.data.get(self._remaining_cache_key, set())
+        mapped_version = self._get_remaining_versions(set(project_ids) - dirty_project_ids)
+
+        # 1. From cache
+        result, missing = {}, []
+        for key in keys:
+            version = mapped_version.get(key[0])
+            value = None if version is None else cache.lru.get((key[0], version) + key[1:])
+            if value is None:
+                cache.miss += 1
+                missing.append(key)
+            else:
+                cache.hit += 1
+                if value:
+                    result[key] = value
+        if not missing:
+            return result
+        
+        # 2. Compute missing keys, and cache them
+        # (sudo: keys are per project, so that the values are the same for all users)
+        rg_result = self.sudo().with_context(active_test=True)._read_group_project(
+            project_ids=list({key[0] for key in missing}),
+            domain=[
+                ('launch_id', 'in', list({key[1] for key in missing})),
+                ('analytic_account_id', 'in', list({key[2] for key in missing})),
+            ],
+            groupby=['state', 'project_id', 'launch_id', 'analytic_account_id'],
+            fields=['amount_subtotal:sum'],
+        )
+        mapped_remaining = defaultdict(dict)
+        for x in rg_result:
+            key = (x['project_id'], x['launch_id'], x['analytic_account_id'])
+            mapped_remaining[key][x['state']] = x['amount_subtotal']
+        
+        for key in missing:
+            value = mapped_remaining.get(key, {})
+            if value:
+                result[key] = value
+            if key[0] in mapped_version:
+                cache.lru[(key[0], mapped_version[key[0]]) + key[1:]] = value
+        return result
+    
+    def _get_remaining_versions(self, project_ids):
+        """ :return: dict like {project_id: version} """
+        if not project_ids:
+            return {}
+        self._cr.execute("""
+            SELECT project.id, COALESCE(version.version, 0)
+            FROM project_project AS project
+            LEFT JOIN %s AS version
+                ON version.project_id = project.id
+            WHERE project.id IN %s
+        """, (AsIs(self._remaining_version_table), tuple(project_ids)))
+        return dict(self._cr.fetchall())
+    
+    @api.model
+    def _invalidate_remaining_cache(self, project_ids):
+        """ Called when available budget or reservations change in `project_ids`:
+            their cache is ignored until commit, where their version is bumped
+        """
+        project_ids = {x for x in project_ids if x}
+        if not project_ids:
+            return
+        
+        data = self.env.cr.precommit.data
+        if self._remaining_cache_key not in data:
+            data[self._remaining_cache_key] = set()
+            self.env.cr.precommit.add(self._bump_remaining_versions)
+        data[self._remaining_cache_key].update(project_ids)
+    
+    def _bump_remaining_versions(self):
+        project_ids = self.env.cr.precommit.data.pop(self._remaining_cache_key, set())
+        if not project_ids:
+            return
+        
+        # sorted: lock rows always in the same order
+        self._cr.execute("""
+            INSERT INTO %(table)s (project_id, version)
+            SELECT unnest(%(project_ids)s), 1
+            ON CONFLICT (project_id) DO UPDATE SET version = %(table)s.version + 1
+        """, {
+            'table': AsIs(self._remaining_version_table),
+            'project_ids': sorted(project_ids),
+        })
+
     #===== Actions & Buttons =====#
     def _get_raise_to_reservations(self, message):
         """ Used when trying to delete source of budget, like when:
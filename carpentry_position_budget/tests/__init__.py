@@ -8,3 +8,4 @@ from . import test_04_balance
 from . import test_05_analytic_project
 from . import test_06_reservation
 from . import test_07_account_move
+from . import test_08_benchmark
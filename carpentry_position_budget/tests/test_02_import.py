@@ -86,3 +86,35 @@ class TestCarpentryPositionBudget_Import(TestCarpentryPositionBudget_Base):
         self.wizard.button_import()
         self.assertTrue(self.project.budget_production)
         self.assertFalse(self.project.budget_installation)
+
+    def test_05_dry_run(self):
+        """ Test dry-run: nothing is written, and a re-import only writes the delta """
+        self.wizard.button_dry_run()
+        self.assertTrue(self.wizard.dry_run_summary)
+        self.assertFalse(self.project.position_budget_ids)
+
+        diff = {}
+        self.wizard._run_import_job(diff)
+        self.assertTrue(diff['positions'].get('create'))
+        self.assertTrue(diff['budgets'].get('create'))
+
+        # re-import of the same file: nothing changed
+        diff = {}
+        self.wizard.with_context(import_dry_run=True)._run_import_job(diff)
+        self.assertFalse(diff['positions'].get('create') or diff['positions'].get('update'))
+        self.assertFalse(diff['budgets'].get('create') or diff['budgets'].get('update'))
+        self.assertTrue(diff['budgets'].get('unchanged'))
+
+        # position not in the file anymore: deleted
+        position = self.env['carpentry.position'].create({
+            'project_id': self.project.id,
+            'name': 'Position not in file',
+            'quantity': 1,
+        })
+        diff = {}
+        self.wizard.with_context(import_dry_run=True)._run_import_job(diff)
+        self.assertEqual(diff['positions'].get('delete'), 1)
+        self.assertTrue(position.exists())
+
+        self.wizard._run_import_job()
+        self.assertFalse(position.exists())
@@ -78,6 +78,43 @@ class TestCarpentryPositionBudget_Budget(TestCarpentryPositionBudget_Base):
         self.assertNotEqual(position_budget.value_unitary, origin_position_prod)
         self.assertNotEqual(self.project.budget_total, origin_project_total)
 
+    def test_06b_hourly_cost_table_refresh(self):
+        """ Test the hourly cost table is refreshed only for changed rows,
+            with the same result than a full rebuild
+        """
+        HourlyCost = self.env['carpentry.budget.hourly.cost']
+        domain = [('project_id', '=', self.project.id), ('analytic_account_id', '=', self.aac_production.id)]
+        origin_coef = HourlyCost.search_read(domain, ['coef'])[0]['coef']
+
+        history_entry = fields.first(self.aac_production.timesheet_cost_history_ids)
+        history_entry.hourly_cost = self.HOUR_COST + 1.0
+        coef = HourlyCost.search_read(domain, ['coef'])[0]['coef']
+        self.assertNotEqual(coef, origin_coef)
+
+        result_incremental = HourlyCost.search_read([], ['project_id', 'analytic_account_id', 'coef'], order='id')
+        HourlyCost._rebuild_hourly_cost()
+        HourlyCost.invalidate_model()
+        self.assertEqual(
+            result_incremental,
+            HourlyCost.search_read([], ['project_id', 'analytic_account_id', 'coef'], order='id'),
+        )
+
+    def test_06c_hourly_cost_change_analytic(self):
+        """ Test moving a cost history to another analytic account refreshes
+            the hourly costs of both accounts
+        """
+        HourlyCost = self.env['carpentry.budget.hourly.cost']
+        history_entry = fields.first(self.aac_production.timesheet_cost_history_ids)
+        history_entry.analytic_account_id = self.aac_service
+        result_incremental = HourlyCost.search_read([], ['project_id', 'analytic_account_id', 'coef'], order='id')
+        HourlyCost._rebuild_hourly_cost()
+        HourlyCost.invalidate_model()
+        self.assertEqual(
+            result_incremental,
+            HourlyCost.search_read([], ['project_id', 'analytic_account_id', 'coef'], order='id'),
+        )
+        history_entry.analytic_account_id = self.aac_production # restore
+
     def test_07_project_budget_change_position_qty(self):
         """ Test that project total changes on position qty changes """
         origin_total = self.project.budget_total
@@ -197,6 +234,125 @@ class TestCarpentryPositionBudget_Budget(TestCarpentryPositionBudget_Base):
             str(self.position.quantity),
         )
 
+    def test_17_read_group_project(self):
+        """ Test the project-scoped query returns the same totals than the global view """
+        groupby = ['project_id', 'launch_id', 'analytic_account_id']
+        for Model in (self.Available, self.Remaining):
+            rg_result = Model._read_group(
+                domain=[('project_id', '=', self.project.id)],
+                groupby=groupby,
+                fields=['amount_subtotal:sum'],
+                lazy=False,
+            )
+            rg_result_project = Model._read_group_project(
+                project_ids=self.project.ids,
+                domain=[],
+                groupby=groupby,
+                fields=['amount_subtotal:sum'],
+            )
+            self.assertEqual(
+                {tuple(x[f] and x[f][0] for f in groupby): x['amount_subtotal'] for x in rg_result},
+                {tuple(x[f] for f in groupby): x['amount_subtotal'] for x in rg_result_project},
+            )
+
+    def test_18_remaining_cache(self):
+        """ Test remaining budgets are served from the cache, and that a transaction
+            modifying a project's budget bypasses it
+        """
+        Remaining = self.Remaining
+        kwargs = {
+            'project_ids': self.project.ids,
+            'launch_ids': [False] + self.launchs.ids,
+            'analytic_ids': (self.aac_other | self.aac_production | self.aac_installation).ids,
+        }
+        # start clean: forget projects modified so far in the test transaction
+        self.env.cr.precommit.data.pop(Remaining._remaining_cache_key, None)
+        
+        result = Remaining._get_remaining_cached(**kwargs)
+        stats = Remaining._get_remaining_cache_stats()
+        self.assertEqual(Remaining._get_remaining_cached(**kwargs), result)
+        stats_after = Remaining._get_remaining_cache_stats()
+        count = len(kwargs['launch_ids']) * len(kwargs['analytic_ids'])
+        self.assertEqual(stats_after['hit'] - stats['hit'], count)
+        self.assertEqual(stats_after['miss'], stats['miss'])
+
+        # same values than the view
+        groupby = ['state', 'project_id', 'launch_id', 'analytic_account_id']
+        rg_result = Remaining._read_group_project(
+            project_ids=self.project.ids,
+            domain=[('analytic_account_id', 'in', kwargs['analytic_ids'])],
+            groupby=groupby,
+            fields=['amount_subtotal:sum'],
+        )
+        self.assertEqual(
+            {(state,) + key: amount for key, vals in result.items() for state, amount in vals.items()},
+            {tuple(x[f] for f in groupby): x['amount_subtotal'] for x in rg_result},
+        )
+
+        # modifying a budget: no hit, and fresh values
+        fields.first(self.position.position_budget_ids).amount_unitary += 10
+        result_updated = Remaining._get_remaining_cached(**kwargs)
+        self.assertNotEqual(result_updated, result)
+        self.assertEqual(Remaining._get_remaining_cache_stats()['hit'], stats_after['hit'])
+
+    def test_18b_remaining_cache_active(self):
+        """ Test archiving a launch invalidates the remaining budgets' cache of its project """
+        Remaining = self.Remaining
+        self.env.cr.precommit.data.pop(Remaining._remaining_cache_key, None)
+        self.launch.active = False
+        self.assertIn(self.project.id, self.env.cr.precommit.data.get(Remaining._remaining_cache_key, set()))
+        self.launch.active = True
+
+    def test_19_bulk_mode(self):
+        """ Test budget logics are deferred in bulk mode,
+            until the project's full refresh
+        """
+        positions = self.project.position_ids
+        Budget = self.env['carpentry.position.budget'].with_context(import_budget_no_compute=True)
+        Budget._add_budget([{
+            'position_id': position.id,
+            'analytic_account_id': self.aac_goods.id,
+            'amount_unitary': 5.0,
+        } for position in positions])
+        lines_goods = lambda: self.project.budget_line_ids.filtered(lambda x: x.analytic_account_id == self.aac_goods)
+        self.assertFalse(lines_goods())
+
+        self.project._budget_full_refresh()
+        self.assertTrue(lines_goods().is_computed_carpentry)
+        self.project.invalidate_recordset(['budget_goods'])
+        self.assertEqual(self.project.budget_goods, 5.0 * sum(positions.mapped('quantity')))
+
+        # not in bulk mode: refreshed at once by `_write_budget`
+        self.position.position_budget_ids._erase_budget([{
+            'position_id': self.position.id,
+            'analytic_account_id': self.aac_goods.id,
+            'amount_unitary': 0.0,
+        }])
+        self.project.invalidate_recordset(['budget_goods'])
+        self.assertEqual(self.project.budget_goods, 5.0 * sum((positions - self.position).mapped('quantity')))
+
+    def test_20_write_budget_upsert(self):
+        """ Test `_write_budget` add & erase modes, and the cache after the upsert """
+        budget = self.budget_installation
+        key = {'position_id': self.position.id, 'analytic_account_id': self.aac_installation.id}
+        subtotal = self.position.budget_subtotal
+
+        self.position.position_budget_ids._add_budget([dict(key, amount_unitary=1.0)] * 2)
+        self.assertEqual(budget.amount_unitary, self.amount_installation + 2.0)
+        self.assertEqual(len(self.position.position_budget_ids), 2)
+
+        self.position.position_budget_ids._erase_budget([
+            dict(key, amount_unitary=1.0),
+            {'position_id': self.position.id, 'analytic_account_id': self.aac_goods.id, 'amount_unitary': 3.0},
+        ], force=True)
+        self.assertEqual(budget.amount_unitary, 1.0)
+        self.assertEqual(
+            self.position.position_budget_ids.analytic_account_id,
+            self.aac_installation | self.aac_goods
+        )
+        self.assertFalse(self.budget_production.exists())
+        self.assertNotEqual(self.position.budget_subtotal, subtotal)
+
     #===== Bug solving =====#
     def test_81_launch_budget_complex(self):
         """ 2025-11-07: COUNT(*) in SQL
@@ -2,9 +2,13 @@
 
 from odoo import exceptions, fields, _, Command
 from odoo.tests.common import Form
+from odoo.tools import float_round
 
 from .test_00_position_budget_base import TestCarpentryPositionBudget_Base
 from odoo.addons.carpentry_position_budget.models.carpentry_planning_column import human_readable
+from odoo.addons.carpentry_position_budget.models.carpentry_budget_mixin import allocate_budget_reservation
+
+import random
 
 class TestCarpentryPositionBudget_Balance(TestCarpentryPositionBudget_Base):
 
@@ -226,6 +230,84 @@ class TestCarpentryPositionBudget_Balance(TestCarpentryPositionBudget_Base):
         except exceptions.AccessError:
             self.fail('User access rights issue')
     
+    #===== Expense store =====#
+    def _read_expense_store(self):
+        return sorted(self.Expense.search_read(
+            [('project_id', '=', self.project.id)],
+            ['balance_id', 'analytic_account_id', 'amount_reserved', 'amount_gain'],
+        ), key=lambda x: (x['balance_id'], x['analytic_account_id']))
+
+    def test_12_expense_store_incremental(self):
+        """ Ensure the expense store is refreshed incrementally on reservation change,
+            with same result than a full rebuild
+        """
+        reservation = fields.first(self.balance.reservation_ids)
+        reservation.amount_reserved -= 1.0
+        
+        expense = self.Expense.search([
+            ('balance_id', '=', self.balance.id),
+            ('analytic_account_id', '=', reservation.analytic_account_id.id),
+        ])
+        self.assertEqual(sum(expense.mapped('amount_reserved')), sum(
+            self.balance.reservation_ids.filtered(
+                lambda x: x.analytic_account_id == reservation.analytic_account_id
+            ).mapped('amount_reserved')
+        ))
+
+        result_incremental = self._read_expense_store()
+        self.Expense.action_rebuild_store()
+        self.assertEqual(
+            [{k: v for k, v in x.items() if k != 'id'} for x in result_incremental],
+            [{k: v for k, v in x.items() if k != 'id'} for x in self._read_expense_store()],
+        )
+    
+    #===== Allocator =====#
+    def test_13_allocator_greedy_equivalence(self):
+        """ Ensure the batched allocator reserves exactly the same amounts than
+            the record-per-record greedy spreading, on random budgets and expenses
+        """
+        Balance = self.env['carpentry.budget.balance']
+        prec = self.env['decimal.precision'].precision_get('Product Unit of Measure')
+
+        def _allocate_greedy(matrix, mapped_remaining_budget):
+            allocation = []
+            for row in matrix:
+                mapped_budget_ratio = Balance._get_budget_distribution(mapped_remaining_budget)
+                amounts = []
+                for key_budget, amount_budgetable in row:
+                    remaining_budget = mapped_remaining_budget.get(key_budget, 0.0)
+                    expense_spread = amount_budgetable * mapped_budget_ratio.get(key_budget, 0.0)
+                    amount = max(0.0, float_round(
+                        min(expense_spread, remaining_budget),
+                        precision_digits=prec, rounding_method='HALF-UP',
+                    ))
+                    amounts.append(amount)
+                    if key_budget in mapped_remaining_budget:
+                        mapped_remaining_budget[key_budget] -= amount
+                allocation.append(amounts)
+            return allocation
+
+        rand = random.Random(42)
+        keys = [
+            (project_id, launch_id, aac_id)
+            for project_id in (1, 2) for launch_id in (False, 1, 2, 3) for aac_id in (1, 2, 3)
+        ]
+        for _ in range(200):
+            mapped_remaining_budget = {
+                key: rand.choice([0.0, rand.uniform(-50.0, 500.0)])
+                for key in rand.sample(keys, rand.randint(0, len(keys)))
+            }
+            matrix = []
+            for _ in range(rand.randint(1, 10)):
+                # reservations' order: project budget first, then per budget center and launch
+                row_keys = sorted(rand.sample(keys, rand.randint(0, 8)), key=lambda x: (bool(x[1]), x[2], x[1]))
+                matrix.append([(key, rand.choice([0.0, rand.uniform(0.0, 800.0)])) for key in row_keys])
+
+            self.assertEqual(
+                allocate_budget_reservation(matrix, dict(mapped_remaining_budget), prec),
+                _allocate_greedy(matrix, dict(mapped_remaining_budget)),
+            )
+
     #===== Planning columns =====#
     def _get_planning_result(self, launch):
         return (
@@ -270,6 +352,31 @@ class TestCarpentryPositionBudget_Balance(TestCarpentryPositionBudget_Base):
         result = self._get_planning_result(self.launch)
         self.assertEqual(result.get('reserved'), launch_available)
 
+    def test_22_planning_column_cache(self):
+        """ Headers budgets are computed once for all launches, until a reservation changes """
+        self.column.budget_types = 'installation,production'
+        # start clean: forget projects modified so far in the test transaction
+        self.env['carpentry.budget.expense.detail']._refresh_store()
+        self.env.cr.precommit.data.pop(self.env['carpentry.budget.remaining']._remaining_cache_key, None)
+        cache = self.column._get_headers_cache()
+
+        result = self._get_planning_result(self.launch)
+        hit, miss = cache.hit, cache.miss
+        self.assertEqual(self._get_planning_result(self.launch), result)
+        self._get_planning_result(self.launchs[1])
+        self.assertEqual((cache.hit - hit, cache.miss - miss), (2, 0))
+
+        # another user: own entry (access rules may differ)
+        self.column.with_user(self.env.ref('base.user_admin')).get_headers_data(self.launch.id)
+        self.assertEqual(cache.miss - miss, 1)
+        miss += 1
+
+        # reservation: fresh values
+        balance = self.balance.create({'name': 'Balance Cache', 'project_id': self.project.id})
+        balance.launch_ids = self.launch
+        self.assertNotEqual(self._get_planning_result(self.launch), result)
+        self.assertEqual(cache.miss - miss, 1)
+
     #===== Final tests =====#
     def test_90_reservation_clean_on_affectation_removal(self):
         """ Ensure when a budget is removed, *empty/ghost* reservation
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+
+from .test_00_position_budget_base import TestCarpentryPositionBudget_Base
+
+import logging
+import time
+_logger = logging.getLogger(__name__)
+
+@tagged('-standard', 'carpentry_benchmark')
+class TestCarpentryPositionBudget_Benchmark(TestCarpentryPositionBudget_Base):
+    """ Not run by default: `--test-tags carpentry_benchmark`
+        Logs timings and SQL queries count of budget computations, for growing batch sizes
+    """
+
+    BATCH_SIZES = [1, 10, 100, 1000]
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._spread_affect()
+
+    def _benchmark(self, name, method, sizes=None):
+        """ Run `method(size)` for each size and log its duration and number of queries
+            :return: dict {size: (seconds, queries)}
+        """
+        result = {}
+        for size in sizes or self.BATCH_SIZES:
+            self.env.flush_all()
+            self.env.invalidate_all()
+            count_start, time_start = self.env.cr.sql_log_count, time.time()
+            
+            method(size)
+            self.env.flush_all()
+
+            result[size] = (time.time() - time_start, self.env.cr.sql_log_count - count_start)
+            _logger.info('[benchmark] %s, %s records: %.3fs, %s queries', name, size, *result[size])
+        return result
+
+    def test_01_compute_reservation_ids(self):
+        """ Set-based reservation planner: one query on available budget for all records """
+        Balance = self.env['carpentry.budget.balance']
+
+        def _compute_reservation_ids(size):
+            balances = Balance.with_context(carpentry_reservation_no_compute=True).create([{
+                'name': 'Benchmark %s' % i,
+                'project_id': self.project.id,
+                'launch_ids': [(6, 0, self.launchs.ids)] if i % 2 else False,
+            } for i in range(size)])
+            balances.with_context(carpentry_reservation_no_compute=False)._compute_reservation_ids()
+
+            self.assertTrue(all(balance.reservation_ids for balance in balances))
+        
+        self._benchmark('_compute_reservation_ids', _compute_reservation_ids)
+
+    def test_02_write_budget(self):
+        """ Set-based budget upsert vs. ORM create & write of each budget cell
+            (in bulk mode, so that only the write is measured)
+        """
+        Position = self.env['carpentry.position'].with_context(import_budget_no_compute=True)
+        Budget = self.env['carpentry.position.budget'].with_context(import_budget_no_compute=True)
+        sizes = [100, 1000, 10000]
+
+        def _prepare(size):
+            """ :return: `vals_list_budget` of `size` cells, on new positions """
+            positions = Position.create([{
+                'project_id': self.project.id,
+                'name': 'Benchmark %s' % i,
+                'quantity': 1,
+            } for i in range(size // len(self.aacs))])
+            return [{
+                'position_id': position.id,
+                'analytic_account_id': aac.id,
+                'amount_unitary': 1.0,
+            } for position in positions for aac in self.aacs]
+
+        mapped_vals_orm = {size: _prepare(size) for size in sizes}
+        def _write_budget_orm(size):
+            budgets = Budget.create(mapped_vals_orm[size])
+            for budget in budgets:
+                budget.amount_unitary += 1.0
+        
+        mapped_vals_upsert = {size: _prepare(size) for size in sizes}
+        def _write_budget_upsert(size):
+            Budget._add_budget(mapped_vals_upsert[size]) # create
+            Budget._add_budget(mapped_vals_upsert[size]) # write
+        
+        self._benchmark('_write_budget (orm)', _write_budget_orm, sizes)
+        self._benchmark('_write_budget (upsert)', _write_budget_upsert, sizes)
+
+        position_ids = {vals['position_id'] for vals in mapped_vals_upsert[sizes[-1]]}
+        budgets = Budget.search([('position_id', 'in', list(position_ids))])
+        self.assertEqual(len(budgets), len(mapped_vals_upsert[sizes[-1]]))
+        self.assertEqual(set(budgets.mapped('amount_unitary')), {2.0})
+
+    def test_03_planning_headers(self):
+        """ Switching between the launches of a 30-launches project in the planning:
+            1st launch computes the headers of all launches, next ones are read from cache
+        """
+        launchs = self.launchs | self.env['carpentry.group.launch'].create([{
+            'project_id': self.project.id,
+            'name': 'Benchmark launch %s' % i,
+        } for i in range(30 - len(self.launchs))])
+        column = self.env['carpentry.planning.column'].create({
+            'name': 'Benchmark column',
+            'budget_types': 'installation,production,other',
+        })
+        # as if committed: bump budget versions of the project
+        self.env.flush_all()
+        self.env.cr.precommit.run()
+
+        def _switch_launches(size):
+            for launch in launchs[:size]:
+                column.get_headers_data(launch.id)
+        
+        self._benchmark('get_headers_data (cold + warm)', _switch_launches, [1, 10, 30])
+        self._benchmark('get_headers_data (warm)', _switch_launches, [1, 10, 30])
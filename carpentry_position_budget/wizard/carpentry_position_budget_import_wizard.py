@@ -2,15 +2,21 @@
 
 from odoo import models, fields, api, exceptions, _, Command
 from odoo.tools import float_is_zero, float_compare
+from markupsafe import Markup
 
 from odoo.addons.carpentry_position_budget.models.carpentry_position_budget_interface import EXTERNAL_DB_TYPE
 
 from collections import defaultdict
+from contextlib import contextmanager
+import time, logging
+_logger = logging.getLogger(__name__)
 
 class CarpentryPositionBudgetImportWizard(models.TransientModel):
     _name = "carpentry.position.budget.import.wizard"
     _description = "Carpentry Position Budget Import Wizard"
-    _inherit = ['utilities.file.mixin', 'utilities.database.mixin']
+    _inherit = ['utilities.file.mixin', 'utilities.database.mixin', 'carpentry.import.job.mixin']
+    _import_read_batch_size = 200 # rows fetched at once from the external database
+    _import_write_chunk_size = 500 # budgets written (and flushed) at once
 
     #===== Fields =====#
     project_id = fields.Many2one(
@@ -68,6 +74,11 @@ class CarpentryPositionBudgetImportWizard(models.TransientModel):
             ('active', '=', True),
         ]"""
     )
+    # -- dry-run --
+    dry_run_summary = fields.Html(
+        string='Changes preview',
+        readonly=True,
+    )
 
 
     #===== Button =====#
@@ -75,26 +86,118 @@ class CarpentryPositionBudgetImportWizard(models.TransientModel):
         self.project_id.position_budget_ids.unlink()
 
     def button_import(self):
-        """ File management (unarchive if needed), database opening and call import router """
+        """ Run the import, or queue it for a background worker """
+        if not self.import_file:
+            raise exceptions.UserError(_('Please upload a file.'))
+        
+        if self._is_import_async():
+            return self._enqueue_import_job()
+        self._run_import_job()
+
+    def button_dry_run(self):
+        """ Preview the changes of the import (new, changed, unchanged and deleted
+            records) and its timings, without writing them
+        """
         if not self.import_file:
             raise exceptions.UserError(_('Please upload a file.'))
         
+        diff = {}
+        timings = self.with_context(import_dry_run=True)._run_import_job(diff)
+        self.dry_run_summary = self._render_dry_run_summary(diff, timings)
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+            'context': self._context,
+        }
+    
+    def _render_dry_run_summary(self, diff, timings):
+        labels = {
+            'lots': _('Lots'),
+            'positions': _('Positions'),
+            'budgets': _('Budget cells'),
+        }
+        cols = {
+            'create': _('New'),
+            'update': _('Changed'),
+            'unchanged': _('Unchanged'),
+            'delete': _('Not in file (deleted)'),
+            'obsolete': _('Not in file (kept)'),
+        }
+        row = Markup('<tr><th>{}</th>{}</tr>')
+        cell = Markup('<td>{}</td>')
+        rows = [row.format('', Markup().join(cell.format(x) for x in cols.values()))] + [
+            row.format(label, Markup().join(cell.format(diff.get(key, {}).get(x, 0)) for x in cols))
+            for key, label in labels.items()
+        ]
+        timings_text = ', '.join('%s: %.1fs' % (phase, seconds) for phase, seconds in timings.items())
+        return Markup('<table class="table table-sm">{}</table><p class="text-muted">{}</p>').format(
+            Markup().join(rows), timings_text
+        )
+
+    #===== Background import (`carpentry.import.job.mixin`) =====#
+    def _get_import_job_target(self):
+        return self.project_id
+    
+    def _run_import_job(self, diff=None):
+        """ File management (unarchive if needed), database opening and call import router
+            :option diff: see `_write_orgadata`
+        """
         db_models = ['Phases', 'ElevationGroups', 'a_elevations']
         filename, db_content, mimetype = self._uncompress(self.filename, self.import_file) # from `utilities.file.mixin`
         db_resource = self._open_external_database(filename, db_content, mimetype, self.encoding, db_models=db_models) # from `utilities.file.database`
         # dbsource is a record of `base.external.dbsource` (see module `server-env/base_external_dbsource`)
         
-        self._run_import(db_resource)
-        # self.with_context(import_budget_no_compute=True)._run_import(db_content, filename, mimetype)
-        # self.with_context(import_budget_no_compute=False).project_id._budget_full_refresh()
+        return self._run_import(db_resource, diff)
 
 
     #===== Import logics =====#
-    def _run_import(self, db_resource):
-        """ Can be overriden to add import logic for other external database """
-
+    def _run_import(self, db_resource, diff=None):
+        """ Can be overriden to add import logic for other external database
+            :option diff: dict filled with the changes of the import, per model
+            :return: dict of time spent per import phase, like {phase: seconds}
+        """
+        timings = {}
         if self.external_db_type == 'orgadata':
-            self._run_orgadata_import(db_resource)
+            self._run_orgadata_import(db_resource, timings, diff)
+        return timings
+
+    @contextmanager
+    def _import_phase(self, timings, phase):
+        """ Measure and log the time spent in an import `phase` """
+        time_start = time.time()
+        self._set_import_job_progress(phase)
+        yield
+        timings[phase] = timings.get(phase, 0.0) + time.time() - time_start
+        _logger.info('[%s] project %s, %s: %.2fs', self._name, self.project_id.id, phase, timings[phase])
+
+    def _log_import_progress(self, phase, done, total):
+        _logger.info('[%s] project %s, %s: %s/%s', self._name, self.project_id.id, phase, done, total)
+        self._set_import_job_progress(phase, done, total)
+
+    def _read_db_batches(self, db_resource, sql, batch_size):
+        """ Yield rows of `sql` by lists of dicts of `batch_size`,
+            so that wide tables are never fully loaded in memory
+            (if `db_resource` is a DB-API connection, else chunks `_read_db` result)
+        """
+        if not hasattr(db_resource, 'cursor'):
+            rows = self._read_db(db_resource, sql)
+            for i in range(0, len(rows), batch_size):
+                yield rows[i:i + batch_size]
+            return
+        
+        cursor = db_resource.cursor()
+        try:
+            cursor.execute(sql)
+            cols = [col[0] for col in cursor.description]
+            rows = cursor.fetchmany(batch_size)
+            while rows:
+                yield [dict(zip(cols, row)) for row in rows]
+                rows = cursor.fetchmany(batch_size)
+        finally:
+            cursor.close()
 
 
     def _get_interface(self, cols_external):
@@ -142,13 +245,21 @@ class CarpentryPositionBudgetImportWizard(models.TransientModel):
 
 
     #===== Specific import logics =====#
-    def _run_orgadata_import(self, db_resource):
-        read_result = self._read_orgadata(db_resource)
-        self._write_orgadata(*read_result)
+    def _run_orgadata_import(self, db_resource, timings=None, diff=None):
+        timings = {} if timings is None else timings
+        try:
+            with self._import_phase(timings, 'read'):
+                read_result = self._read_orgadata(db_resource)
+            self._write_orgadata(*read_result, timings=timings, diff=diff)
+        finally:
+            self._close_db(db_resource) # close connection with Orgadata mssql db
     
     def _read_orgadata(self, db_resource):
         """ (!) xGUID changes on each Orgadata export
             It is not unique per Phase or Position, but per export file
+
+            :return: Phases, Positions and their relation, and a generator
+                     of budget's batches, to consume before closing `db_resource`
         """
         # 1. Get `carpentry.group.lot`
         sql = "SELECT Name, xGUID FROM Phases"
@@ -178,50 +289,205 @@ class CarpentryPositionBudgetImportWizard(models.TransientModel):
         # 3. Get `carpentry.position.budget`
         # cols of `a_elevations` are rows of carpentry Interface `carpentry.position.budget.interface`
         # don't pass any `cols_mapping`: one might discover new Orgadata columns
-        Budgets = self._read_db(db_resource, "SELECT * FROM a_elevations")
-        self._close_db(db_resource) # close connection with Orgadata mssql db
+        # (!) 100+ columns: streamed by batches
+        Budgets = self._read_db_batches(db_resource, "SELECT * FROM a_elevations", self._import_read_batch_size)
+
+        return Phases, elevationGroupId_to_lotGUID, Elevations, Budgets
 
-        return Phases, elevationGroupId_to_lotGUID, Elevations,Budgets
+    def _write_orgadata(self, Phases, elevationGroupId_to_lotGUID, Elevations, Budgets, timings=None, diff=None):
+        """ :arg Budgets: iterable of batches (lists) of `a_elevations` rows
+            :option diff: dict filled with the count of changes per model, like
+                          {'lots': {'create': 1, 'update': 0, 'unchanged': 12, 'delete': 0}, ...}
 
-    def _write_orgadata(self, Phases, elevationGroupId_to_lotGUID, Elevations, Budgets):
-        # 1. Get Odoo's budget column, linked to external DB one
-        cols_orgadata = [x for x in Budgets[0]] if Budgets else []
-        mapped_interface = self._get_interface(cols_orgadata)
+            Only new or changed lots, positions and budget cells are written, lots and
+            positions not in the file anymore are deleted, and nothing in dry-run mode
+            (context `import_dry_run`)
 
-        # 2. Write `carpentry.group.lot`
+            Runs in bulk mode (context `import_budget_no_compute`): budget logics
+            are refreshed once for the project, at the end of the import
+        """
+        timings = {} if timings is None else timings
+        diff = {} if diff is None else diff
+        dry_run = self._context.get('import_dry_run')
+        self = self.with_context(import_budget_no_compute=True)
         domain = [('project_id', '=', self.project_id.id)]
-        existing_lot_ids = self.env['carpentry.group.lot'].search(domain)
         primary_keys = ['name']
-        lot_ids = self._import_data(Phases, existing_lot_ids, primary_keys)
 
-        mapped_lot_ids = {x.external_db_guid: x.id for x in lot_ids}
-        # and resolve position-lot relation from Orgadata's M2M 'Elevation <> ElevationGroup <> Phases'
-        for elevation in Elevations:
-            phase_external_db_guid_ = elevationGroupId_to_lotGUID.get(elevation.get('elevationGroupId'))
-            elevation['lot_id'] = mapped_lot_ids.get(phase_external_db_guid_)
-            del elevation['elevationGroupId']
+        # 1. Write `carpentry.group.lot`
+        with self._import_phase(timings, 'lots'):
+            existing_lot_ids = self.env['carpentry.group.lot'].search(domain)
+            mapped_lot_ids = self._import_data_delta(Phases, existing_lot_ids, primary_keys, diff, 'lots')
+
+            # and resolve position-lot relation from Orgadata's M2M 'Elevation <> ElevationGroup <> Phases'
+            for elevation in Elevations:
+                phase_external_db_guid_ = elevationGroupId_to_lotGUID.get(elevation.get('elevationGroupId'))
+                elevation['lot_id'] = mapped_lot_ids.get(phase_external_db_guid_)
+                del elevation['elevationGroupId']
+        
+        # 2. Import carpentry.position
+        with self._import_phase(timings, 'positions'):
+            existing_position_ids = self.env['carpentry.position'].search(domain)
+            mapped_position_ids = self._import_data_delta(Elevations, existing_position_ids, primary_keys, diff, 'positions')
+            self.env.flush_all()
+        
+        # 3. Sum-group budget of active columns, per external position,
+        #    folding the external rows batch per batch
+        with self._import_phase(timings, 'budgets (read)'):
+            mapped_budget = self._fold_orgadata_budgets(Budgets, len(Elevations))
+        
+        # 4. Compare with existing budgets (applying `column_coef` to amount),
+        #    in the format for `carpentry_position_budget._erase_budget()`
+        with self._import_phase(timings, 'budgets (diff)'):
+            vals_list_budget = self._diff_budgets(mapped_budget, mapped_position_ids, diff)
+        
+        if dry_run:
+            return diff
+        
+        # 5. Create if new, write/erase if changed
+        with self._import_phase(timings, 'budgets (write)'):
+            self._write_budget_chunks(vals_list_budget)
+        
+        # 6. Budget lines, reservations & constrain
+        with self._import_phase(timings, 'budgets (refresh)'):
+            self.project_id._budget_full_refresh()
+        return diff
+    
+    def _import_data_delta(self, vals_list, existing_ids, primary_keys, diff, diff_key):
+        """ Route `vals_list` between new, changed and unchanged records (matched on
+            `primary_keys`, in order for duplicates) and call `_import_data` only for
+            new and changed ones. Existing records without match in `vals_list` are deleted,
+            like a full `_import_data` does. Nothing is written in dry-run mode.
+
+            :return: dict like {external_db_guid: record id} of all rows
+                     (id is False for new records in dry-run mode)
+        """
+        mapped_existing = defaultdict(list)
+        for record in existing_ids:
+            mapped_existing[tuple(record[key] for key in primary_keys)].append(record)
         
-        # 3. Import carpentry.position
-        existing_position_ids = self.env['carpentry.position'].search(domain)
-        position_ids = self._import_data(Elevations, existing_position_ids, primary_keys)
-        mapped_position_ids = {x.external_db_guid: x.id for x in position_ids}
+        mapped_ids, count = {}, defaultdict(int)
+        vals_list_write, record_ids_write = [], []
+        for vals in vals_list:
+            matches = mapped_existing.get(tuple(vals.get(key) for key in primary_keys))
+            record = matches.pop(0) if matches else None
+            mapped_ids[vals.get('external_db_guid')] = record and record.id
+            
+            if record and not self._is_import_vals_changed(record, vals):
+                count['unchanged'] += 1
+                continue
+            
+            count['update' if record else 'create'] += 1
+            vals_list_write.append(vals)
+            if record:
+                record_ids_write.append(record.id)
         
-        # 4. Import carpentry.position.budget
+        to_delete = existing_ids.browse([record.id for matches in mapped_existing.values() for record in matches])
+        count['delete'] = len(to_delete)
+        diff[diff_key] = dict(count)
+        if self._context.get('import_dry_run'):
+            return mapped_ids
+        
+        to_delete.unlink()
+        if vals_list_write:
+            records = self._import_data(vals_list_write, existing_ids.browse(record_ids_write), primary_keys)
+            mapped_ids.update({x.external_db_guid: x.id for x in records})
+        return mapped_ids
+    
+    def _is_import_vals_changed(self, record, vals):
+        """ Whether importing `vals` would change `record`
+            (`external_db_guid` is not compared, since it changes on each export)
+        """
+        for fname, value in vals.items():
+            field = record._fields.get(fname)
+            if not field or fname == 'external_db_guid':
+                continue
+            
+            current = record[fname]
+            if field.type == 'many2one':
+                current = current.id
+            if field.type in ('float', 'monetary', 'integer'):
+                if float_compare(float(current or 0.0), float(value or 0.0), precision_digits=6):
+                    return True
+            elif (current or False) != (value or False):
+                return True
+        return False
+
+    def _fold_orgadata_budgets(self, Budgets, count):
+        """ :return: dict like {(external_db_guid, analytic_account_id): amount} """
         precision = self.env['decimal.precision'].precision_get('Product Price')
-        # Sum-group budget of active columns, in the format for `carpentry_position_budget._erase_budget()`
         mapped_budget = defaultdict(float)
-        for elevation in Budgets:
-            position_id_ = mapped_position_ids.get(elevation.get('xGUID'))
-            for col, analytic_account_id_ in mapped_interface.items():
-                amount_unitary = elevation.get(col, 0.0)
-                if not float_is_zero(float(amount_unitary), precision_digits=precision):
-                    mapped_budget[(position_id_, analytic_account_id_)] += amount_unitary
-        
-        # 5. Create if new, write/erase if existing, delete if not touched
-        # and apply `column_coef` to amount
-        vals_list_budget = [{
-            'position_id': key[0],
-            'analytic_account_id': key[1],
-            'amount_unitary': amount_unitary * self.budget_coef/100
-        } for key, amount_unitary in mapped_budget.items()]
-        position_ids.position_budget_ids._erase_budget(vals_list_budget)
+        mapped_interface, done = None, 0
+        for batch in Budgets:
+            # 1st batch: get Odoo's budget column, linked to external DB one
+            if mapped_interface is None:
+                cols_orgadata = [x for x in batch[0]] if batch else []
+                mapped_interface = self._get_interface(cols_orgadata)
+            
+            for elevation in batch:
+                external_db_guid_ = elevation.get('xGUID')
+                for col, analytic_account_id_ in mapped_interface.items():
+                    amount_unitary = elevation.get(col, 0.0)
+                    if not float_is_zero(float(amount_unitary), precision_digits=precision):
+                        mapped_budget[(external_db_guid_, analytic_account_id_)] += amount_unitary
+            
+            done += len(batch)
+            self._log_import_progress('budgets (read)', done, count)
+        return mapped_budget
+    
+    def _diff_budgets(self, mapped_budget, mapped_position_ids, diff):
+        """ Compare the budget cells to import with the existing ones of the positions
+
+            :arg mapped_budget: result of `_fold_orgadata_budgets`
+            :arg mapped_position_ids: dict like {external_db_guid: position id}
+            :return: `vals_list_budget` of new and changed cells only
+        """
+        precision = self.env['decimal.precision'].precision_get('Product Price')
+        mapped_amount = defaultdict(float)
+        for (external_db_guid_, analytic_account_id_), amount_unitary in mapped_budget.items():
+            # new positions have no id in dry-run mode: keep them apart with their external id
+            position_id_ = mapped_position_ids.get(external_db_guid_) or ('new', external_db_guid_)
+            mapped_amount[(position_id_, analytic_account_id_)] += amount_unitary * self.budget_coef/100
+        
+        position_ids = {key[0] for key in mapped_amount if isinstance(key[0], int)}
+        existing = self.env['carpentry.position.budget'].search_read(
+            domain=[('position_id', 'in', list(position_ids))],
+            fields=['position_id', 'analytic_account_id', 'amount_unitary'],
+            load=None,
+        )
+        mapped_existing = {(x['position_id'], x['analytic_account_id']): x['amount_unitary'] for x in existing}
+
+        count = defaultdict(int)
+        vals_list_budget = []
+        for key, amount_unitary in mapped_amount.items():
+            existing_amount = mapped_existing.get(key)
+            if existing_amount is None:
+                count['create'] += 1
+            elif float_compare(existing_amount, amount_unitary, precision_digits=precision):
+                count['update'] += 1
+            else:
+                count['unchanged'] += 1
+                continue
+            
+            vals_list_budget.append({
+                'position_id': key[0],
+                'analytic_account_id': key[1],
+                'amount_unitary': amount_unitary,
+            })
+        count['obsolete'] = len(set(mapped_existing) - set(mapped_amount))
+        diff['budgets'] = dict(count)
+        
+        return vals_list_budget
+    
+    def _write_budget_chunks(self, vals_list_budget):
+        """ Write budgets by chunks: each chunk only loads, writes and flushes
+            the budgets of its positions
+        """
+        Position = self.env['carpentry.position']
+        chunk_size = self._import_write_chunk_size
+        for i in range(0, len(vals_list_budget), chunk_size):
+            chunk = vals_list_budget[i:i + chunk_size]
+            positions = Position.browse({vals['position_id'] for vals in chunk if vals['position_id']})
+            positions.position_budget_ids._erase_budget(chunk)
+            self.env.flush_all()
+
+            self._log_import_progress('budgets (write)', i + len(chunk), len(vals_list_budget))
@@ -64,7 +64,10 @@ class PositionMerge(models.TransientModel):
 
             `external_db_guid` is cleaned on `position_id_target` so that the merge
             operation is not erase in case of a new import
+
+            Budget logics are refreshed once at the end (bulk mode)
         """
+        self = self.with_context(import_budget_no_compute=True)
         # Checks before merge
         target, sources = self.position_id_target, self.position_ids_to_merge
         if not sources.ids:
@@ -83,6 +86,8 @@ class PositionMerge(models.TransientModel):
         target.external_db_guid = False
         (sources - target).unlink()
 
+        target.project_id._budget_full_refresh()
+
     def _calculate_weighted_average_budget(self, sources, target, sum_qty):
         """ Calculate weighted average SUM(budget*qty)/sum_qty
             :return: same `vals_list_budget` format
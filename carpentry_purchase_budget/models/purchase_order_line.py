@@ -31,3 +31,35 @@ class PurchaseOrderLine(models.Model):
 
             # 2. Set new forced distrib from budgets
             line.analytic_distribution = distrib | new_distrib
+
+    #===== CRUD: expense store =====#
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        lines._mark_store_dirty()
+        return lines
+
+    def write(self, vals):
+        self._mark_store_dirty()
+        res = super().write(vals)
+        self._mark_store_dirty()
+        return res
+    
+    def unlink(self):
+        self._mark_store_dirty()
+        return super().unlink()
+    
+    def _compute_qty_invoiced(self):
+        """ Stored computed: not written with `write()` """
+        res = super()._compute_qty_invoiced()
+        self._mark_store_dirty()
+        return res
+    
+    def _compute_qty_received(self):
+        res = super()._compute_qty_received()
+        self._mark_store_dirty()
+        return res
+    
+    def _mark_store_dirty(self):
+        """ Not yet invoiced expenses are summed per PO (see `carpentry.budget.expense.detail`) """
+        self.env['carpentry.budget.expense.detail']._mark_store_dirty(self.order_id)
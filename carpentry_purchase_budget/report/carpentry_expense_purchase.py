@@ -13,6 +13,9 @@ class CarpentryExpense(models.Model):
         """
         return super()._get_queries_models() + ('purchase.order',) # 'account.move' [TEMP 2025-11-25 ALY] before full removal
     
+    def _get_store_flush_models(self):
+        return super()._get_store_flush_models() + ['purchase.order.line',]
+    
     def _select(self, model, models):
         if model in ('purchase.order', 'account.move'):
             ratio_invoiced = (
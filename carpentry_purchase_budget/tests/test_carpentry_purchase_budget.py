@@ -276,3 +276,14 @@ class TestCarpentryPurchaseBudget_Reservation(
         """
         pass
         # TODO @arnaudlayec
+
+    def test_85_expense_store_dirty_line(self):
+        """ Ensure changes on PO lines (price, invoiced qty) flag the PO's
+            expenses as outdated in the expense store
+        """
+        Detail = self.env['carpentry.budget.expense.detail']
+        Detail._refresh_store()
+        self.line.price_unit = self.UNIT_PRICE * 2
+        dirty = self.env.cr.precommit.data.get(Detail._store_key)
+        model_id = self.env['ir.model']._get_id(self.record._name)
+        self.assertIn(self.record.id, dirty['records'][model_id])
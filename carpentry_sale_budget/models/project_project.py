@@ -81,13 +81,14 @@ class Project(models.Model):
     # as long as computed field are not stored
     def _compute_budget_fees_and_margins(self):
         keys = ['gain', 'reserved_valued']
-        rg_expense = self.env['carpentry.budget.expense'].with_context(active_test=True)._read_group(
-            domain=[('project_id', 'in', self.ids)],
+        rg_expense = self.env['carpentry.budget.expense'].with_context(active_test=True)._read_group_project(
+            project_ids=self._origin.ids,
+            domain=[],
             fields=['amount_' + k + ':sum' for k in keys],
             groupby=['project_id'],
         )
         mapped_expense = {
-            x['project_id'][0]: {k: x['amount_' + k] for k in keys}
+            x['project_id']: {k: x['amount_' + k] for k in keys}
             for x in rg_expense
         }
         for project in self:
@@ -3,6 +3,8 @@
 from odoo import models, fields, api, Command
 from odoo.tools import float_compare
 
+from collections import defaultdict
+
 class Task(models.Model):
     _name = 'project.task'
     _inherit = ['project.task', 'carpentry.budget.mixin']
@@ -99,17 +101,15 @@ class Task(models.Model):
         if not tasks:
             return
 
-        rg_result = self.env['carpentry.budget.remaining'].read_group(
-            domain=[('project_id', 'in', self.project_id._origin.ids),
-                    ('analytic_account_id', 'in', self.analytic_account_id._origin.ids)],
-            groupby=['project_id', 'analytic_account_id'],
-            fields=['amount_subtotal:sum'],
-            lazy=False,
+        projects = tasks.project_id._origin.with_context(active_test=False)
+        mapped_remaining_budget = self.env['carpentry.budget.remaining']._get_remaining_cached(
+            project_ids=projects.ids,
+            launch_ids=[False] + projects.launch_ids.ids,
+            analytic_ids=tasks.analytic_account_id._origin.ids,
         )
-        mapped_remaining = {
-            (x['project_id'][0], x['analytic_account_id'][0]): x['amount_subtotal']
-            for x in rg_result
-        }
+        mapped_remaining = defaultdict(float)
+        for key, vals in mapped_remaining_budget.items():
+            mapped_remaining[(key[0], key[2])] += vals.get('budget', 0.0) + vals.get('reservation', 0.0)
         for task in tasks:
             task.remaining_budget = mapped_remaining.get(
                 (task.project_id._origin.id, task.analytic_account_id._origin.id), 0.0